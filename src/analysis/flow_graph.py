@@ -0,0 +1,144 @@
+# analysis.flow_graph
+from objects.machines.producing_machine import ProducingMachine
+from objects.machines.splitter import Splitter
+
+
+class FlowNode:
+    """One thing items flow through - a TransportLine, a Splitter or a
+    producing machine - with its capacity in items (machines: crafts) per
+    minute and the nodes it hands items to and takes them from."""
+
+    LINE = "line"
+    SPLITTER = "splitter"
+    MACHINE = "machine"
+
+    def __init__(self, kind, entity, capacity):
+        self.kind = kind
+        self.entity = entity
+        self.capacity = capacity
+
+        self.inputs = []   # FlowNodes feeding this one
+        self.outputs = []  # FlowNodes this one feeds
+
+    @property
+    def tile(self):
+        """Where to find it: a line's first segment, a machine's top left."""
+        if self.kind == self.LINE:
+            return self.entity.head.grid_pos
+        return self.entity.grid_pos
+
+
+class FlowGraph:
+    """Who can hand items to whom in a World, read off its current layout
+    with exactly the acceptance rules the simulation uses:
+
+    - a line's last segment hands on to the head of the line in front of
+      it (unless that one faces straight back), or into the machine in
+      front - a splitter only from behind
+    - a splitter pushes left, forward and right (BeltSegment.receive_item
+      / Splitter.push_item)
+    - a producing machine pushes from its output ports onto belts facing
+      away from it, or into machines there (machine_output_pusher)
+
+    Only the heads of lines ever take items from outside, so every edge
+    ends at a line head, a splitter or a machine."""
+
+    def __init__(self):
+        self.nodes = {}  # entity -> FlowNode, in World order
+
+    @classmethod
+    def from_world(cls, world):
+        graph = cls()
+
+        for line in world.belt_lines:
+            graph.nodes[line] = FlowNode(FlowNode.LINE, line, line.head.items_per_minute)
+        for machine in world.machines:
+            if isinstance(machine, Splitter):
+                # As fast as whatever feeds it - see Splitter.receive_item.
+                graph.nodes[machine] = FlowNode(FlowNode.SPLITTER, machine, Splitter.DEFAULT_TILES_PER_SEC * 60)
+            elif isinstance(machine, ProducingMachine):
+                recipe = machine.recipe
+                graph.nodes[machine] = FlowNode(FlowNode.MACHINE, machine, 60 / recipe.process_time if recipe else 0.0)
+
+        for node in graph.nodes.values():
+            if node.kind == FlowNode.LINE:
+                targets = [cls._line_target(world, node.entity)]
+            elif node.kind == FlowNode.SPLITTER:
+                targets = [cls._port_target(world, tile, direction, any_facing=True) for tile, direction in node.entity.relative_ports]
+            else:
+                targets = [cls._port_target(world, tile, direction, any_facing) for tile, direction, any_facing in node.entity.output_ports]
+
+            for target in dict.fromkeys(targets):
+                target_node = graph.nodes.get(target)
+                if target_node is None or target_node is node:
+                    continue
+                node.outputs.append(target_node)
+                target_node.inputs.append(node)
+
+        # A splitter passes items on at the speed of the belt feeding it.
+        for node in graph.nodes.values():
+            feeders = [feeder.capacity for feeder in node.inputs if feeder.kind == FlowNode.LINE]
+            if node.kind == FlowNode.SPLITTER and feeders:
+                node.capacity = max(feeders)
+
+        return graph
+
+    @staticmethod
+    def _line_target(world, line):
+        tail = line.tail
+        direction = tail.direction
+        tile = (tail.grid_pos[0] + int(direction.x), tail.grid_pos[1] + int(direction.y))
+
+        seg = world.belt_map.get(tile)
+        if seg is not None:
+            # Only a line's head takes items, and never from the front.
+            if seg.line is not None and seg.line_index == 0 and direction != -seg.direction:
+                return seg.line
+            return None
+
+        machine = world.machine_map.get(tile)
+        if isinstance(machine, Splitter):
+            return machine if direction == machine.direction else None
+        return machine
+
+    @staticmethod
+    def _port_target(world, tile, direction, any_facing):
+        seg = world.belt_map.get(tile)
+        if seg is not None:
+            facing = direction != -seg.direction if any_facing else seg.direction == direction
+            if seg.line is not None and seg.line_index == 0 and facing:
+                return seg.line
+            return None
+
+        machine = world.machine_map.get(tile)
+        if isinstance(machine, Splitter):
+            return machine if direction == machine.direction else None
+        return machine
+
+    def sources(self):
+        """Lines nothing feeds - where items enter the factory."""
+        return [node for node in self.nodes.values() if node.kind == FlowNode.LINE and not node.inputs]
+
+    def order(self):
+        """Nodes upstream first: a topological order where there are no
+        loops, and a reasonable one where there are."""
+        visited = set()
+        postorder = []
+
+        for root in self.nodes.values():
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(root.outputs))]
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    postorder.append(node)
+                elif child not in visited:
+                    visited.add(child)
+                    stack.append((child, iter(child.outputs)))
+
+        postorder.reverse()
+        return postorder
@@ -0,0 +1,274 @@
+# analysis.planner
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional - the planner needs it, nothing else here does
+    np = None
+
+from constants.itemdata import ITEM_REGISTRY, raw_materials
+from constants.recipes import assembler_recipes, smelter_recipes
+from objects.conveyors.belt_segment import BeltSegment
+from objects.machines.assembler import Assembler
+from objects.machines.smelter import Smelter
+from systems.conveyors.belt_system import BeltSystem
+
+
+BLAND_AFTER = 50  # pivots without progress before switching rules
+
+
+class LinearProgramError(Exception):
+    pass
+
+
+def solve_linear_program(costs, A, b, max_pivots=50_000):
+    """Minimize costs . x subject to A x = b and x >= 0, by the two-phase
+    simplex method on a dense tableau.
+    Returns x, or raises LinearProgramError if there is no solution."""
+    A = np.array(A, dtype=float)
+    b = np.array(b, dtype=float)
+    costs = np.array(costs, dtype=float)
+    rows, columns = A.shape
+
+    flip = b < 0
+    A[flip] *= -1
+    b[flip] *= -1
+
+    # Phase 1: rows that already have a unit column (a slack) start out
+    # with it in the basis; the rest get an artificial variable each, and
+    # their sum is minimized down to 0.
+    basis = [None] * rows
+    units = np.nonzero(((A != 0).sum(axis=0) == 1) & (A.max(axis=0) == 1.0))[0]
+    for column in units:
+        row = int(np.argmax(A[:, column]))
+        if basis[row] is None:
+            basis[row] = column
+
+    missing = [row for row in range(rows) if basis[row] is None]
+    tableau = np.zeros((rows + 1, columns + len(missing) + 1))
+    tableau[:rows, :columns] = A
+    tableau[:rows, -1] = b
+    for i, row in enumerate(missing):
+        tableau[row, columns + i] = 1.0
+        basis[row] = columns + i
+        tableau[-1] -= tableau[row]
+    tableau[-1, columns:columns + len(missing)] = 0.0
+    artificials = range(columns, columns + len(missing))
+
+    _run_simplex(tableau, basis, columns + len(missing), max_pivots)
+    if tableau[-1, -1] < -1e-7 * max(1.0, b.sum()):
+        raise LinearProgramError("no plan meets the targets with these recipes")
+
+    # Artificials still basic (at 0) are swapped for a real column where
+    # their row has one; rows with none are redundant and stay as they are.
+    for row, column in enumerate(basis):
+        if column >= columns:
+            candidates = np.nonzero(np.abs(tableau[row, :columns]) > 1e-9)[0]
+            if len(candidates):
+                _pivot(tableau, basis, row, candidates[0])
+
+    # Phase 2: the real costs, artificials can't come back in.
+    tableau = np.delete(tableau, artificials, axis=1)
+    tableau[-1, :] = 0.0
+    tableau[-1, :columns] = costs
+    for row, column in enumerate(basis):
+        if column < columns:
+            tableau[-1] -= costs[column] * tableau[row]
+
+    _run_simplex(tableau, basis, columns, max_pivots)
+
+    x = np.zeros(columns)
+    for row, column in enumerate(basis):
+        if column < columns:
+            x[column] = tableau[row, -1]
+    return x
+
+
+def _run_simplex(tableau, basis, columns, max_pivots):
+    # Most negative reduced cost first - far fewer pivots than Bland's
+    # rule - falling back to Bland's while the objective is stuck, which
+    # is when cycling could happen.
+    stuck = 0
+    for _ in range(max_pivots):
+        reduced = tableau[-1, :columns]
+        entering = np.nonzero(reduced < -1e-9)[0]
+        if not len(entering):
+            return
+        column = entering[0] if stuck > BLAND_AFTER else entering[np.argmin(reduced[entering])]
+
+        pivot_column = tableau[:-1, column]
+        candidates = np.nonzero(pivot_column > 1e-9)[0]
+        if not len(candidates):
+            raise LinearProgramError("unbounded")
+
+        ratios = tableau[candidates, -1] / pivot_column[candidates]
+        best = ratios.min()
+        tied = candidates[ratios <= best + 1e-12]
+        row = min(tied, key=lambda r: basis[r])
+
+        objective = tableau[-1, -1]
+        _pivot(tableau, basis, row, column)
+        stuck = stuck + 1 if abs(tableau[-1, -1] - objective) < 1e-12 else 0
+
+    raise LinearProgramError("too many pivots")
+
+
+def _pivot(tableau, basis, row, column):
+    tableau[row] /= tableau[row, column]
+    others = tableau[:, column].copy()
+    others[row] = 0.0
+    tableau -= np.outer(others, tableau[row])
+    basis[row] = column
+
+
+class ProductionPlan:
+    """What ProductionPlanner worked out for a set of targets. Rates are
+    per minute; machine counts are exact (`machines`) and rounded up to
+    whole buildings (`buildings`)."""
+
+    def __init__(self, targets, crafts, raw_inputs, produced, consumed, belt_tiers):
+        self.targets = targets
+        self.crafts = crafts          # (machine class, recipe) -> crafts per minute
+        self.raw_inputs = raw_inputs  # item_id -> brought in
+        self.produced = produced      # item_id -> made by machines
+        self.consumed = consumed      # item_id -> used up by machines
+        self._belt_tiers = belt_tiers
+
+    @property
+    def machines(self):
+        return {
+            (machine_class, recipe): rate * recipe.process_time / 60
+            for (machine_class, recipe), rate in self.crafts.items()
+        }
+
+    @property
+    def buildings(self):
+        return {key: math.ceil(count - 1e-9) for key, count in self.machines.items()}
+
+    def buildings_by_type(self):
+        counts = {}
+        for (machine_class, _), count in self.buildings.items():
+            counts[machine_class.__name__] = counts.get(machine_class.__name__, 0) + count
+        return counts
+
+    def surplus(self):
+        """Byproducts made beyond what's used and asked for."""
+        surplus = {}
+        for item_id in set(self.produced) | set(self.raw_inputs):
+            left = self.produced.get(item_id, 0.0) + self.raw_inputs.get(item_id, 0.0) - self.consumed.get(item_id, 0.0) - self.targets.get(item_id, 0.0)
+            if left > 1e-6:
+                surplus[item_id] = left
+        return surplus
+
+    def belts(self):
+        """item_id -> (belt type, how many) to carry everything made or
+        brought in of it, on the slowest belt type that does it with one
+        belt - or as many of the fastest as it takes."""
+        belts = {}
+        for item_id in set(self.produced) | set(self.raw_inputs):
+            rate = self.produced.get(item_id, 0.0) + self.raw_inputs.get(item_id, 0.0)
+            belts[item_id] = self.belt_for(rate)
+        return belts
+
+    def belt_for(self, rate):
+        for belt_type, items_per_minute in self._belt_tiers:
+            if rate <= items_per_minute + 1e-9:
+                return belt_type, 1
+        belt_type, items_per_minute = self._belt_tiers[-1]
+        return belt_type, math.ceil(rate / items_per_minute - 1e-9)
+
+
+class ProductionPlanner:
+    """How many of which machine it takes to make `targets` items per
+    minute, what has to be brought in, and which belts carry it.
+
+    Every recipe of every machine type is a column of a linear program:
+    its crafts per minute, each one making its outputs and using up its
+    inputs (Recipe.inputs / outputs, at 60 / process_time crafts per
+    machine and minute). Raw materials - and anything no recipe makes -
+    can be brought in instead. Every item has to come out at least at its
+    target rate; more is fine, so byproducts like the coal from
+    iron_plate_recipe just pile up as surplus, or replace bringing some in.
+    The simplex method picks the recipes and rates that bring in the
+    least raw material, then use the fewest machines - fast enough for
+    hundreds of recipes. Needs NumPy."""
+
+    MACHINE_WEIGHT = 1e-3  # cost of one machine, next to one raw item per minute
+
+    def __init__(self, recipes=None, raw_items=None):
+        # (machine class, recipe) pairs - by default everything the game has.
+        self.recipes = recipes if recipes is not None else (
+            [(Smelter, recipe) for recipe in smelter_recipes] + [(Assembler, recipe) for recipe in assembler_recipes]
+        )
+        self.raw_items = set(raw_items) if raw_items is not None else {item.item_id for item in raw_materials}
+
+        self.belt_tiers = sorted(
+            ((belt_type, BeltSegment((0, 0), None, [], belt_type=belt_type).items_per_minute) for belt_type in BeltSystem.BUILD_COSTS),
+            key=lambda tier: tier[1],
+        )
+
+    def plan(self, targets):
+        """`targets` is {item_id: items per minute}. Returns a
+        ProductionPlan. Raises ValueError for an item neither the game nor
+        these recipes know (anything no recipe makes would otherwise just
+        be "brought in"), or a rate that is negative or not finite."""
+        if np is None:
+            raise RuntimeError("the production planner needs NumPy")
+
+        items = {}
+        for _, recipe in self.recipes:
+            for item_id in list(recipe.inputs) + list(recipe.outputs):
+                items.setdefault(item_id, len(items))
+
+        for item_id, rate in targets.items():
+            if item_id not in items and item_id not in self.raw_items and ITEM_REGISTRY.get(item_id) is None:
+                raise ValueError(f"unknown item {item_id!r}")
+            if not math.isfinite(rate) or rate < 0:
+                raise ValueError(f"rate for {item_id} must be finite and not negative: {rate}")
+
+        for item_id in targets:
+            items.setdefault(item_id, len(items))
+
+        made = {item_id for _, recipe in self.recipes for item_id in recipe.outputs}
+        importable = [item_id for item_id in items if item_id in self.raw_items or item_id not in made]
+
+        # Columns: recipes, then imports, then one surplus per item.
+        recipe_count, import_count, item_count = len(self.recipes), len(importable), len(items)
+        A = np.zeros((item_count, recipe_count + import_count + item_count))
+        costs = np.zeros(A.shape[1])
+
+        for column, (_, recipe) in enumerate(self.recipes):
+            for item_id, amount in recipe.outputs.items():
+                A[items[item_id], column] += amount
+            for item_id, amount in recipe.inputs.items():
+                A[items[item_id], column] -= amount
+            costs[column] = self.MACHINE_WEIGHT * recipe.process_time / 60
+        for i, item_id in enumerate(importable):
+            A[items[item_id], recipe_count + i] = 1.0
+            costs[recipe_count + i] = 1.0
+        A[:, recipe_count + import_count:] = -np.eye(item_count)
+
+        b = np.zeros(item_count)
+        for item_id, rate in targets.items():
+            b[items[item_id]] = rate
+
+        # Items without a target: "made - used >= 0" reads as "used - made
+        # + surplus = 0", so the surplus makes a starting basis for them.
+        A[b == 0] *= -1
+
+        x = solve_linear_program(costs, A, b)
+
+        crafts = {}
+        produced, consumed = {}, {}
+        for column, (machine_class, recipe) in enumerate(self.recipes):
+            rate = float(x[column])
+            if rate <= 1e-9:
+                continue
+            crafts[(machine_class, recipe)] = rate
+            for item_id, amount in recipe.outputs.items():
+                produced[item_id] = produced.get(item_id, 0.0) + amount * rate
+            for item_id, amount in recipe.inputs.items():
+                consumed[item_id] = consumed.get(item_id, 0.0) + amount * rate
+
+        raw_inputs = {item_id: float(x[recipe_count + i]) for i, item_id in enumerate(importable) if x[recipe_count + i] > 1e-9}
+        return ProductionPlan(dict(targets), crafts, raw_inputs, produced, consumed, self.belt_tiers)
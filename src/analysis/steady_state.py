@@ -0,0 +1,358 @@
+# analysis.steady_state
+import math
+import time
+
+from analysis.flow_graph import FlowGraph, FlowNode
+
+
+def _total(rates):
+    return sum(rates.values())
+
+
+def _scaled(rates, factor):
+    return {item_id: rate * factor for item_id, rate in rates.items() if rate * factor > 0.0}
+
+
+def _add(into, rates):
+    for item_id, rate in rates.items():
+        into[item_id] = into.get(item_id, 0.0) + rate
+
+
+def _fill(amount, caps):
+    """Share `amount` out as evenly as the `caps` allow - what round-robin
+    hand-offs settle into: whoever can't take a full share gets what it
+    can, and the rest is split among the others."""
+    shares = [0.0] * len(caps)
+    open_slots = [i for i, cap in enumerate(caps) if cap > 0.0]
+    while open_slots and amount > 1e-12:
+        share = amount / len(open_slots)
+        still_open = []
+        for i in open_slots:
+            given = min(share, caps[i] - shares[i])
+            shares[i] += given
+            amount -= given
+            if caps[i] - shares[i] > 1e-12:
+                still_open.append(i)
+        if len(still_open) == len(open_slots):
+            break
+        open_slots = still_open
+    return shares
+
+
+class SteadyStateSolver:
+    """Where items end up flowing, in items per minute, once the factory
+    has settled - worked out from its layout (FlowGraph) instead of by
+    ticking the Simulation until it gets there.
+
+    Every node passes on what it gets, up to its capacity: a line its
+    belt speed, a splitter the speed of the belt feeding it (split evenly
+    over its outputs, like its round-robin), a machine as many crafts as
+    its inputs allow and its process time fits. Back pressure runs the
+    other way: what a node can take is limited by what it can get rid of,
+    and shared evenly between everything feeding it. A belt carrying an
+    item nothing downstream takes jams completely, just like in the game.
+    Both passes are repeated until nothing changes any more.
+
+    Items enter on the lines nothing feeds. `supply` maps the tile of such
+    a line's first segment to {item_id: items per minute}; a source line
+    that isn't in it is assumed to be fed at belt speed with the items
+    currently on it, or with `feed_item` if it's empty. Items reaching the
+    end of a belt that leads nowhere, or piling up in a machine that has
+    nowhere to put them, are taken away if `drain` is set (someone
+    collects them) and back up otherwise."""
+
+    def __init__(self, world, supply=None, feed_item=None, drain=True, max_iterations=200, tolerance=1e-6):
+        self.world = world
+        self.supply = supply or {}
+        self.feed_item = feed_item
+        self.drain = drain
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+
+    def solve(self):
+        start = time.perf_counter()
+        graph = FlowGraph.from_world(self.world)
+        order = graph.order()
+
+        state = _SolverState(graph, self._source_supply(graph), self.drain)
+
+        # Once with nothing pushing back: what every node would be offered
+        # if everything downstream took all it gets.
+        state.forward(order)
+        state.offered = dict(state.inflow)
+
+        iterations = 0
+        for iterations in range(1, self.max_iterations + 1):
+            state.backward(reversed(order))
+            change = state.forward(order)
+            if change < self.tolerance:
+                break
+
+        return SteadyState(graph, state, iterations, time.perf_counter() - start)
+
+    def _source_supply(self, graph):
+        supply = {}
+        for node in graph.sources():
+            line = node.entity
+            rates = self.supply.get(line.head.grid_pos)
+            if rates is None:
+                on_line = {}
+                for entry in line.items:
+                    item_id = entry[line.ITEM].item_id
+                    on_line[item_id] = on_line.get(item_id, 0) + 1
+                if not on_line and self.feed_item is not None:
+                    on_line = {self.feed_item: 1}
+                count = _total(on_line)
+                rates = {item_id: node.capacity * n / count for item_id, n in on_line.items()}
+            if rates:
+                supply[node] = dict(rates)
+        return supply
+
+
+class _SolverState:
+    """The numbers SteadyStateSolver iterates on. Per edge (feeder,
+    receiver): `flow`, what actually moves along it; `desire`, what the
+    feeder would send if the receiver took everything; and `limit`, the
+    most the receiver takes from it in total."""
+
+    def __init__(self, graph, supply, drain):
+        self.graph = graph
+        self.supply = supply
+        self.drain = drain
+
+        self.flow = {}
+        self.desire = {}
+        self.limit = {}
+        for node in graph.nodes.values():
+            for target in node.outputs:
+                edge = (node, target)
+                self.flow[edge] = {}
+                self.desire[edge] = {}
+                self.limit[edge] = math.inf
+
+        self.inflow = {}   # node -> {item_id: rate} arriving
+        self.offered = {}  # node -> {item_id: rate} arriving without back pressure
+        self.rate = {}     # node -> items (machines: crafts) per minute
+        self.drained = {}  # item_id -> rate taken away at open ends
+        self.crafts_in = {}
+        self.crafts_out = {}
+
+    def _open_end_limit(self):
+        return math.inf if self.drain else 0.0
+
+    def _output_limit(self, node):
+        if not node.outputs:
+            return self._open_end_limit()
+        return sum(self.limit[(node, target)] for target in node.outputs)
+
+    # Back pressure
+
+    def backward(self, nodes):
+        for node in nodes:
+            if not node.inputs:
+                continue
+
+            if node.kind == FlowNode.MACHINE:
+                self._share_machine_intake(node)
+            else:
+                accepts = min(node.capacity, self._output_limit(node))
+                edges = [(feeder, node) for feeder in node.inputs]
+                shares = _fill(accepts, [_total(self.desire[edge]) for edge in edges])
+                for edge, share in zip(edges, shares):
+                    # Whatever the feeder doesn't want yet it could still have.
+                    self.limit[edge] = accepts if _total(self.desire[edge]) == 0.0 else share
+
+    def _share_machine_intake(self, node):
+        recipe = node.entity.recipe
+        edges = [(feeder, node) for feeder in node.inputs]
+        if recipe is None:
+            for edge in edges:
+                self.limit[edge] = 0.0
+            return
+
+        outputs_per_craft = _total(recipe.outputs)
+        crafts = min(node.capacity, self._output_limit(node) / outputs_per_craft)
+
+        # Each input shared among the feeders offering it; a feeder gets
+        # as much in total as the scarcest of its items allows.
+        limits = [math.inf] * len(edges)
+        for item_id, per_craft in recipe.inputs.items():
+            wanted = [self.desire[edge].get(item_id, 0.0) for edge in edges]
+            shares = _fill(crafts * per_craft, wanted)
+            for i, edge in enumerate(edges):
+                offered = _total(self.desire[edge])
+                if wanted[i] > 0.0:
+                    limits[i] = min(limits[i], shares[i] * offered / wanted[i])
+
+        for i, edge in enumerate(edges):
+            desire = self.desire[edge]
+            if any(item_id not in recipe.inputs for item_id in desire):
+                limits[i] = 0.0  # jams on the first item it can't use
+            elif not desire:
+                limits[i] = crafts * _total(recipe.inputs)
+            self.limit[edge] = limits[i]
+
+    # Flow
+
+    def forward(self, nodes):
+        """One pass downstream. Returns the largest change in any flow."""
+        change = 0.0
+        self.drained = {}
+
+        for node in nodes:
+            inflow = dict(self.supply.get(node, {}))
+            for feeder in node.inputs:
+                _add(inflow, self.flow[(feeder, node)])
+            self.inflow[node] = inflow
+
+            if node.kind == FlowNode.MACHINE:
+                out_rates, potential, rate = self._machine_output(node, inflow)
+            else:
+                total = _total(inflow)
+                through = min(total, node.capacity)
+                potential = _scaled(inflow, through / total) if total else {}
+                rate = min(through, self._output_limit(node))
+                out_rates = _scaled(inflow, rate / total) if total else {}
+            self.rate[node] = rate
+
+            if not node.outputs:
+                _add(self.drained, out_rates if self.drain else {})
+                continue
+
+            edges = [(node, target) for target in node.outputs]
+            caps = [self.limit[edge] for edge in edges]
+            total_out = _total(out_rates)
+            total_potential = _total(potential)
+            shares = _fill(total_out, caps)
+            for i, (edge, share) in enumerate(zip(edges, shares)):
+                flow = _scaled(out_rates, share / total_out) if total_out else {}
+                change = max(change, abs(_total(flow) - _total(self.flow[edge])))
+                self.flow[edge] = flow
+
+                # What this output would get if it took everything it was
+                # offered - its even share, plus whatever the others can't
+                # take.
+                wanted = _fill(total_potential, caps[:i] + [math.inf] + caps[i + 1:])[i]
+                self.desire[edge] = _scaled(potential, wanted / total_potential) if total_potential else {}
+
+        return change
+
+    def _machine_output(self, node, inflow):
+        recipe = node.entity.recipe
+        if recipe is None:
+            self.crafts_in[node] = self.crafts_out[node] = 0.0
+            return {}, {}, 0.0
+
+        crafts_in = node.capacity
+        for item_id, per_craft in recipe.inputs.items():
+            crafts_in = min(crafts_in, inflow.get(item_id, 0.0) / per_craft)
+        crafts_out = self._output_limit(node) / _total(recipe.outputs)
+
+        self.crafts_in[node] = crafts_in
+        self.crafts_out[node] = crafts_out
+
+        crafts = min(crafts_in, crafts_out)
+        potential = _scaled(recipe.outputs, crafts_in)
+        return _scaled(recipe.outputs, crafts), potential, crafts
+
+
+class SteadyState:
+    """What SteadyStateSolver found, by entity: how fast each line, splitter
+    and machine runs, which belts are bottlenecks, which machines are
+    starved or blocked, and what comes out of the factory at its open
+    ends."""
+
+    EPSILON = 1e-6
+
+    def __init__(self, graph, state, iterations, seconds):
+        self.graph = graph
+        self.iterations = iterations
+        self.seconds = seconds
+
+        self.rates = {node.entity: state.rate.get(node, 0.0) for node in graph.nodes.values()}
+        self.inflows = {node.entity: state.inflow.get(node, {}) for node in graph.nodes.values()}
+        self.outputs = state.drained
+
+        self._state = state
+
+    def _node(self, entity):
+        return self.graph.nodes[entity]
+
+    def demand(self, entity):
+        """Items per minute that would reach it if nothing downstream of it
+        held anything up - from its feeders, or as supply."""
+        return _total(self._state.offered.get(self._node(entity), {}))
+
+    def utilization(self, entity):
+        node = self._node(entity)
+        return self.rates[entity] / node.capacity if node.capacity else 0.0
+
+    def line_status(self, line):
+        """"bottleneck" - full, and more is offered than fits; "backed_up" -
+        slower than what's offered and what it could carry, because
+        whatever is downstream doesn't take it; "idle" - nothing on it;
+        otherwise "ok"."""
+        node = self._node(line)
+        rate = self.rates[line]
+        demand = self.demand(line)
+
+        if rate >= node.capacity * (1 - self.EPSILON) and demand > node.capacity * (1 + self.EPSILON):
+            return "bottleneck"
+        if rate < min(demand, node.capacity) * (1 - self.EPSILON):
+            return "backed_up"
+        if rate <= self.EPSILON:
+            return "idle"
+        return "ok"
+
+    def machine_status(self, machine):
+        """"running" at full speed, "starved" for inputs, "blocked" on its
+        outputs, or "no_recipe"."""
+        node = self._node(machine)
+        if machine.recipe is None:
+            return "no_recipe"
+
+        crafts = self.rates[machine]
+        if crafts >= node.capacity * (1 - self.EPSILON):
+            return "running"
+
+        # Back pressure throttles the inputs down to what the outputs take,
+        # so it's blocked whenever the outputs are what caps it.
+        if crafts >= self._state.crafts_out[node] * (1 - self.EPSILON):
+            return "blocked"
+        return "starved"
+
+    def missing_inputs(self, machine):
+        """{item_id: items per minute short} of what full speed needs."""
+        node = self._node(machine)
+        recipe = machine.recipe
+        if recipe is None:
+            return {}
+
+        inflow = self.inflows[machine]
+        missing = {}
+        for item_id, per_craft in recipe.inputs.items():
+            short = node.capacity * per_craft - inflow.get(item_id, 0.0)
+            if short > self.EPSILON:
+                missing[item_id] = short
+        return missing
+
+    def lines(self, status=None):
+        return [
+            node.entity for node in self.graph.nodes.values()
+            if node.kind == FlowNode.LINE and (status is None or self.line_status(node.entity) == status)
+        ]
+
+    def machines(self, status=None):
+        return [
+            node.entity for node in self.graph.nodes.values()
+            if node.kind == FlowNode.MACHINE and (status is None or self.machine_status(node.entity) == status)
+        ]
+
+    def bottleneck_lines(self):
+        return self.lines("bottleneck")
+
+    def starved_machines(self):
+        return self.machines("starved")
+
+    def blocked_machines(self):
+        return self.machines("blocked")
@@ -0,0 +1,71 @@
+# analyze
+"""Steady-state throughput of a saved factory, without running it - run
+from the repository root, like the game:
+
+    python src/analyze.py
+    python src/analyze.py autosave.sfp --feed iron_ore --top 20
+
+Prints what comes out of the factory per minute, the belts that are
+bottlenecks, and the machines that are starved for inputs or blocked on
+their outputs. See analysis.steady_state for the model."""
+import argparse
+import sys
+
+from analysis.steady_state import SteadyStateSolver
+from entities.player import Player
+from game.grid import Grid
+from game.save_game import SaveGame
+from game.simulation import Simulation
+from systems.conveyors.belt_system import BeltSystem
+
+
+def load_world(path):
+    player = Player(Grid.CELL_SIZE)
+    world = Simulation.headless(player).world
+    SaveGame.load(path, world, player, BeltSystem(world, Grid, player, None))
+    return world
+
+
+def report(result, top):
+    lines = result.lines()
+    machines = result.machines()
+    splitters = len(result.graph.nodes) - len(lines) - len(machines)
+    print(f"{len(lines)} lines, {splitters} splitters, {len(machines)} machines "
+          f"solved in {result.seconds * 1000:.1f} ms ({result.iterations} iterations)")
+
+    outputs = ", ".join(f"{item_id} {rate:.1f}" for item_id, rate in sorted(result.outputs.items())) or "nothing"
+    print(f"out of the factory per minute: {outputs}")
+
+    bottlenecks = sorted(result.bottleneck_lines(), key=result.demand, reverse=True)
+    print(f"\nbottleneck belts: {len(bottlenecks)}")
+    for line in bottlenecks[:top]:
+        print(f"  {line.head.grid_pos} {line.head.belt_type}: {result.rates[line]:.1f}/min, {result.demand(line):.1f}/min offered")
+
+    for status in ("starved", "blocked"):
+        found = result.machines(status)
+        print(f"\n{status} machines: {len(found)}")
+        for machine in found[:top]:
+            node = result.graph.nodes[machine]
+            text = f"  {type(machine).__name__} {machine.grid_pos} {machine.recipe.name}: {result.rates[machine]:.2f}/{node.capacity:.2f} crafts/min"
+            missing = result.missing_inputs(machine)
+            if status == "starved" and missing:
+                text += ", short " + ", ".join(f"{item_id} {rate:.1f}/min" for item_id, rate in missing.items())
+            print(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Steady-state throughput of a Satis-Factorio save")
+    parser.add_argument("path", nargs="?", default="savegame.sfp", help="save file (default: savegame.sfp)")
+    parser.add_argument("--feed", metavar="ITEM", help="item fed at belt speed into empty belts nothing else feeds")
+    parser.add_argument("--no-drain", action="store_true", help="items at dead ends back up instead of being collected")
+    parser.add_argument("--top", type=int, default=10, help="entries listed per category")
+    args = parser.parse_args(argv)
+
+    world = load_world(args.path)
+    result = SteadyStateSolver(world, feed_item=args.feed, drain=not args.no_drain).solve()
+    report(result, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
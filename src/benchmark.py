@@ -0,0 +1,168 @@
+# benchmark
+"""Performance benchmarks - run from the repository root, like the game:
+
+    python src/benchmark.py sim
+    python src/benchmark.py sim --sizes 1000 10000 --scenarios belt_lines --output results.json
+    python src/benchmark.py sim --baseline results.json
+    python src/benchmark.py render --resolutions 3840x2160
+
+Results are written as JSON (stdout by default). With --baseline, every
+result is compared against the matching one in an earlier results file,
+and the exit status is 1 if anything got slower by more than
+--tolerance. It's 1 as well if a sim scenario's save didn't load back
+into a world that runs on exactly like the original."""
+import argparse
+import json
+import platform
+import sys
+
+import pygame as py
+
+from benchmarks.factory_generators import FactoryGenerator
+from benchmarks.render_benchmark import RenderBenchmark
+from benchmarks.sim_benchmark import SimBenchmark
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+# Compared against the baseline - lower is better for all of them.
+REGRESSION_METRICS = {
+    "sim": (
+        ("ticks", "mean_ms"),
+        ("ticks", "p95_ms"),
+        ("connectivity", "full_ms"),
+        ("connectivity", "incremental_ms"),
+    ),
+    "render": (
+        ("frame_ms", "mean"),
+        ("frame_ms", "p95"),
+    ),
+}
+
+# What identifies the same run in two results files.
+RESULT_KEYS = {
+    "sim": ("scenario", "size"),
+    "render": ("scenario", "resolution"),
+}
+
+
+def run_sim(args):
+    benchmark = SimBenchmark(warmup_ticks=args.warmup, ticks=args.ticks)
+
+    results = []
+    for scenario in args.scenarios:
+        for size in args.sizes:
+            print(f"sim {scenario} {size}...", file=sys.stderr)
+            results.append(benchmark.run(scenario, size))
+
+    return {
+        "benchmark": "sim",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "warmup_ticks": args.warmup,
+        "ticks": args.ticks,
+        "results": results,
+    }
+
+
+def run_render(args):
+    benchmark = RenderBenchmark(frames=args.frames)
+
+    results = []
+    for scenario in args.scenarios:
+        for resolution in args.resolutions:
+            print(f"render {scenario} {resolution[0]}x{resolution[1]}...", file=sys.stderr)
+            results.append(benchmark.run(scenario, resolution))
+
+    return {
+        "benchmark": "render",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pygame": py.version.ver,
+        "frames": args.frames,
+        "results": results,
+    }
+
+
+def resolution(text):
+    width, _, height = text.partition("x")
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+
+
+def find_regressions(report, baseline, tolerance):
+    """(key, metric, before, after) for every metric that got worse by
+    more than `tolerance` (0.25 = 25%)."""
+    kind = report["benchmark"]
+    key_fields = RESULT_KEYS[kind]
+    before_by_key = {tuple(r[field] for field in key_fields): r for r in baseline["results"]}
+
+    regressions = []
+    for result in report["results"]:
+        key = tuple(result[field] for field in key_fields)
+        before = before_by_key.get(key)
+        if before is None:
+            continue
+
+        for group, metric in REGRESSION_METRICS[kind]:
+            old, new = before[group][metric], result[group][metric]
+            if new > old * (1 + tolerance):
+                regressions.append((key, f"{group}.{metric}", old, new))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Satis-Factorio performance benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sim = commands.add_parser("sim", help="simulation tick cost at scale")
+    sim.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    sim.add_argument("--scenarios", nargs="+", choices=FactoryGenerator.SCENARIOS, default=FactoryGenerator.SCENARIOS)
+    sim.add_argument("--warmup", type=int, default=600, help="ticks before measuring")
+    sim.add_argument("--ticks", type=int, default=300, help="ticks measured")
+    sim.set_defaults(run=run_sim)
+
+    render = commands.add_parser("render", help="frame time per render pass, offscreen")
+    render.add_argument("--resolutions", type=resolution, nargs="+", default=RenderBenchmark.DEFAULT_RESOLUTIONS)
+    render.add_argument("--scenarios", nargs="+", choices=FactoryGenerator.SCENARIOS, default=FactoryGenerator.SCENARIOS)
+    render.add_argument("--frames", type=int, default=30, help="frames measured")
+    render.set_defaults(run=run_render)
+
+    for command in (sim, render):
+        command.add_argument("--output", help="write JSON here instead of stdout")
+        command.add_argument("--baseline", help="earlier JSON results to compare against")
+        command.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs. the baseline")
+
+    args = parser.parse_args(argv)
+    report = args.run(args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    status = 0
+    for result in report["results"]:
+        if result.get("save_round_trip") is False:
+            print(f"SAVE ROUND TRIP {result['scenario']} {result['size']}: loaded world diverged", file=sys.stderr)
+            status = 1
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        regressions = find_regressions(report, baseline, args.tolerance)
+        for key, metric, old, new in regressions:
+            print(f"REGRESSION {' '.join(map(str, key))}: {metric} {old:.3f} -> {new:.3f}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
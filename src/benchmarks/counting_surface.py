@@ -0,0 +1,26 @@
+# benchmarks.counting_surface
+import pygame as py
+
+
+class CountingSurface(py.Surface):
+    """A Surface that counts what's blitted onto it - the offscreen target
+    of the render benchmark, so PassTimer can report blits per pass. Still
+    a real Surface, so py.draw and friends take it as usual."""
+
+    def __init__(self, size, flags=0):
+        super().__init__(size, flags)
+        self.blit_count = 0
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        self.blit_count += 1
+        return super().blit(source, dest, area, special_flags)
+
+    def blits(self, blit_sequence, doreturn=True):
+        blit_sequence = list(blit_sequence)
+        self.blit_count += len(blit_sequence)
+        return super().blits(blit_sequence, doreturn)
+
+    def fblits(self, blit_sequence, special_flags=0):
+        blit_sequence = list(blit_sequence)
+        self.blit_count += len(blit_sequence)
+        return super().fblits(blit_sequence, special_flags)
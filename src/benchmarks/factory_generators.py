@@ -0,0 +1,174 @@
+# benchmarks.factory_generators
+from constants.itemdata import iron_ore
+from game.grid import Grid
+from objects.machines.assembler import Assembler
+from objects.machines.smelter import Smelter
+from objects.machines.splitter import Splitter
+from systems.conveyors.belt_system import BeltSystem
+from core.vector2 import Vector2
+
+
+class FactoryGenerator:
+    """Builds synthetic factories into a World for the benchmarks - the
+    same way the game does (BeltSystem._tiles_to_segments,
+    World.add_belt_segment / add_machine), just without a player or any
+    build costs.
+
+    Every pattern is stamped out in rows below the previous one until it
+    adds up to the requested number of entities (belt segments plus
+    machines), so a scenario scales from 1k to 100k entities without
+    changing shape. Belts that start a pattern are listed in `sources`
+    and the ones that end it in `sinks` - feed() and drain() keep items
+    flowing through them between ticks."""
+
+    SCENARIOS = ("belt_lines", "splitter_trees", "smelter_chains", "belt_grid")
+
+    def __init__(self, world, item=iron_ore):
+        self.world = world
+        self.item = item
+        self.belt_system = BeltSystem(world, Grid, None, None)
+
+        self.sources = []
+        self.sinks = []
+
+        self.next_row = 0
+
+    def copy_into(self, world):
+        """A generator that feeds and drains the same belts in `world` - a
+        copy of this one's, like a loaded save of it."""
+        copy = FactoryGenerator(world, self.item)
+        copy.sources = [world.belt_map[seg.grid_pos] for seg in self.sources]
+        copy.sinks = [world.belt_map[seg.grid_pos] for seg in self.sinks]
+        copy.next_row = self.next_row
+        return copy
+
+    def entity_count(self):
+        return len(self.world.belt_segments) + len(self.world.machines)
+
+    def build(self, scenario, entities=0, rows=0, **options):
+        """Stamp out `scenario` until the world holds at least `entities`
+        entities and the patterns cover at least `rows` rows of tiles,
+        then connect everything - once, like a finished build. `options`
+        go to the pattern method, e.g. length=... for belt_lines."""
+        if scenario not in self.SCENARIOS:
+            raise ValueError(f"unknown scenario: {scenario}")
+
+        stamp = getattr(self, scenario)
+        while self.entity_count() < entities or self.next_row < rows:
+            stamp(**options)
+
+        self.belt_system.update_belt_incoming_directions()
+
+    # Patterns - each stamps out one instance at self.next_row
+
+    def belt_lines(self, length=100):
+        """One long straight belt."""
+        y = self._take_rows(1)
+        segments = self._belt([(x, y) for x in range(length)])
+        self.sources.append(segments[0])
+        self.sinks.append(segments[-1])
+
+    def splitter_trees(self, levels=8, branch=10, spacing=3):
+        """A trunk belt with a splitter every `spacing` tiles, each one
+        splitting off a branch up and a branch down and passing the rest
+        on to the next."""
+        y = self._take_rows(2 * branch + 1) + branch
+
+        feeder = self._belt([(0, y), (1, y)])
+        self.sources.append(feeder[0])
+
+        x = 2
+        for level in range(levels):
+            self._machine(Splitter((x, y), Vector2(1, 0)))
+
+            # Splitter facing east: left is down, right is up.
+            down = self._belt([(x, y + dy) for dy in range(1, branch + 1)])
+            up = self._belt([(x, y - dy) for dy in range(1, branch + 1)])
+            self.sinks.extend((down[-1], up[-1]))
+
+            if level == levels - 1:
+                break
+            self._belt([(x + dx, y) for dx in range(1, spacing)])
+            x += spacing
+
+    def smelter_chains(self, feed_length=10, link_length=3, out_length=10, per_row=1):
+        """Ore belt -> smelter -> belt -> assembler -> belt, `per_row` of
+        them side by side."""
+        y = self._take_rows(Assembler.HEIGHT)
+
+        x = 0
+        for _ in range(per_row):
+            ore = self._belt([(x + dx, y + 1) for dx in range(feed_length)])
+            self.sources.append(ore[0])
+            x += feed_length
+
+            self._machine(Smelter((x, y)))
+            x += Smelter.WIDTH
+
+            self._belt([(x + dx, y) for dx in range(link_length)])
+            x += link_length
+
+            self._machine(Assembler((x, y)))
+            x += Assembler.WIDTH
+
+            out = self._belt([(x + dx, y) for dx in range(out_length)])
+            self.sinks.append(out[-1])
+            x += out_length + 1
+
+    def belt_grid(self, width=32, height=32):
+        """A width x height block packed with belt, snaking back and forth
+        row by row - every tile has belts on all sides."""
+        y0 = self._take_rows(height)
+
+        tiles = []
+        for row in range(height):
+            xs = range(width) if row % 2 == 0 else range(width - 1, -1, -1)
+            tiles.extend((x, y0 + row) for x in xs)
+
+        segments = self._belt(tiles)
+        self.sources.append(segments[0])
+        self.sinks.append(segments[-1])
+
+    # Keeping items flowing
+
+    def feed(self):
+        """Put an item on every source belt that has room."""
+        for seg in self.sources:
+            if seg.item is None:
+                seg.receive_item(self.item, seg.direction)
+
+    def drain(self):
+        """Take the item off every sink belt that has one."""
+        for seg in self.sinks:
+            if seg.item is not None:
+                seg.line.remove(seg.line_index)
+
+    def fill(self, spacing=2):
+        """Put an item on every `spacing`-th tile of every empty line, as
+        if the factory had been running for a while - without having to
+        run it that long."""
+        for line in self.world.belt_lines:
+            if line.items:
+                continue
+            line.load_items([
+                (seg, self.item, 0.5, seg.direction)
+                for seg in line.segments[::spacing]
+            ])
+            line.wake()
+
+    # Helpers
+
+    def _take_rows(self, height):
+        y = self.next_row
+        self.next_row += height + 1
+        return y
+
+    def _belt(self, tiles):
+        segments = self.belt_system._tiles_to_segments(tiles)
+        for seg in segments:
+            self.world.add_belt_segment(seg)
+        return segments
+
+    def _machine(self, machine):
+        self.world.add_machine(machine)
+        return machine
@@ -0,0 +1,113 @@
+# benchmarks.render_benchmark
+import os
+import time
+
+import pygame as py
+
+from benchmarks.counting_surface import CountingSurface
+from benchmarks.factory_generators import FactoryGenerator
+from game.grid import Grid
+from game.initializer import Initializer
+from systems.rendering.pass_timer import PassTimer
+
+
+class RenderBenchmark:
+    """Draws frames of a factory that fills the whole view, offscreen - a
+    dummy SDL video driver and a CountingSurface as the target - and
+    reports what each pass of RenderSystem.draw costs per frame: wall time
+    and blits (see PassTimer).
+
+    The game is wired up exactly as Initializer does it and sits in build
+    mode with a machine selected, so the grid and the ghost preview are
+    drawn too. There's no zoom in the game - the camera always shows one
+    pixel per pixel - so a zoomed-out view is simply a bigger resolution:
+    7680x4320 shows as many tiles as 3840x2160 at half zoom would."""
+
+    DEFAULT_RESOLUTIONS = ((1920, 1080), (3840, 2160), (7680, 4320))
+
+    def __init__(self, warmup_frames=5, frames=30, sim_ticks=60):
+        self.warmup_frames = warmup_frames
+        self.frames = frames
+        self.sim_ticks = sim_ticks  # so items have moved and machines are busy
+
+    def run(self, scenario, resolution):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        py.init()
+
+        context = Initializer.init_game(resolution)
+        screen = self._use_counting_surface(context, resolution)
+        generator = self._build_factory(context, scenario, resolution)
+
+        context.camera.x = 0
+        context.camera.y = 0
+        context.build_system.build_mode = "building"
+        context.tick_scheduler.alpha = 0.5
+
+        for _ in range(self.warmup_frames):
+            context.render_system.draw(screen)
+
+        timer = PassTimer()
+        frame_times = []
+        for _ in range(self.frames):
+            start = time.perf_counter()
+            context.render_system.draw(screen, timer)
+            frame_times.append(time.perf_counter() - start)
+            timer.end_frame()
+
+        frame_times.sort()
+        return {
+            "scenario": scenario,
+            "resolution": f"{resolution[0]}x{resolution[1]}",
+            "entities": generator.entity_count(),
+            "frames": timer.frames,
+            "frame_ms": {
+                "mean": sum(frame_times) / len(frame_times) * 1000,
+                "p95": frame_times[round(0.95 * (len(frame_times) - 1))] * 1000,
+                "max": frame_times[-1] * 1000,
+            },
+            "passes": {
+                name: {
+                    "ms": seconds / timer.frames * 1000,
+                    "blits": timer.blits[name] / timer.frames,
+                }
+                for name, seconds in timer.times.items()
+            },
+        }
+
+    @staticmethod
+    def _use_counting_surface(context, resolution):
+        """Point everything that draws at a CountingSurface instead of the
+        display surface - some renderers hold on to the screen they were
+        built with."""
+        screen = CountingSurface(resolution)
+        context.screen = screen
+        context.ghost_machine_renderer.screen = screen
+        context.belt_ghost_preview_controller.screen = screen
+        context.machine_ui.screen = screen
+        context.grid.update_screen_size(*resolution)
+        context.build_mode_renderer.update_overlay_surfaces(*resolution)
+        return screen
+
+    def _build_factory(self, context, scenario, resolution):
+        """`scenario` stamped out until it covers the whole view, with
+        items on the belts."""
+        tiles_wide = resolution[0] // Grid.CELL_SIZE + 1
+        tiles_high = resolution[1] // Grid.CELL_SIZE + 1
+
+        options = {
+            "belt_lines": {"length": tiles_wide},
+            "splitter_trees": {"levels": tiles_wide // 3 + 1},
+            "smelter_chains": {"per_row": tiles_wide // 30 + 1},  # 30 tiles per chain
+            "belt_grid": {"width": tiles_wide},
+        }[scenario]
+
+        generator = FactoryGenerator(context.world)
+        generator.build(scenario, rows=tiles_high, **options)
+        generator.fill()
+
+        for _ in range(self.sim_ticks):
+            generator.feed()
+            context.simulation.step()
+            generator.drain()
+
+        return generator
@@ -0,0 +1,137 @@
+# benchmarks.sim_benchmark
+import gc
+import time
+import tracemalloc
+
+from benchmarks.factory_generators import FactoryGenerator
+from game.grid import Grid
+from game.replay import Replay
+from game.save_game import SaveGame
+from game.simulation import Simulation
+from objects.conveyors.belt_segment import BeltSegment
+from systems.conveyors.belt_system import BeltSystem
+
+
+class SimBenchmark:
+    """Measures what a tick of the simulation costs as the factory grows:
+    one FactoryGenerator scenario at one size per run().
+
+    - memory: bytes allocated (tracemalloc) to build and connect the
+      factory, per entity
+    - connectivity: a full recompute of belt connections over every
+      segment, and the incremental one after replacing a single belt
+    - ticks: wall time of Simulation.step() alone - feeding and draining
+      the factory happens between steps, outside the timer
+    - save_round_trip: whether the factory, saved and loaded into a fresh
+      Simulation at the end, runs on exactly like the original (same
+      Replay.world_digest after round_trip_ticks more ticks)
+
+    Results are plain dicts, ready for json.dump."""
+
+    def __init__(self, warmup_ticks=600, ticks=300, dt=Simulation.DEFAULT_DT, round_trip_ticks=120):
+        self.warmup_ticks = warmup_ticks
+        self.ticks = ticks
+        self.dt = dt
+        self.round_trip_ticks = round_trip_ticks
+
+    def run(self, scenario, entities):
+        gc.collect()
+        tracemalloc.start()
+        build_start = time.perf_counter()
+
+        sim = Simulation.headless()
+        generator = FactoryGenerator(sim.world)
+        generator.build(scenario, entities)
+
+        build_time = time.perf_counter() - build_start
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        world = sim.world
+        count = generator.entity_count()
+
+        result = {
+            "scenario": scenario,
+            "size": entities,
+            "entities": count,
+            "belt_segments": len(world.belt_segments),
+            "machines": len(world.machines),
+            "transport_lines": len(world.belt_lines),
+            "build_s": build_time,  # with tracemalloc on, so inflated
+            "memory_bytes": allocated,
+            "bytes_per_entity": allocated / count,
+            "connectivity": self._time_connectivity(generator),
+        }
+        result["ticks"] = self._time_ticks(sim, generator)
+        result["save_round_trip"] = self._check_round_trip(sim, generator)
+        return result
+
+    def _time_connectivity(self, generator):
+        world = generator.world
+        belt_system = generator.belt_system
+
+        start = time.perf_counter()
+        belt_system.update_belt_incoming_directions(list(world.belt_segments))
+        full = time.perf_counter() - start
+
+        # Replace the belt in the middle of the world, as a player would.
+        segments = list(world.belt_segments)
+        old = segments[len(segments) // 2]
+        new = BeltSegment(old.grid_pos, old.direction, [], belt_type=old.belt_type)
+        world.remove_belt_segment(old)
+        world.add_belt_segment(new)
+
+        # It may have been a source or a sink - keep feeding and draining
+        # the belt that's actually there.
+        generator.sources = [new if seg is old else seg for seg in generator.sources]
+        generator.sinks = [new if seg is old else seg for seg in generator.sinks]
+
+        start = time.perf_counter()
+        belt_system.update_belt_incoming_directions()
+        incremental = time.perf_counter() - start
+
+        return {"full_ms": full * 1000, "incremental_ms": incremental * 1000}
+
+    def _time_ticks(self, sim, generator):
+        for _ in range(self.warmup_ticks):
+            generator.feed()
+            sim.step(self.dt)
+            generator.drain()
+
+        times = []
+        for _ in range(self.ticks):
+            generator.feed()
+            start = time.perf_counter()
+            sim.step(self.dt)
+            times.append(time.perf_counter() - start)
+            generator.drain()
+
+        world = sim.world
+        times.sort()
+        return {
+            "count": len(times),
+            "mean_ms": sum(times) / len(times) * 1000,
+            "p50_ms": self._percentile(times, 50) * 1000,
+            "p95_ms": self._percentile(times, 95) * 1000,
+            "max_ms": times[-1] * 1000,
+            "active_lines": len(world.active_lines),
+            "active_machines": len(world.active_machines),
+            "fast_lines": int(world.belt_store.fast.sum()) if world.belt_store is not None else 0,
+        }
+
+    def _check_round_trip(self, sim, generator):
+        loaded = Simulation.headless()
+        SaveGame.loads(SaveGame.dumps(sim.world, None), loaded.world, None, BeltSystem(loaded.world, Grid, None, None))
+        loaded_generator = generator.copy_into(loaded.world)
+
+        for _ in range(self.round_trip_ticks):
+            for simulation, feeder in ((sim, generator), (loaded, loaded_generator)):
+                feeder.feed()
+                simulation.step(self.dt)
+                feeder.drain()
+        return Replay.world_digest(sim.world) == Replay.world_digest(loaded.world)
+
+    @staticmethod
+    def _percentile(sorted_values, percent):
+        index = round(percent / 100 * (len(sorted_values) - 1))
+        return sorted_values[index]
@@ -1,5 +1,6 @@
 # constants.itemdata
 from entities.item import Item
+from entities.item_registry import ItemRegistry
 
 raw_materials = []
 limestone = Item("limestone", "Limestone")
@@ -31,10 +32,13 @@ standard_parts.extend([iron_plate, iron_rod])
 ITEMS = [raw_materials, ingots, minerals, standard_parts]
 ITEMS = [item for category in ITEMS for item in category]
 
+ITEM_REGISTRY = ItemRegistry(ITEMS)
+
 
 
 def get_item_by_id(item_id):
-    for item in ITEMS:
-        if item.item_id == item_id:
-            return item
-    return None
\ No newline at end of file
+    return ITEM_REGISTRY.get(item_id)
+
+
+def get_item_by_index(index):
+    return ITEM_REGISTRY.item(index)
\ No newline at end of file
@@ -1,4 +1,7 @@
 # constants.recipes
+from constants.itemdata import ITEM_REGISTRY
+
+
 class Recipe:
     """example: Recipe(
             name = "Name", 
@@ -14,6 +17,23 @@ class Recipe:
         if process_time <= 0:
             raise ValueError("process_time must be greater than 0")
 
+        self._input_ids = None
+        self._output_ids = None
+
+    @property
+    def input_ids(self):
+        """(item_id, registry index, amount) per input - what the
+        simulation works with, looked up once."""
+        if self._input_ids is None:
+            self._input_ids = [(item_id, ITEM_REGISTRY.index_of(item_id), amount) for item_id, amount in self.inputs.items()]
+        return self._input_ids
+
+    @property
+    def output_ids(self):
+        if self._output_ids is None:
+            self._output_ids = [(item_id, ITEM_REGISTRY.index_of(item_id), amount) for item_id, amount in self.outputs.items()]
+        return self._output_ids
+
 
     def outputs_per_minute(self):
         result = {}
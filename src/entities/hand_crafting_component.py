@@ -19,7 +19,7 @@ class HandcraftingComponent:
         if not recipe or not self.inventory.has_enough_items(recipe.inputs):
             return "no_inputs"
 
-        scratch = self.inventory.clone()
+        scratch = self.inventory.begin()
         scratch.try_remove_items(recipe.inputs)
         for item_id, amount in recipe.outputs.items():
             if not scratch.try_add_items(item_id, amount):
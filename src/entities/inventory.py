@@ -1,99 +1,146 @@
 # entities.inventory
-from entities.item import Item
+import heapq
+from bisect import insort
+
+from constants.itemdata import ITEM_REGISTRY
 
 class Inventory:
+    """A grid of slots, each None or {"item": ItemRegistry index, "amount": n},
+    indexed per item so lookups never scan the grid."""
+
     MAX_STACK_SIZE = 100
     def __init__(self, slot_width:int, slot_height:int):
-        self.width = slot_width
-        self.height = slot_height
         self.slots = [[None for _ in range(slot_width)] for _ in range(slot_height)] # creates a 2D list of None values representing empty slots
 
+    @property
+    def slots(self):
+        return self._slots
+
+    @slots.setter
+    def slots(self, slots):
+        # Slot dicts are read-only from outside - assigning a new grid (as
+        # loading a save does) is what rebuilds the indexes.
+        self._slots = slots
+        self.height = len(slots)
+        self.width = len(slots[0]) if slots else 0
+
+        self._totals = {}    # item index -> amount, so get_amount never scans
+        self._room = {}      # item index -> what its stacks can still take, for can_add_items
+        self._holding = {}   # item index -> slot numbers (y * width + x) holding it, in grid order
+        self._free = []      # heap of empty slot numbers - new stacks go in the first one
+
+        for y, row in enumerate(slots):
+            for x, slot in enumerate(row):
+                number = y * self.width + x
+                if slot is None:
+                    self._free.append(number)
+                    continue
+                item_id = slot["item"]
+                self._totals[item_id] = self._totals.get(item_id, 0) + slot["amount"]
+                self._room[item_id] = self._room.get(item_id, 0) + self.MAX_STACK_SIZE - slot["amount"]
+                self._holding.setdefault(item_id, []).append(number)
+        heapq.heapify(self._free)
+
     def clone(self):
-        """A disposable copy for dry-running a sequence of add/remove
-        operations before committing them to the real inventory."""
+        """A full, independent copy. For dry runs, begin() is far
+        cheaper."""
         copy = Inventory(self.width, self.height)
         copy.slots = [[dict(slot) if slot else None for slot in row] for row in self.slots]
         return copy
 
+    def begin(self):
+        """An InventoryTransaction on this inventory - stage adds and
+        removes, see whether they work out, then commit() or drop it."""
+        return InventoryTransaction(self)
+
+    def _slot(self, number):
+        return self._slots[number // self.width][number % self.width]
+
     def try_add_items(self, item, amount):
-        if isinstance(item, Item): item_id = item.item_id
-        else: item_id = item
+        item_id = ITEM_REGISTRY.index_of(item)
 
+        if amount <= 0: return True
         if not self.can_add_items(item_id, amount): return False  # Not enough space to add items
 
         remaining = amount
 
         # First, try to fill existing stacks
-        for y in range(self.height):
-            for x in range(self.width):
-                slot = self.slots[y][x]
-                if slot and slot["item"] == item_id and slot["amount"] < self.MAX_STACK_SIZE:
+        if self._room.get(item_id, 0) > 0:
+            for number in self._holding[item_id]:
+                slot = self._slot(number)
+                if slot["amount"] < self.MAX_STACK_SIZE:
                     can_add = min(self.MAX_STACK_SIZE - slot["amount"], remaining)
                     slot["amount"] += can_add
                     remaining -= can_add
                     if remaining == 0:
-                        return True
+                        break
 
         # Then, add to empty slots
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.slots[y][x] is None:
-                    to_add = min(self.MAX_STACK_SIZE, remaining)
-                    self.slots[y][x] = {"item": item_id, "amount": to_add}
-                    remaining -= to_add
-                    if remaining == 0:
-                        return True
-        return remaining == 0
+        while remaining > 0:
+            number = heapq.heappop(self._free)
+            to_add = min(self.MAX_STACK_SIZE, remaining)
+            self._slots[number // self.width][number % self.width] = {"item": item_id, "amount": to_add}
+            insort(self._holding.setdefault(item_id, []), number)
+            self._room[item_id] = self._room.get(item_id, 0) + self.MAX_STACK_SIZE
+            remaining -= to_add
+
+        self._totals[item_id] = self._totals.get(item_id, 0) + amount
+        self._room[item_id] -= amount
+        return True
 
-    
-    def can_add_items(self, item_id: str, amount: int) -> bool:
-        # Check if the inventory could add a specific amount of an item, return Tre if it can, else False
-        remaining = amount
 
-        for y in range(self.height):
-            for x in range(self.width):
-                slot = self.slots[y][x]
+    def can_add_items(self, item_id: str, amount: int) -> bool:
+        return self.space_for(item_id) >= amount
 
-                if slot is None: remaining -= self.MAX_STACK_SIZE
-                # Empty slot can take a full stack
-                    
-                elif slot["item"] == item_id: remaining -= (self.MAX_STACK_SIZE - slot["amount"])
-                # Slot already contains this item, can add up to the stack limit
-                    
-                if remaining <= 0: return True
-        return False
+    def space_for(self, item_id) -> int:
+        # Room in this item's stacks plus a full stack per empty slot
+        item_id = ITEM_REGISTRY.index_of(item_id)
+        return self._room.get(item_id, 0) + len(self._free) * self.MAX_STACK_SIZE
 
     def try_remove_item(self, item_id: str, amount: int) -> bool:
         # Tries to remove a specific amount of an item of the inventory, returns True if successful, else False
 
+        item_id = ITEM_REGISTRY.index_of(item_id)
         remaining = amount
 
-        for y in range(self.height):
-            for x in range(self.width):
-                slot = self.slots[y][x]
+        holding = self._holding.get(item_id)
+        if not holding:
+            return False
+
+        emptied = 0
+        for number in holding:
+            slot = self._slot(number)
 
-                if slot and slot["item"] == item_id:
-                    # Remove as much as possible from this slot
-                    to_remove = min(slot["amount"], remaining)
-                    slot["amount"] -= to_remove
-                    remaining -= to_remove
+            # Remove as much as possible from this slot
+            to_remove = min(slot["amount"], remaining)
+            slot["amount"] -= to_remove
+            remaining -= to_remove
 
-                    # If slot is empty after removal, set it to None
-                    if slot["amount"] == 0: self.slots[y][x] = None
+            # If slot is empty after removal, set it to None
+            if slot["amount"] == 0:
+                self._slots[number // self.width][number % self.width] = None
+                heapq.heappush(self._free, number)
+                emptied += 1
 
-                    if remaining == 0: return True
+            if remaining == 0: break
 
-        return False  # Not enough items to remove
+        # Emptied slots are always the first ones in grid order.
+        del holding[:emptied]
+        removed = amount - remaining
+        self._totals[item_id] -= removed
+        self._room[item_id] += removed - emptied * self.MAX_STACK_SIZE
+        if not holding:
+            del self._holding[item_id], self._totals[item_id], self._room[item_id]
+
+        return remaining == 0  # False: not enough items to remove (what there was is gone)
 
     def get_amount(self, item_id: str) -> int:
         # Get the total amount of a specific item in the inventory
+        return self._totals.get(ITEM_REGISTRY.index_of(item_id), 0)
 
-        total = 0
-        for row in self.slots:
-            for slot in row:
-                if slot and slot["item"] == item_id:
-                    total += slot["amount"]
-        return total
+    def contents(self):
+        """{item index: amount} of everything in here."""
+        return dict(self._totals)
 
     def has_enough_items(self, items: dict[str, int]) -> bool:
         for item_id, amount in items.items():
@@ -106,4 +153,180 @@ class Inventory:
 
         if not self.has_enough_items(items): return False
         for item_id, amount in items.items(): self.try_remove_item(item_id, amount)
-        return True
\ No newline at end of file
+        return True
+
+
+def transfer(src, dst, item, max_n=None):
+    """Move as many of `item` as src has, dst has room for and max_n
+    allows (None: no limit) from one inventory to another - either can
+    be an InventoryTransaction - as one remove and one add rather than
+    item by item. Returns how many moved."""
+    item_id = ITEM_REGISTRY.index_of(item)
+    count = min(src.get_amount(item_id), dst.space_for(item_id))
+    if max_n is not None:
+        count = min(count, max_n)
+    if count > 0:
+        src.try_remove_item(item_id, count)
+        dst.try_add_items(item_id, count)
+    return max(count, 0)
+
+
+class InventoryTransaction:
+    """Staged adds/removes against an Inventory; commit() replays them,
+    rollback() discards them. Don't change the inventory while one is open."""
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+
+        self._amounts = {}    # (item index, slot number) -> staged amount, 0 if emptied
+        self._added = {}      # item index -> sorted slot numbers of stacks started here
+        self._totals = {}     # item index -> change in total
+        self._room = {}       # item index -> change in room left in its stacks
+        self._taken = set()   # slots empty in the inventory, filled here
+        self._released = []   # heap of the inventory's stacks emptied here
+        self._log = []        # (method name, item index, amount) to replay on commit
+
+    def _stacks(self, item_id):
+        """(slot number, amount) of every stack of item_id as staged, in
+        grid order - lazily, so a walk that stops early reads no more."""
+        inventory = self.inventory
+        amounts = self._amounts
+        numbers = inventory._holding.get(item_id, ())
+        added = self._added.get(item_id)
+        if added:
+            numbers = heapq.merge(numbers, added)
+
+        for number in numbers:
+            amount = amounts.get((item_id, number))
+            if amount is None:
+                amount = inventory._slot(number)["amount"]
+            if amount:
+                yield number, amount
+
+    def _take_free_slot(self):
+        # The lowest empty slot, like the inventory's own heap would give.
+        free = self.inventory._free
+        base = next((number for number in heapq.nsmallest(len(self._taken) + 1, free) if number not in self._taken), None)
+        if self._released and (base is None or self._released[0] < base):
+            return heapq.heappop(self._released)
+        self._taken.add(base)
+        return base
+
+    def _free_count(self):
+        return len(self.inventory._free) - len(self._taken) + len(self._released)
+
+    def _change(self, item_id, total, room):
+        self._totals[item_id] = self._totals.get(item_id, 0) + total
+        self._room[item_id] = self._room.get(item_id, 0) + room
+
+    def get_amount(self, item_id):
+        item_id = ITEM_REGISTRY.index_of(item_id)
+        return self.inventory._totals.get(item_id, 0) + self._totals.get(item_id, 0)
+
+    def has_enough_items(self, items):
+        for item_id, amount in items.items():
+            if self.get_amount(item_id) < amount:
+                return False
+        return True
+
+    def _room_for(self, item_id):
+        return self.inventory._room.get(item_id, 0) + self._room.get(item_id, 0)
+
+    def can_add_items(self, item_id, amount):
+        return self.space_for(item_id) >= amount
+
+    def space_for(self, item_id):
+        item_id = ITEM_REGISTRY.index_of(item_id)
+        return self._room_for(item_id) + self._free_count() * Inventory.MAX_STACK_SIZE
+
+    def try_add_items(self, item, amount):
+        item_id = ITEM_REGISTRY.index_of(item)
+
+        if amount <= 0: return True
+        if not self.can_add_items(item_id, amount): return False
+
+        self._log.append(("try_add_items", item_id, amount))
+        remaining = amount
+
+        # First, fill existing stacks
+        if self._room_for(item_id) > 0:
+            for number, stack_amount in list(self._stacks(item_id)):
+                can_add = min(Inventory.MAX_STACK_SIZE - stack_amount, remaining)
+                if can_add:
+                    self._amounts[(item_id, number)] = stack_amount + can_add
+                    remaining -= can_add
+                    if remaining == 0:
+                        break
+
+        # Then, start new ones in empty slots
+        while remaining > 0:
+            number = self._take_free_slot()
+            to_add = min(Inventory.MAX_STACK_SIZE, remaining)
+            if self._amounts.get((item_id, number)) != 0:
+                # Not one of its own stacks, emptied earlier in here
+                insort(self._added.setdefault(item_id, []), number)
+            self._amounts[(item_id, number)] = to_add
+            self._room[item_id] = self._room.get(item_id, 0) + Inventory.MAX_STACK_SIZE
+            remaining -= to_add
+
+        self._change(item_id, amount, -amount)
+        return True
+
+    def try_remove_item(self, item_id, amount):
+        item_id = ITEM_REGISTRY.index_of(item_id)
+        if self.get_amount(item_id) == 0:
+            return False
+
+        self._log.append(("try_remove_item", item_id, amount))
+        remaining = amount
+        emptied = []
+        for number, stack_amount in self._stacks(item_id):
+            to_remove = min(stack_amount, remaining)
+            self._amounts[(item_id, number)] = stack_amount - to_remove
+            remaining -= to_remove
+            if to_remove == stack_amount:
+                emptied.append(number)
+            if remaining == 0: break
+
+        added = self._added.get(item_id, ())
+        for number in emptied:
+            if number in added:
+                added.remove(number)
+                del self._amounts[(item_id, number)]
+                if number in self._taken:
+                    self._taken.discard(number)
+                    continue
+            heapq.heappush(self._released, number)
+
+        removed = amount - remaining
+        self._change(item_id, -removed, removed - len(emptied) * Inventory.MAX_STACK_SIZE)
+        return remaining == 0
+
+    def try_remove_items(self, items):
+        if not self.has_enough_items(items): return False
+        for item_id, amount in items.items(): self.try_remove_item(item_id, amount)
+        return True
+
+    def copy(self):
+        """Another transaction on the same inventory with everything staged
+        here staged in it too - to try more on top without touching this
+        one."""
+        copy = InventoryTransaction(self.inventory)
+        for method, item_id, amount in self._log:
+            getattr(copy, method)(item_id, amount)
+        return copy
+
+    def commit(self):
+        inventory = self.inventory
+        for method, item_id, amount in self._log:
+            getattr(inventory, method)(item_id, amount)
+        self.rollback()
+
+    def rollback(self):
+        self._amounts.clear()
+        self._added.clear()
+        self._totals.clear()
+        self._room.clear()
+        self._taken.clear()
+        self._released.clear()
+        self._log.clear()
@@ -3,13 +3,6 @@ import pygame as py
 import os
 
 class Item:
-    def __init__(self, item_id:str, name:str, stack_size=100, sprite_path=None):
-        self.item_id = item_id
-        self.name = name
-        self.stack_size = stack_size
-        self.sprite_path = sprite_path
-        self.sprite = None
-
     def __init__(self, item_id:str, name:str, stack_size=100, sprite_path=None):
         self.item_id = item_id
         self.name = name
@@ -18,6 +11,9 @@ class Item:
         self.sprite = None
         self._scaled_sprite_cache = {}
 
+        # Dense integer id - set by ItemRegistry.register.
+        self.index = None
+
     def load_sprite(self):
         if self.sprite_path and os.path.isfile(self.sprite_path):
             self.sprite = py.image.load(self.sprite_path).convert_alpha()
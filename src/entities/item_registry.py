@@ -0,0 +1,54 @@
+# entities.item_registry
+from entities.item import Item
+
+
+class ItemRegistry:
+    """Every Item the game knows, each given a dense integer id when it's
+    registered - Item.index, 0, 1, 2, ... in registration order - with
+    O(1) lookups both ways: index -> Item is a list lookup, item_id ->
+    Item a dict lookup.
+
+    The simulation carries the index (inventory slots, Recipe.input_ids /
+    output_ids) or the Item itself (belts, splitters), so comparing and
+    hashing items never touches a string, and anything per item type can
+    be a plain array indexed by it. The string item_id stays what save
+    files, build costs and recipes are written in - index_of() turns any
+    of the three into the index at that boundary."""
+
+    def __init__(self, items=()):
+        self.items = []  # index -> Item
+        self.by_id = {}  # item_id -> Item
+
+        for item in items:
+            self.register(item)
+
+    def register(self, item):
+        if item.item_id in self.by_id:
+            raise ValueError(f"item {item.item_id!r} is already registered")
+
+        item.index = len(self.items)
+        self.items.append(item)
+        self.by_id[item.item_id] = item
+        return item.index
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, item_id):
+        """The Item with this string id, or None."""
+        return self.by_id.get(item_id)
+
+    def item(self, index):
+        return self.items[index]
+
+    def index_of(self, item):
+        """The index of an Item, a string item_id or an index. Raises
+        KeyError for an item_id nobody registered."""
+        if isinstance(item, int):
+            return item
+        if isinstance(item, Item):
+            return item.index
+        return self.by_id[item].index
+
+    def item_id_of(self, index):
+        return self.items[index].item_id
@@ -0,0 +1,72 @@
+# game.active_set
+
+
+class ActiveSet:
+    """The entities the Simulation actually updates this tick - only the
+    ones with work to do. Everything else is asleep and costs nothing
+    until something wakes it again, so a tick scales with how much of the
+    factory is moving rather than with how big it is.
+
+    Insertion ordered (dict as an ordered set) so updates run in a
+    stable, reproducible order with O(1) wake and sleep."""
+
+    def __init__(self):
+        self._entities = {}
+
+    def wake(self, entity):
+        self._entities[entity] = None
+
+    def sleep(self, entity):
+        self._entities.pop(entity, None)
+
+    def snapshot(self):
+        """A copy to iterate over while entities wake and sleep."""
+        return list(self._entities)
+
+    def __contains__(self, entity):
+        return entity in self._entities
+
+    def __iter__(self):
+        return iter(self._entities)
+
+    def __len__(self):
+        return len(self._entities)
+
+
+class Wakeable:
+    """Mixed into everything the Simulation updates. `active_set` is set
+    by the World while the entity is part of it - outside a World (a
+    preview, a removed machine) waking does nothing.
+
+    An entity that goes to sleep because whatever it feeds is full calls
+    wait_on(target) first; the target wakes it again from wake_waiters()
+    as soon as it has room. Waiters are kept in an ordered dict too."""
+
+    active_set = None
+    waiters = None
+
+    def wake(self):
+        if self.active_set is not None:
+            self.active_set.wake(self)
+
+    def sleep(self):
+        if self.active_set is not None:
+            self.active_set.sleep(self)
+
+    def wait_on(self, target):
+        if target.waiters is None:
+            target.waiters = {}
+        target.waiters[self] = None
+        target.on_waiter_added()
+
+    def on_waiter_added(self):
+        pass
+
+    def wake_waiters(self):
+        if not self.waiters:
+            return
+
+        waiters = self.waiters
+        self.waiters = None
+        for waiter in waiters:
+            waiter.wake()
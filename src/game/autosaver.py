@@ -0,0 +1,79 @@
+# game.autosaver
+import threading
+import time
+
+from game.save_game import SaveGame
+
+
+class Autosaver:
+    """Saves the game every `interval` seconds without stalling a frame.
+
+    Only SaveGame.snapshot() runs on the game loop - called from update()
+    right after the TickScheduler, i.e. between two ticks, so the copy is
+    consistent. Packing, compressing and writing it happen on a worker
+    thread while the game keeps running; the file is swapped in
+    atomically once it's complete (SaveGame.write_file).
+
+    At most one save is in flight. If the previous one is still being
+    written when the next is due, that one waits for the next update()."""
+
+    DEFAULT_INTERVAL = 300.0  # seconds
+
+    def __init__(self, world, player, path, interval=DEFAULT_INTERVAL):
+        if interval <= 0:
+            raise ValueError("interval must be greater than 0")
+
+        self.world = world
+        self.player = player
+        self.path = path
+        self.interval = interval
+
+        self.elapsed = 0.0
+        self._thread = None
+
+        # For the curious (and the profiler overlay): how long the last
+        # snapshot held up the game loop, how long the whole save took,
+        # and what went wrong, if anything.
+        self.last_snapshot_time = None
+        self.last_save_time = None
+        self.last_error = None
+
+    @property
+    def saving(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def update(self, dt):
+        """Call once per frame, between ticks."""
+        self.elapsed += dt
+        if self.elapsed >= self.interval and not self.saving:
+            self.save_now()
+
+    def save_now(self):
+        """Snapshot right away and write it in the background. False if a
+        save is still in flight."""
+        if self.saving:
+            return False
+
+        self.elapsed = 0.0
+
+        start = time.perf_counter()
+        snapshot = SaveGame.snapshot(self.world, self.player)
+        self.last_snapshot_time = time.perf_counter() - start
+
+        self._thread = threading.Thread(target=self._write, args=(snapshot, start), name="autosave", daemon=True)
+        self._thread.start()
+        return True
+
+    def _write(self, snapshot, start):
+        try:
+            SaveGame.write_file(self.path, SaveGame.encode(snapshot, compress=True))
+            self.last_error = None
+        except Exception as error:  # keep playing - just report it
+            self.last_error = error
+        self.last_save_time = time.perf_counter() - start
+
+    def wait(self, timeout=None):
+        """Block until the save in flight (if any) is on disk - e.g. before
+        quitting."""
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,129 @@
+# game.blueprint
+from core.vector2 import Vector2
+from game.save_game import SaveGame
+from objects.conveyors.belt_segment import BeltSegment
+from objects.machines.splitter import Splitter
+
+
+def create_machine(machine_class_name, grid_pos, rotation_steps=0):
+    """A new machine by saved class name - splitters turned
+    `rotation_steps` quarter turns clockwise from facing right."""
+    machine_class = SaveGame.MACHINE_CLASSES[machine_class_name]
+    if machine_class is Splitter:
+        x, y = SaveGame.DIRECTIONS[rotation_steps]
+        machine = Splitter(grid_pos=grid_pos, direction=Vector2(x, y))
+        machine.rotation_angle = rotation_steps * 90
+        return machine
+    return machine_class(grid_pos=grid_pos)
+
+
+class Blueprint:
+    """A copied rectangle of the factory - belts with their facing and
+    type, machines with their recipe, splitters with their rotation - as
+    offsets from its top left tile, ready to be stamped anywhere else.
+    Items, machine contents and progress aren't part of it.
+
+    Stamping (commands.PasteBlueprint) builds all of it at once: one
+    check that the aggregate cost is affordable, one bulk insert into the
+    World, and the one connectivity update of its CommandRunner batch."""
+
+    def __init__(self, size, belts, machines):
+        self.size = tuple(size)  # (width, height) in tiles
+        self.belts = [(tuple(offset), tuple(direction), belt_type) for offset, direction, belt_type in belts]
+        self.machines = [  # (class name, offset, rotation steps, recipe name)
+            (name, tuple(offset), rotation_steps, recipe_name)
+            for name, offset, rotation_steps, recipe_name in machines
+        ]
+
+    @classmethod
+    def capture(cls, world, corner, other_corner):
+        """Everything inside the rectangle between two corner tiles
+        (inclusive). Machines only count if they're entirely inside."""
+        (x1, y1), (x2, y2) = corner, other_corner
+        left, top = min(x1, x2), min(y1, y2)
+        right, bottom = max(x1, x2), max(y1, y2)
+
+        cells = [(x, y) for y in range(top, bottom + 1) for x in range(left, right + 1)]
+        segments, machines = world.gather_occupants(cells)
+
+        def inside(cell):
+            return left <= cell[0] <= right and top <= cell[1] <= bottom
+
+        belts = [
+            ((seg.grid_pos[0] - left, seg.grid_pos[1] - top), (int(seg.direction.x), int(seg.direction.y)), seg.belt_type)
+            for seg in segments
+        ]
+
+        machine_specs = []
+        for machine in machines:
+            if not all(inside(cell) for cell in machine.occupied_cells):
+                continue
+
+            rotation_steps = 0
+            if isinstance(machine, Splitter):
+                rotation_steps = SaveGame.DIRECTIONS.index((int(machine.direction.x), int(machine.direction.y)))
+            recipe = getattr(machine, "recipe", None)
+            offset = (machine.grid_pos[0] - left, machine.grid_pos[1] - top)
+            machine_specs.append((type(machine).__name__, offset, rotation_steps, recipe.name if recipe else None))
+
+        return cls((right - left + 1, bottom - top + 1), belts, machine_specs)
+
+    def __len__(self):
+        return len(self.belts) + len(self.machines)
+
+    def cells(self, origin):
+        """Every tile the blueprint covers when stamped with its top left
+        at `origin`."""
+        ox, oy = origin
+        cells = [(ox + dx, oy + dy) for (dx, dy), _, _ in self.belts]
+        for name, (dx, dy), _, _ in self.machines:
+            machine_class = SaveGame.MACHINE_CLASSES[name]
+            cells += [
+                (ox + dx + x, oy + dy + y)
+                for x in range(machine_class.WIDTH)
+                for y in range(machine_class.HEIGHT)
+            ]
+        return cells
+
+    def build_cost(self, belt_costs):
+        """What stamping it costs altogether. `belt_costs` is
+        BeltSystem.BUILD_COSTS."""
+        total = {}
+        for _, _, belt_type in self.belts:
+            for item_id, amount in belt_costs[belt_type].items():
+                total[item_id] = total.get(item_id, 0) + amount
+        for name, _, _, _ in self.machines:
+            for item_id, amount in SaveGame.MACHINE_CLASSES[name].BUILD_COST.items():
+                total[item_id] = total.get(item_id, 0) + amount
+        return total
+
+    def create_entities(self, origin):
+        """New belt segments and machines (recipes selected) for a stamp
+        with its top left at `origin`, not yet in any World."""
+        ox, oy = origin
+        segments = [
+            BeltSegment((ox + dx, oy + dy), Vector2(*direction), [], belt_type=belt_type)
+            for (dx, dy), direction, belt_type in self.belts
+        ]
+
+        machines = []
+        for name, (dx, dy), rotation_steps, recipe_name in self.machines:
+            machine = create_machine(name, (ox + dx, oy + dy), rotation_steps)
+            if hasattr(machine, "recipes"):
+                recipe = next((recipe for recipe in machine.recipes if recipe.name == recipe_name), None)
+                # A new machine is empty - nothing to hand back to anyone.
+                machine.set_recipe(recipe, player_inventory=None)
+            machines.append(machine)
+
+        return segments, machines
+
+    def to_record(self):
+        return [
+            list(self.size),
+            [[list(offset), list(direction), belt_type] for offset, direction, belt_type in self.belts],
+            [[name, list(offset), rotation_steps, recipe_name] for name, offset, rotation_steps, recipe_name in self.machines],
+        ]
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(*record)
@@ -0,0 +1,25 @@
+# game.chunk
+
+
+class Chunk:
+    """A SIZE x SIZE block of tiles and everything built on it. World
+    keeps one per block that has anything in it, so finding what's on
+    screen (or near the player) only looks at a handful of chunks instead
+    of every belt and machine in the world.
+
+    Entities are kept in dicts used as ordered sets - O(1) removal,
+    stable iteration order. A machine straddling a chunk border is listed
+    in every chunk it covers, and a TransportLine in every chunk one of
+    its segments is in."""
+
+    SIZE = 32
+
+    def __init__(self, chunk_pos):
+        self.chunk_pos = chunk_pos
+
+        self.belt_segments = {}
+        self.machines = {}
+        self.belt_lines = {}
+
+    def is_empty(self):
+        return not (self.belt_segments or self.machines or self.belt_lines)
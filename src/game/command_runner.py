@@ -0,0 +1,82 @@
+# game.command_runner
+
+
+class CommandRunner:
+    """Where the game's build actions end up: BuildSystem, the machine UI
+    and the input cheats submit() their Commands instead of changing the
+    World themselves, and Game flushes the queue once per frame, right
+    before the next tick - so a change never lands halfway through a
+    step, and every command of the frame is applied as one batch.
+
+    A batch costs one belt connectivity update however many commands are
+    in it - a dragged belt, a region deleted, a blueprint pasted. The
+    commands are applied in the order they were submitted.
+
+    Nothing is applied until the flush, so the game's actions go in
+    through try_submit(), which checks each command against the world and
+    inventory as the queue will leave them, not as they are now - two
+    machines clicked down in one frame can't both be paid for with the
+    same ingots.
+
+    That's also the one place every change to the factory goes through,
+    so a ReplayRecorder, while one is attached, logs each of them against
+    the tick it was applied before."""
+
+    def __init__(self, world, belt_system, player):
+        self.world = world
+        self.belt_system = belt_system
+        self.player = player
+
+        self.queue = []
+        self.recorder = None
+
+        # What the queued commands do: their costs and refunds staged on
+        # the player's inventory, and every tile they change (dict as an
+        # ordered set). Dropped on flush.
+        self.staged = player.inventory.begin()
+        self.pending_tiles = {}
+
+    def submit(self, command):
+        """Queue `command` unchecked - a replay's commands were checked
+        when they were recorded."""
+        self.queue.append(command)
+
+    def try_submit(self, command):
+        """Queue `command` if it still works out after everything queued
+        ahead of it: none of its tiles changed by them, and its costs and
+        refunds fitting on top of theirs. False (and nothing queued) if
+        not."""
+        tiles = command.tiles(self.world)
+        if any(tile in self.pending_tiles for tile in tiles):
+            return False
+
+        if not command.stage(self.world, self.belt_system, self.staged):
+            # Take back whatever it staged before it failed.
+            self.staged.rollback()
+            for queued in self.queue:
+                queued.stage(self.world, self.belt_system, self.staged)
+            return False
+
+        self.queue.append(command)
+        for tile in tiles:
+            self.pending_tiles[tile] = None
+        return True
+
+    def flush(self):
+        """Apply everything submitted since the last flush, then bring
+        belt connectivity up to date once. Returns how many commands
+        ran."""
+        if not self.queue:
+            return 0
+
+        batch, self.queue = self.queue, []
+        self.staged.rollback()
+        self.pending_tiles = {}
+
+        for command in batch:
+            command.apply(self.world, self.belt_system, self.player)
+            if self.recorder is not None:
+                self.recorder.record(command)
+
+        self.belt_system.update_belt_incoming_directions()
+        return len(batch)
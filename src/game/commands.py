@@ -0,0 +1,349 @@
+# game.commands
+from core.vector2 import Vector2
+from entities.inventory import transfer
+from game.blueprint import Blueprint, create_machine
+from objects.conveyors.belt_segment import BeltSegment
+
+
+class CommandError(Exception):
+    """A command that can't be carried out after all - its cost can't be
+    paid, or its refunds don't fit in the player's inventory. Live that
+    never happens (CommandRunner.try_submit() checks every command against
+    the ones queued ahead of it); from a replay it means the log doesn't
+    fit its initial state."""
+
+
+class Command:
+    """One change to the factory the player asked for, with everything it
+    needs spelled out - tiles, directions, which machine - instead of read
+    off the mouse and keyboard, so applying it does the same thing every
+    time: live (CommandRunner) or again from a replay log (Replay).
+
+    Whoever issues a command checks it's allowed - CommandRunner.
+    try_submit() against everything queued ahead of it, using tiles() and
+    stage() - so apply() just carries it out, and raises CommandError if
+    a charge or refund doesn't fit after all rather than building for
+    free or dropping items. It leaves belt connectivity to the
+    CommandRunner, which updates it once for the whole batch it applies.
+    to_record() is the command as a short JSON-able list, its NAME first;
+    Command.from_record() turns one back into a command."""
+
+    NAME = None
+
+    def tiles(self, world):
+        """Every tile applying this changes, with `world` as it is now -
+        all of a machine it removes, not just the tiles it overlaps."""
+        raise NotImplementedError
+
+    def stage(self, world, belt_system, inventory):
+        """Stage what applying this does to the player's inventory on
+        `inventory` (an InventoryTransaction). False if it doesn't fit -
+        whatever was staged before that is left in."""
+        raise NotImplementedError
+
+    def apply(self, world, belt_system, player):
+        raise NotImplementedError
+
+    def to_record(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def from_record(record):
+        name, *args = record
+        return COMMAND_CLASSES[name](*args)
+
+
+def _occupied_tiles(world, cells):
+    """`cells` plus every tile of the machines on them."""
+    _, machines = world.gather_occupants(cells)
+    tiles = list(cells)
+    for machine in machines:
+        tiles += machine.occupied_cells
+    return tiles
+
+
+def _machine_tiles(world, grid_pos):
+    machine = world.get_machine_at(grid_pos)
+    return list(machine.occupied_cells) if machine is not None else [grid_pos]
+
+
+def _stage_clear_cells(world, belt_system, inventory, cells):
+    replaced_segments, replaced_machines = world.gather_occupants(cells)
+    return belt_system.apply_refunds(inventory, replaced_segments, replaced_machines)
+
+
+def _refund(belt_system, player, segments, machines):
+    if not belt_system.apply_refunds(player.inventory, segments, machines):
+        raise CommandError("no room in the player's inventory for the refunds")
+
+
+def _charge(player, cost):
+    if not player.inventory.try_remove_items(cost):
+        raise CommandError(f"the player can't pay {cost}")
+
+
+def _clear_cells(world, belt_system, player, cells):
+    """Remove whatever is on `cells`, refunding it (and the items on it)
+    to the player."""
+    replaced_segments, replaced_machines = world.gather_occupants(cells)
+    _refund(belt_system, player, replaced_segments, replaced_machines)
+
+    for seg in replaced_segments:
+        seg._clear_item()
+        world.remove_belt_segment(seg)
+    for machine in replaced_machines:
+        world.remove_machine(machine)
+
+
+class PlaceBelt(Command):
+    NAME = "place_belt"
+
+    def __init__(self, belts, belt_type):
+        self.belts = [(tuple(tile), tuple(direction)) for tile, direction in belts]  # (tile, (dx, dy))
+        self.belt_type = belt_type
+
+    def _cost(self, belt_system):
+        return {item_id: amount * len(self.belts) for item_id, amount in belt_system.BUILD_COSTS[self.belt_type].items()}
+
+    def tiles(self, world):
+        return _occupied_tiles(world, [tile for tile, _ in self.belts])
+
+    def stage(self, world, belt_system, inventory):
+        return (_stage_clear_cells(world, belt_system, inventory, [tile for tile, _ in self.belts])
+                and inventory.try_remove_items(self._cost(belt_system)))
+
+    def apply(self, world, belt_system, player):
+        segments = [
+            BeltSegment(tile, Vector2(*direction), [], belt_type=self.belt_type)
+            for tile, direction in self.belts
+        ]
+        _clear_cells(world, belt_system, player, [seg.grid_pos for seg in segments])
+        _charge(player, self._cost(belt_system))
+
+        for seg in segments:
+            world.add_belt_segment(seg)
+
+    def to_record(self):
+        return [self.NAME, [[list(tile), list(direction)] for tile, direction in self.belts], self.belt_type]
+
+
+class DeleteBelts(Command):
+    NAME = "delete_belts"
+
+    def __init__(self, tiles):
+        self.belt_tiles = [tuple(tile) for tile in tiles]
+
+    def _segments(self, world):
+        return [world.belt_map[tile] for tile in self.belt_tiles if tile in world.belt_map]
+
+    def tiles(self, world):
+        return list(self.belt_tiles)
+
+    def stage(self, world, belt_system, inventory):
+        return belt_system.apply_refunds(inventory, self._segments(world), [])
+
+    def apply(self, world, belt_system, player):
+        segments = self._segments(world)
+        _refund(belt_system, player, segments, [])
+        for seg in segments:
+            seg._clear_item()
+            world.remove_belt_segment(seg)
+
+    def to_record(self):
+        return [self.NAME, [list(tile) for tile in self.belt_tiles]]
+
+
+class PlaceMachine(Command):
+    NAME = "place_machine"
+
+    def __init__(self, machine_class_name, grid_pos, rotation_steps=0):
+        self.machine_class_name = machine_class_name
+        self.grid_pos = tuple(grid_pos)
+        self.rotation_steps = rotation_steps  # quarter turns clockwise, splitters only
+
+    def _create(self):
+        return create_machine(self.machine_class_name, self.grid_pos, self.rotation_steps)
+
+    def tiles(self, world):
+        return _occupied_tiles(world, self._create().occupied_cells)
+
+    def stage(self, world, belt_system, inventory):
+        machine = self._create()
+        return (_stage_clear_cells(world, belt_system, inventory, machine.occupied_cells)
+                and inventory.try_remove_items(machine.BUILD_COST))
+
+    def apply(self, world, belt_system, player):
+        machine = self._create()
+        _clear_cells(world, belt_system, player, machine.occupied_cells)
+
+        _charge(player, machine.BUILD_COST)
+        world.add_machine(machine)
+
+    def to_record(self):
+        return [self.NAME, self.machine_class_name, list(self.grid_pos), self.rotation_steps]
+
+
+class DeleteMachine(Command):
+    NAME = "delete_machine"
+
+    def __init__(self, grid_pos):
+        self.grid_pos = tuple(grid_pos)
+
+    def tiles(self, world):
+        return _machine_tiles(world, self.grid_pos)
+
+    def stage(self, world, belt_system, inventory):
+        machine = world.get_machine_at(self.grid_pos)
+        return machine is None or belt_system.apply_refunds(inventory, [], [machine])
+
+    def apply(self, world, belt_system, player):
+        machine = world.get_machine_at(self.grid_pos)
+        if machine is None:
+            return
+
+        _refund(belt_system, player, [], [machine])
+        world.remove_machine(machine)
+
+    def to_record(self):
+        return [self.NAME, list(self.grid_pos)]
+
+
+class DeleteRegion(Command):
+    """Everything - belts and machines - with a tile inside the rectangle
+    between two corner tiles (inclusive)."""
+
+    NAME = "delete_region"
+
+    def __init__(self, corner, other_corner):
+        self.corner = tuple(corner)
+        self.other_corner = tuple(other_corner)
+
+    @staticmethod
+    def region_cells(corner, other_corner):
+        (x1, y1), (x2, y2) = corner, other_corner
+        return [
+            (x, y)
+            for x in range(min(x1, x2), max(x1, x2) + 1)
+            for y in range(min(y1, y2), max(y1, y2) + 1)
+        ]
+
+    def tiles(self, world):
+        return _occupied_tiles(world, self.region_cells(self.corner, self.other_corner))
+
+    def stage(self, world, belt_system, inventory):
+        return _stage_clear_cells(world, belt_system, inventory, self.region_cells(self.corner, self.other_corner))
+
+    def apply(self, world, belt_system, player):
+        _clear_cells(world, belt_system, player, self.region_cells(self.corner, self.other_corner))
+
+    def to_record(self):
+        return [self.NAME, list(self.corner), list(self.other_corner)]
+
+
+class PasteBlueprint(Command):
+    """A Blueprint stamped with its top left at `origin`, replacing
+    whatever is in the way."""
+
+    NAME = "paste_blueprint"
+
+    def __init__(self, blueprint, origin):
+        # A Blueprint, or its record when read back from a replay.
+        self.blueprint = blueprint if isinstance(blueprint, Blueprint) else Blueprint.from_record(blueprint)
+        self.origin = tuple(origin)
+
+    def tiles(self, world):
+        return _occupied_tiles(world, self.blueprint.cells(self.origin))
+
+    def stage(self, world, belt_system, inventory):
+        return (_stage_clear_cells(world, belt_system, inventory, self.blueprint.cells(self.origin))
+                and inventory.try_remove_items(self.blueprint.build_cost(belt_system.BUILD_COSTS)))
+
+    def apply(self, world, belt_system, player):
+        _clear_cells(world, belt_system, player, self.blueprint.cells(self.origin))
+        _charge(player, self.blueprint.build_cost(belt_system.BUILD_COSTS))
+
+        segments, machines = self.blueprint.create_entities(self.origin)
+        world.add_belt_segments(segments)
+        for machine in machines:
+            world.add_machine(machine)
+
+    def to_record(self):
+        return [self.NAME, self.blueprint.to_record(), list(self.origin)]
+
+
+class SetRecipe(Command):
+    NAME = "set_recipe"
+
+    def __init__(self, grid_pos, recipe_name):
+        self.grid_pos = tuple(grid_pos)
+        self.recipe_name = recipe_name  # None to clear it
+
+    @staticmethod
+    def _machine(world, grid_pos):
+        # Only producing machines have recipes - an earlier command in the
+        # batch may have put a splitter here.
+        machine = world.get_machine_at(grid_pos)
+        return machine if getattr(machine, "recipes", None) is not None else None
+
+    def tiles(self, world):
+        return _machine_tiles(world, self.grid_pos)
+
+    def stage(self, world, belt_system, inventory):
+        """Everything the machine holds goes to the player - set_recipe()
+        drops whatever doesn't fit, so all of it has to."""
+        machine = self._machine(world, self.grid_pos)
+        if machine is None:
+            return True
+
+        for inventories in (machine.input_inventories, machine.output_inventories):
+            for inv in inventories.values():
+                for index, amount in inv.contents().items():
+                    if transfer(inv.begin(), inventory, index) != amount:
+                        return False
+        return True
+
+    def apply(self, world, belt_system, player):
+        machine = self._machine(world, self.grid_pos)
+        if machine is None:
+            return
+
+        if not self.stage(world, belt_system, player.inventory.begin()):
+            raise CommandError("no room in the player's inventory for the machine's items")
+
+        recipe = next((recipe for recipe in machine.recipes if recipe.name == self.recipe_name), None)
+        machine.set_recipe(recipe, player_inventory=player.inventory)
+
+    def to_record(self):
+        return [self.NAME, list(self.grid_pos), self.recipe_name]
+
+
+class FillInputs(Command):
+    """The development cheat (I): one recipe's worth of inputs straight
+    into a machine."""
+
+    NAME = "fill_inputs"
+
+    def __init__(self, grid_pos):
+        self.grid_pos = tuple(grid_pos)
+
+    def tiles(self, world):
+        return _machine_tiles(world, self.grid_pos)
+
+    def stage(self, world, belt_system, inventory):
+        return True  # out of thin air
+
+    def apply(self, world, belt_system, player):
+        machine = world.get_machine_at(self.grid_pos)
+        if machine is None or not getattr(machine, "recipe", None):
+            return
+
+        for item_id, amount in machine.recipe.inputs.items():
+            if item_id in machine.input_inventories:
+                machine.input_inventories[item_id].try_add_items(item_id, amount)
+        machine.wake()
+
+    def to_record(self):
+        return [self.NAME, list(self.grid_pos)]
+
+
+COMMAND_CLASSES = {cls.NAME: cls for cls in (PlaceBelt, DeleteBelts, PlaceMachine, DeleteMachine, DeleteRegion, PasteBlueprint, SetRecipe, FillInputs)}
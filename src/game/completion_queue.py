@@ -0,0 +1,47 @@
+# game.completion_queue
+import heapq
+
+
+class CompletionQueue:
+    """Entities asleep until a given tick - a producing machine halfway
+    through a process has nothing to do until it finishes, so it
+    schedules itself for then and sleeps instead of counting down every
+    tick. A heap keyed by that tick: advance() only ever looks at what's
+    due, so ten thousand machines mid-process cost nothing until one of
+    them finishes.
+
+    Times are whole tick numbers, never float seconds - how long an
+    entity slept is then exact whatever the clock started at, and a
+    replay or a loaded save sleeps and wakes on the very same ticks.
+    `tick` is the number of the tick the Simulation is stepping (or last
+    stepped), counting from 1. An entity woken early - an input arrived,
+    an output freed up - just schedules itself again when it goes back
+    to sleep; the entry it left behind no longer matches its
+    `completion_due` and is dropped when it comes up."""
+
+    # Float slack when comparing process times - 120 ticks of 1/60 s can
+    # add up to a hair under 2 s.
+    EPSILON = 1e-9
+
+    def __init__(self):
+        self.tick = 0
+        self._heap = []  # (due tick, order, entity)
+        self._order = 0  # ties wake in the order they were scheduled
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, entity, due_tick):
+        entity.completion_due = due_tick
+        heapq.heappush(self._heap, (due_tick, self._order, entity))
+        self._order += 1
+
+    def advance(self, tick):
+        """Move the clock to `tick` and wake everything due by then."""
+        self.tick = tick
+        heap = self._heap
+        while heap and heap[0][0] <= tick:
+            due, _, entity = heapq.heappop(heap)
+            if entity.completion_due == due:
+                entity.completion_due = None
+                entity.wake()
@@ -1,47 +1,95 @@
 # game.game
+import os
 import pygame as py
 from sys import exit
 
 from game.initializer import Initializer, MIN_SCREEN_SIZE
+from game.replay import ReplayRecorder
+from game.save_game import SaveGame
 
 class Game:
-    def __init__(self):
+    SAVE_PATH = "savegame.sfp"
+
+    def __init__(self, record_path=None):
         py.init()
         self.context = Initializer.init_game()
 
-        self.context.player.inventory.try_add_items("iron_ingot", 4300)
-        self.context.player.inventory.try_add_items("copper_ingot", 200)
+        # Pick up where the last session left off - the newer of the last
+        # F5 save and the last autosave - otherwise start fresh with some
+        # materials to build with.
+        saves = [path for path in (self.SAVE_PATH, self.context.autosaver.path) if os.path.isfile(path)]
+        if saves:
+            self.load(max(saves, key=os.path.getmtime))
+        else:
+            self.context.player.inventory.try_add_items("iron_ingot", 4300)
+            self.context.player.inventory.try_add_items("copper_ingot", 200)
+
+        # --record: log this session from here on, written out on quit.
+        self.record_path = record_path
+        self.recorder = None
+        if record_path:
+            self.recorder = ReplayRecorder(self.context.simulation, self.context.player, self.context.tick_scheduler.tick_dt)
+            self.context.command_runner.recorder = self.recorder
+
+    def save(self):
+        SaveGame.save(self.SAVE_PATH, self.context.world, self.context.player)
+
+    def load(self, path=SAVE_PATH):
+        SaveGame.load(path, self.context.world, self.context.player, self.context.belt_system)
         
     def run(self):
+        profiler = self.context.profiler
+
         while True:
-            for event in py.event.get():
-                if event.type == py.QUIT:
-                    py.quit()
-                    exit()
-
-                if event.type == py.VIDEORESIZE:
-                    width = max(event.w, MIN_SCREEN_SIZE[0])
-                    height = max(event.h, MIN_SCREEN_SIZE[1])
-                    self.context.screen = py.display.set_mode((width, height), py.RESIZABLE)
-                    self._update_screen_size(width, height)
-                    self.context.grid.update_screen_size(width, height)
-                    self.context.build_mode_renderer.update_overlay_surfaces(width, height)
-
-                if event.type == py.MOUSEBUTTONUP and event.button == 1: 
-                    self.context.machine_system.just_placed_machine = False
-                
-                self._handle_event(event)
+            with profiler.measure("input"):
+                self._handle_events()
 
             self.update()
 
-            self.context.render_system.draw(self.context.screen)
+            self.context.render_system.draw(self.context.screen, profiler)
             
             self.context.screen.blit(self.context.title_font_surface, (10, 10))
             self.context.screen.blit(self.context.font.render(f"Player position: x:{self.context.player.rect.centerx} y:{self.context.player.rect.centery}", True, "#000000"), (10, 35))
             self.context.screen.blit(self.context.font.render(f"FPS: {int(self.context.clock.get_fps())}", True, "#000000"), (10, 60))
+            self.context.profiler_overlay.draw(self.context.screen)
+            self.context.throughput_panel.draw(self.context.screen)
 
             py.display.flip()
 
+            profiler.record_world(self.context.world)
+            profiler.end_frame()
+
+    def _handle_events(self):
+        for event in py.event.get():
+            if event.type == py.QUIT:
+                self.context.autosaver.wait()
+                if self.recorder is not None:
+                    self.recorder.finish().save(self.record_path)
+                py.quit()
+                exit()
+
+            if event.type == py.VIDEORESIZE:
+                width = max(event.w, MIN_SCREEN_SIZE[0])
+                height = max(event.h, MIN_SCREEN_SIZE[1])
+                self.context.screen = py.display.set_mode((width, height), py.RESIZABLE)
+                self._update_screen_size(width, height)
+                self.context.grid.update_screen_size(width, height)
+                self.context.build_mode_renderer.update_overlay_surfaces(width, height)
+
+            if event.type == py.MOUSEBUTTONUP and event.button == 1: 
+                self.context.machine_system.just_placed_machine = False
+
+            if event.type == py.KEYDOWN and event.key == py.K_F5:
+                self.save()
+
+            if event.type == py.KEYDOWN and event.key == py.K_F3:
+                self.context.profiler_overlay.toggle()
+
+            if event.type == py.KEYDOWN and event.key == py.K_F4:
+                self.context.throughput_panel.toggle()
+            
+            self._handle_event(event)
+
     def _handle_event(self, event):
         self.context.input_system.handle_keys(event)
         self.context.input_system.handle_mouse(event)
@@ -54,22 +102,29 @@ class Game:
 
     def update(self):
         delta_time = self.context.clock.tick(60) / 1000
-        self.context.player.update(self.context.world.machines, delta_time)
+
+        # This frame's build actions, as one batch between two ticks -
+        # first thing, before handcrafting or walking around changes the
+        # inventory and tiles they were checked against.
+        with self.context.profiler.measure("commands"):
+            self.context.command_runner.flush()
+
+        self.context.player.update(self.context.world.machines_near(self.context.player.rect), delta_time)
         self.context.camera.update(self.context.player)
 
         if self.context.hand_crafting_ui.open:
             self.context.hand_crafting_ui.update(delta_time)
 
-        for segment in self.context.world.belt_segments:
-            segment.update(self.context.world.belt_map, self.context.world.machine_map, delta_time)
+        self.context.tick_scheduler.advance(delta_time)
 
-        for segment in self.context.world.belt_segments:
-            segment.resolve_input_requests()
+        with self.context.profiler.measure("stats"):
+            self.context.throughput_stats.update()
 
-        for machine in self.context.world.machines:
-            machine.update(delta_time, self.context.world.belt_map, self.context.world.machine_map)
+        # Between two ticks - a consistent moment to snapshot.
+        self.context.autosaver.update(delta_time)
 
-        self.context.build_system.update_hovered_delete_target()
+        with self.context.profiler.measure("build_hover"):
+            self.context.build_system.update_hovered_delete_target()
     
     def _update_screen_size(self, width, height):
         self.context.camera.screen_width = width
@@ -9,6 +9,11 @@ class GameContext:
     grid: any
     camera: any
     world: any
+    simulation: any
+    tick_scheduler: any
+    autosaver: any
+    profiler: any
+    throughput_stats: any
 
     player: any
     player_inventory_ui: any
@@ -20,6 +25,7 @@ class GameContext:
     belt_sprite_manager: any
     ghost_belt_renderer: any
     belt_system: any
+    command_runner: any
     belt_ghost_preview_controller: any
 
     ui_manager: any
@@ -34,6 +40,8 @@ class GameContext:
     build_mode_renderer: any
     cursor_renderer: any
     ghost_machine_renderer: any
+    profiler_overlay: any
+    throughput_panel: any
 
     machine_system: any
     machine_ui: any
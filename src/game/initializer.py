@@ -7,6 +7,12 @@ from game.grid import Grid
 from core.camera import Camera
 from entities.player import Player
 from game.world import World
+from game.simulation import Simulation
+from game.tick_scheduler import TickScheduler
+from game.autosaver import Autosaver
+from game.profiler import Profiler
+from game.command_runner import CommandRunner
+from game.throughput_stats import ThroughputStats
 
 from constants.itemdata import ITEMS
 from constants.recipes import smelter_recipes, assembler_recipes
@@ -19,6 +25,8 @@ from ui.hand_crafting_ui import HandCraftingUI
 from ui.hand_crafting_renderer import HandCraftingRenderer
 from ui.screen_edge_hints_renderer import ScreenEdgeHintsRenderer
 from ui.ui_manager import UIManager
+from ui.profiler_overlay import ProfilerOverlay
+from ui.throughput_panel import ThroughputPanel
 
 # Graphics
 from systems.conveyors.belt_segment_sprite_manager import BeltSegmentSpriteManager
@@ -42,6 +50,7 @@ from systems.conveyors.belt_system import BeltSystem
 from systems.conveyors.belt_ghost_preview_controller import BeltGhostPreviewController
 
 MIN_SCREEN_SIZE = (1100, 700)
+AUTOSAVE_PATH = "autosave.sfp"
 
 class Initializer:
     @staticmethod
@@ -58,6 +67,12 @@ class Initializer:
         camera = Camera(screen_width, screen_height)
         player = Player(grid.CELL_SIZE)
         world = World(player, grid.CELL_SIZE)
+        simulation = Simulation(world)
+        tick_scheduler = TickScheduler(simulation)
+        autosaver = Autosaver(world, player, AUTOSAVE_PATH)
+        profiler = Profiler()
+        simulation.timer = profiler
+        throughput_stats = ThroughputStats(simulation)
 
         camera.x = player.rect.centerx - camera.screen_width // 2
         camera.y = player.rect.centery - camera.screen_height // 2
@@ -72,8 +87,11 @@ class Initializer:
 
         for item in ITEMS: item.load_sprite()
 
+        belt_system = BeltSystem(world, grid, player, ghost_belt_renderer)
+        command_runner = CommandRunner(world, belt_system, player)
+
         player_inventory_ui = PlayerInventoryUI(player, get_screen_size=lambda: (camera.screen_width, camera.screen_height))
-        machine_ui = ProducingMachineUI(camera, world, player, player_inventory_ui, screen)
+        machine_ui = ProducingMachineUI(camera, world, player, player_inventory_ui, screen, command_runner)
         machine_ui_renderer = MachineUIRenderer(machine_ui)
         hand_crafting_ui = HandCraftingUI(player, get_screen_size=lambda: (camera.screen_width, camera.screen_height))
         hand_crafting_renderer = HandCraftingRenderer(hand_crafting_ui)
@@ -83,19 +101,20 @@ class Initializer:
                                 "hand_crafting": hand_crafting_ui})
 
         machine_system = MachineSystem(world, player, camera, grid)
-        belt_system = BeltSystem(world, grid, player, ghost_belt_renderer)
         belt_ghost_preview_controller = BeltGhostPreviewController(world, player, grid, belt_system, ghost_belt_renderer, camera, screen)
         ghost_machine_renderer = GhostMachineRenderer(world, player, camera, grid, screen, belt_ghost_preview_controller)
 
-        build_system = BuildSystem(world, player, camera, grid, belt_system, machine_system, machine_ui, player_inventory_ui)
+        build_system = BuildSystem(world, player, camera, grid, belt_system, machine_system, machine_ui, player_inventory_ui, command_runner)
         input_system = InputSystem(build_system, ui_manager, hand_crafting_ui, machine_ui, player_inventory_ui, belt_system, machine_system)
 
         item_renderer = ItemRenderer()
-        world_renderer = WorldRenderer(world, camera, player, belt_sprite_manager, item_renderer, build_system, grid)
+        world_renderer = WorldRenderer(world, camera, player, belt_sprite_manager, item_renderer, build_system, grid, tick_scheduler)
         screen_edge_hints_renderer = ScreenEdgeHintsRenderer(player_inventory_ui, hand_crafting_ui)
         ui_renderer = UiRenderer(machine_ui_renderer, player_inventory_ui, hand_crafting_renderer, screen_edge_hints_renderer)
         build_mode_renderer = BuildModeRenderer(build_system, machine_system, ghost_machine_renderer, belt_ghost_preview_controller, belt_system, camera, grid)
         cursor_renderer = CursorRenderer(build_system)
+        profiler_overlay = ProfilerOverlay(profiler)
+        throughput_panel = ThroughputPanel(throughput_stats, world, camera, grid.CELL_SIZE)
         render_system = RenderSystem(
             world_renderer=world_renderer,
             build_renderer=build_mode_renderer,
@@ -112,6 +131,11 @@ class Initializer:
                            grid=grid,
                            camera=camera,
                            world=world,
+                           simulation=simulation,
+                           tick_scheduler=tick_scheduler,
+                           autosaver=autosaver,
+                           profiler=profiler,
+                           throughput_stats=throughput_stats,
 
                            player=player,
                            player_inventory_ui=player_inventory_ui,
@@ -123,6 +147,7 @@ class Initializer:
                            belt_sprite_manager=belt_sprite_manager,
                            ghost_belt_renderer=ghost_belt_renderer,
                            belt_system=belt_system,
+                           command_runner=command_runner,
                            belt_ghost_preview_controller=belt_ghost_preview_controller,
 
                            ui_manager=ui_manager,
@@ -137,6 +162,8 @@ class Initializer:
                            build_mode_renderer=build_mode_renderer,
                            cursor_renderer=cursor_renderer,
                            ghost_machine_renderer=ghost_machine_renderer,
+                           profiler_overlay=profiler_overlay,
+                           throughput_panel=throughput_panel,
 
                            machine_system=machine_system,
                            machine_ui=machine_ui,
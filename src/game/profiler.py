@@ -0,0 +1,98 @@
+# game.profiler
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Profiler:
+    """Where each frame's time goes, for the last `history` frames.
+
+    Systems wrap their work in measure(name) - the Simulation per tick
+    (several ticks in one frame add up), RenderSystem per pass - and
+    end_frame() closes the frame: every section's total goes into its own
+    ring buffer (a deque with maxlen), together with the frame time
+    itself, measured from one end_frame() to the next so it includes
+    everything, waiting on the clock too. A section that didn't run in a
+    frame records 0 for it, so all buffers stay in step.
+
+    record_world() keeps the latest entity counts - how many lines and
+    machines are awake versus asleep. ProfilerOverlay shows all of it."""
+
+    DEFAULT_HISTORY = 300  # frames - 5 seconds at 60 FPS
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        self.history = history
+
+        self.frame_times = deque(maxlen=history)  # ms
+        self.sections = {}                         # name -> deque of ms
+        self.counts = {}
+
+        self._current = {}  # name -> seconds so far this frame
+        self._last_frame_end = None
+
+    @contextmanager
+    def measure(self, name, screen=None):
+        # `screen` only so RenderSystem can hand us its passes like it
+        # would to a PassTimer.
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._current[name] = self._current.get(name, 0.0) + time.perf_counter() - start
+
+    def end_frame(self):
+        now = time.perf_counter()
+        if self._last_frame_end is not None:
+            self.frame_times.append((now - self._last_frame_end) * 1000)
+        self._last_frame_end = now
+
+        # New sections start out with a 0 for every frame so far.
+        filled = len(next(iter(self.sections.values()), ()))
+        for name in self._current:
+            if name not in self.sections:
+                self.sections[name] = deque([0.0] * filled, maxlen=self.history)
+
+        for name, samples in self.sections.items():
+            samples.append(self._current.get(name, 0.0) * 1000)
+        self._current.clear()
+
+    def record_world(self, world):
+        store = world.belt_store
+        fast_lines = int(store.fast.sum()) if store is not None else 0
+
+        lines = len(world.belt_lines)
+        active_lines = len(world.active_lines)
+        machines = len(world.machines)
+        active_machines = len(world.active_machines)
+
+        self.counts = {
+            "entities": len(world.belt_segments) + machines,
+            "belt_segments": len(world.belt_segments),
+            "lines": lines,
+            "lines_active": active_lines,
+            "lines_fast": fast_lines,
+            "lines_idle": lines - active_lines - fast_lines,
+            "machines": machines,
+            "machines_active": active_machines,
+            "machines_idle": machines - active_machines,
+        }
+
+    def latest(self, name):
+        samples = self.sections.get(name)
+        return samples[-1] if samples else 0.0
+
+    @staticmethod
+    def percentiles(samples, percents=(50, 95, 99)):
+        """{percent: value} over `samples` - nearest rank."""
+        if not samples:
+            return {percent: 0.0 for percent in percents}
+
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+        return {percent: ordered[round(percent / 100 * last)] for percent in percents}
+
+    def frame_percentiles(self, percents=(50, 95, 99)):
+        return self.percentiles(self.frame_times, percents)
+
+    def section_percentiles(self, name, percents=(50, 95, 99)):
+        return self.percentiles(self.sections.get(name, ()), percents)
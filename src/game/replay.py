@@ -0,0 +1,151 @@
+# game.replay
+import hashlib
+import json
+import struct
+import zlib
+
+from entities.player import Player
+from game.command_runner import CommandRunner
+from game.commands import Command
+from game.grid import Grid
+from game.save_game import SaveGame
+from game.simulation import Simulation
+from systems.conveyors.belt_system import BeltSystem
+
+
+class ReplayRecorder:
+    """Records a play session so it can be re-run headless (Replay): the
+    factory as it was when recording started, then every Command the
+    CommandRunner carried out, each with the tick its batch was applied
+    before.
+
+    The simulation is fixed-step and deterministic, so that's all it
+    takes - no mouse positions, no frame times. Commands are only applied
+    between ticks, so "before tick N" is exact.
+
+    Recording can start at any tick, not just right after a load: the
+    replay runs on a reload of `initial_state`, and SaveGame round-trips
+    a world exactly (SimBenchmark checks that it does). Starting to record
+    raises ValueError if this world doesn't reload to the same digest."""
+
+    def __init__(self, simulation, player, tick_dt):
+        self.simulation = simulation
+        self.tick_dt = tick_dt
+
+        self.start_tick = simulation.tick
+        self.initial_state = SaveGame.dumps(simulation.world, player, compress=True)
+        self.commands = []  # [tick since start, command record]
+
+        reloaded, _, _ = Replay.load_initial_state(self.initial_state)
+        if Replay.world_digest(reloaded.world) != Replay.world_digest(simulation.world):
+            raise ValueError("This world doesn't survive a save and load unchanged - a replay of it wouldn't match")
+
+    def record(self, command):
+        self.commands.append([self.simulation.tick - self.start_tick, command.to_record()])
+
+    def finish(self):
+        """The Replay of everything recorded so far, ending now."""
+        return Replay(
+            self.initial_state,
+            self.commands,
+            ticks=self.simulation.tick - self.start_tick,
+            tick_dt=self.tick_dt,
+            digest=Replay.world_digest(self.simulation.world),
+        )
+
+
+class Replay:
+    """A recorded session (see ReplayRecorder) that re-drives a headless
+    Simulation at full speed: load the initial state, step to each
+    command's tick, apply it, and run on to the recorded end. The result
+    has to match the recorded `digest` of the world - a replay doubles as
+    a regression test, and as a reproducible workload to profile.
+
+    File layout (little-endian): magic and version, the initial state as
+    a length-prefixed save (SaveGame format), then zlib-compressed JSON
+    with the tick rate, tick count, digest and the command list."""
+
+    MAGIC = b"SFPR"
+    VERSION = 1
+
+    _HEADER = struct.Struct("<4sHI")
+
+    def __init__(self, initial_state, commands, ticks, tick_dt, digest=None):
+        self.initial_state = initial_state
+        self.commands = commands
+        self.ticks = ticks
+        self.tick_dt = tick_dt
+        self.digest = digest
+
+    @staticmethod
+    def world_digest(world):
+        """Fingerprint of everything the simulation decides - belts, items,
+        machines. Not the player: handcrafting and walking around aren't
+        recorded."""
+        return hashlib.sha256(SaveGame.dumps(world, None)).hexdigest()
+
+    def save(self, path):
+        meta = {
+            "tick_dt": self.tick_dt,
+            "ticks": self.ticks,
+            "digest": self.digest,
+            "commands": self.commands,
+        }
+        data = b"".join([
+            self._HEADER.pack(self.MAGIC, self.VERSION, len(self.initial_state)),
+            self.initial_state,
+            zlib.compress(json.dumps(meta, separators=(",", ":")).encode()),
+        ])
+        SaveGame.write_file(path, data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            data = file.read()
+
+        magic, version, state_length = cls._HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a replay file")
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported replay version {version} (expected {cls.VERSION})")
+
+        start = cls._HEADER.size
+        initial_state = data[start:start + state_length]
+        meta = json.loads(zlib.decompress(data[start + state_length:]))
+        return cls(initial_state, meta["commands"], meta["ticks"], meta["tick_dt"], meta["digest"])
+
+    @staticmethod
+    def load_initial_state(initial_state):
+        """(simulation, belt_system, player) - a fresh headless Simulation
+        with `initial_state` loaded into it."""
+        player = Player(Grid.CELL_SIZE)
+        simulation = Simulation.headless(player)
+        belt_system = BeltSystem(simulation.world, Grid, player, None)
+        SaveGame.loads(initial_state, simulation.world, player, belt_system)
+        return simulation, belt_system, player
+
+    def run(self, timer=None):
+        """Replay into a fresh headless Simulation and return it. `timer`
+        (a PassTimer or Profiler) gets the Simulation's section timings."""
+        simulation, belt_system, player = self.load_initial_state(self.initial_state)
+        if timer is not None:
+            simulation.timer = timer
+
+        world = simulation.world
+
+        # Commands recorded on the same tick were one batch - replay them
+        # as one too.
+        runner = CommandRunner(world, belt_system, player)
+        for tick, record in self.commands:
+            if tick != simulation.tick:
+                runner.flush()
+                simulation.run(tick - simulation.tick, self.tick_dt)
+            runner.submit(Command.from_record(record))
+        runner.flush()
+
+        simulation.run(self.ticks - simulation.tick, self.tick_dt)
+        return simulation
+
+    def matches(self, simulation):
+        """True if `simulation` ended up exactly where the recording did."""
+        return self.digest == self.world_digest(simulation.world)
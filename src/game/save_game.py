@@ -0,0 +1,502 @@
+# game.save_game
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from constants.itemdata import ITEM_REGISTRY, get_item_by_id
+from core.vector2 import Vector2
+from objects.conveyors.belt_segment import BeltSegment
+from objects.machines.assembler import Assembler
+from objects.machines.producing_machine import ProducingMachine
+from objects.machines.smelter import Smelter
+from objects.machines.splitter import Splitter
+
+
+class SaveGame:
+    """Writes the whole factory - belts with the items on them, machines
+    with their recipes, inventories and timers, splitters, and the player
+    - to a compact binary blob, and reads it back into an empty World.
+
+    Layout (all little-endian):
+        header        magic, format version
+        string table  every item id, belt type and machine class name,
+                      referred to by index everywhere below
+        player        position, then the inventory slot by slot
+        belts         count, then one packed array per field (x, y,
+                      direction, ...) - a column per field instead of a
+                      record per belt, so writing 100k belts is a handful
+                      of array.tobytes() calls rather than 100k struct
+                      packs
+        belt items    count of lines with items on them, then columns per
+                      line (head segment, length, span, item count) and
+                      per item (item, gap, entry direction) - the
+                      TransportLine gaps as they are, so a loaded line
+                      moves exactly like the saved one
+        machines      count, then one record per machine - there are
+                      far fewer of them, and their size varies
+
+    Files are usually zlib-compressed as a whole; load() accepts both.
+    Bump VERSION whenever the layout changes; load() refuses versions it
+    doesn't know instead of misreading them."""
+
+    MAGIC = b"SFPS"
+    VERSION = 3
+
+    # Direction codes - index into this list, NO_DIRECTION for none.
+    DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+    NO_DIRECTION = 255
+
+    # Machine classes by saved name. New buildings go here.
+    MACHINE_CLASSES = {cls.__name__: cls for cls in (Smelter, Assembler, Splitter)}
+
+    _HEADER = struct.Struct("<4sH")
+    _COUNT = struct.Struct("<I")
+    _PLAYER = struct.Struct("<iiHH")
+    _SLOT = struct.Struct("<HH")
+    _MACHINE = struct.Struct("<Hii")
+    _PRODUCING = struct.Struct("<hBdIHB")
+    _INVENTORY = struct.Struct("<HBB")
+    _SPLITTER = struct.Struct("<BHddBB")
+
+    # (field, array typecode) for the belt columns, in file order
+    _BELT_COLUMNS = [
+        ("x", "i"),
+        ("y", "i"),
+        ("direction", "B"),
+        ("belt_type", "H"),
+        ("input_index", "B"),
+    ]
+
+    # Per line with items on it, then per item - see TransportLine
+    _LINE_COLUMNS = [
+        ("head", "I"),        # index of its first segment in the belts
+        ("length", "I"),
+        ("span", "d"),
+        ("count", "I"),
+    ]
+    _ITEM_COLUMNS = [
+        ("item", "H"),        # string index
+        ("gap", "d"),
+        ("entry", "B"),
+    ]
+
+    @classmethod
+    def save(cls, path, world, player, compress=True):
+        cls.write_file(path, cls.dumps(world, player, compress))
+
+    @classmethod
+    def load(cls, path, world, player, belt_system):
+        with open(path, "rb") as file:
+            data = file.read()
+        cls.loads(data, world, player, belt_system)
+
+    @staticmethod
+    def write_file(path, data):
+        """Write `data` to a temporary file next to `path` and swap it in,
+        so `path` always holds either the old save or the complete new one
+        - never half of one, even if the game dies mid-write."""
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+    # Writing
+
+    @classmethod
+    def dumps(cls, world, player, compress=False):
+        return cls.encode(cls.snapshot(world, player), compress)
+
+    @classmethod
+    def snapshot(cls, world, player):
+        """Everything a save needs, copied out of the live objects as plain
+        values - the only part of saving that has to happen between two
+        ticks. Turning it into bytes (encode) doesn't touch the world any
+        more, so it can run on another thread while the game goes on.
+
+        Belt positions, directions and types never change once a belt is
+        placed (it's replaced instead), so those are read straight off the
+        segment objects later - only the list of them is copied here."""
+        lines = [line.snapshot() for line in world.belt_lines]
+        segments = list(world.belt_segments)
+        input_indices = [seg.current_input_index for seg in segments]
+
+        machines = []
+        for machine in world.machines:
+            name = type(machine).__name__
+            if name not in cls.MACHINE_CLASSES:
+                raise ValueError(f"Don't know how to save a {name}")
+
+            if isinstance(machine, Splitter):
+                item = machine.current_item
+                machines.append((name, machine.grid_pos, (
+                    machine.direction,
+                    item,
+                    machine.item_progress,
+                    machine.current_item_speed,
+                    machine.current_output_index,
+                    getattr(machine, "current_incoming_direction", None) if item else None
+                )))
+            elif isinstance(machine, ProducingMachine):
+                recipe_index = machine.recipes.index(machine.recipe) if machine.recipe in machine.recipes else -1
+                inventories = list(machine.input_inventories.items()) + list(machine.output_inventories.items())
+                machines.append((name, machine.grid_pos, (
+                    recipe_index,
+                    machine.processing,
+                    machine.process_offset,
+                    machine.process_ticks,
+                    machine.output_index,
+                    [(item_id, cls._copy_inventory(inventory)) for item_id, inventory in inventories]
+                )))
+
+        player_state = None
+        if player is not None:
+            player_state = (player.rect.center, cls._copy_inventory(player.inventory))
+
+        return {"player": player_state, "segments": segments, "input_indices": input_indices, "lines": lines, "machines": machines}
+
+    @staticmethod
+    def _copy_inventory(inventory):
+        """(width, height, [(item_id, amount) or None, ...]) row by row."""
+        return (inventory.width, inventory.height,
+                [(ITEM_REGISTRY.item_id_of(slot["item"]), slot["amount"]) if slot else None for row in inventory.slots for slot in row])
+
+    @classmethod
+    def encode(cls, snapshot, compress=False):
+        """Pack a snapshot() into the save format - zlib-compressed if
+        `compress`. Doesn't touch the live world."""
+        strings = _StringTable()
+        parts = []
+
+        parts.append(cls._dump_player(snapshot["player"], strings))
+        parts.append(cls._dump_belts(snapshot, strings))
+        parts.append(cls._dump_machines(snapshot["machines"], strings))
+
+        data = b"".join([cls._HEADER.pack(cls.MAGIC, cls.VERSION), strings.pack()] + parts)
+        return zlib.compress(data) if compress else data
+
+    @classmethod
+    def _dump_player(cls, player_state, strings):
+        if player_state is None:
+            return cls._PLAYER.pack(0, 0, 0, 0)
+
+        (centerx, centery), (width, height, slots) = player_state
+        parts = [cls._PLAYER.pack(centerx, centery, width, height)]
+        parts.extend(cls._dump_slots(slots, strings))
+        return b"".join(parts)
+
+    @classmethod
+    def _dump_slots(cls, slots, strings):
+        return [
+            cls._SLOT.pack(strings.index(slot[0]) + 1, slot[1]) if slot else cls._SLOT.pack(0, 0)
+            for slot in slots
+        ]
+
+    @classmethod
+    def _dump_belts(cls, snapshot, strings):
+        segments = snapshot["segments"]
+        columns = {field: array(typecode) for field, typecode in cls._BELT_COLUMNS}
+        columns["input_index"].extend(snapshot["input_indices"])
+
+        for seg in segments:
+            columns["x"].append(seg.grid_pos[0])
+            columns["y"].append(seg.grid_pos[1])
+            columns["direction"].append(cls._direction_code(seg.direction))
+            columns["belt_type"].append(strings.index(seg.belt_type))
+
+        parts = [cls._COUNT.pack(len(segments))]
+        parts.extend(_array_bytes(columns[field]) for field, _ in cls._BELT_COLUMNS)
+        parts.append(cls._dump_belt_items(snapshot, strings))
+        return b"".join(parts)
+
+    @classmethod
+    def _dump_belt_items(cls, snapshot, strings):
+        numbers = {seg: number for number, seg in enumerate(snapshot["segments"])}
+        lines = {field: array(typecode) for field, typecode in cls._LINE_COLUMNS}
+        items = {field: array(typecode) for field, typecode in cls._ITEM_COLUMNS}
+
+        # In belt order, not World.belt_lines order - that depends on how
+        # the lines were built, and a loaded world builds them differently.
+        saved = sorted((numbers[line[0][0]], line) for line in snapshot["lines"] if line[1])
+
+        for _, (line_segments, entries, span) in saved:
+            lines["head"].append(numbers[line_segments[0]])
+            lines["length"].append(len(line_segments))
+            lines["span"].append(span)
+            lines["count"].append(len(entries))
+
+            for item, gap, entry_direction in entries:
+                items["item"].append(strings.index(item.item_id))
+                items["gap"].append(gap)
+                items["entry"].append(cls._direction_code(entry_direction))
+
+        parts = [cls._COUNT.pack(len(saved))]
+        parts.extend(_array_bytes(lines[field]) for field, _ in cls._LINE_COLUMNS)
+        parts.append(cls._COUNT.pack(len(items["gap"])))
+        parts.extend(_array_bytes(items[field]) for field, _ in cls._ITEM_COLUMNS)
+        return b"".join(parts)
+
+    @classmethod
+    def _dump_machines(cls, machines, strings):
+        parts = [cls._COUNT.pack(len(machines))]
+
+        for name, grid_pos, state in machines:
+            parts.append(cls._MACHINE.pack(strings.index(name), grid_pos[0], grid_pos[1]))
+
+            if issubclass(cls.MACHINE_CLASSES[name], Splitter):
+                parts.append(cls._dump_splitter(state, strings))
+            else:
+                parts.append(cls._dump_producing_machine(state, strings))
+
+        return b"".join(parts)
+
+    @classmethod
+    def _dump_producing_machine(cls, state, strings):
+        recipe_index, processing, process_offset, process_ticks, output_index, inventories = state
+
+        parts = [cls._PRODUCING.pack(recipe_index, processing, process_offset, process_ticks, output_index, len(inventories))]
+        for item_id, (width, height, slots) in inventories:
+            parts.append(cls._INVENTORY.pack(strings.index(item_id), width, height))
+            parts.extend(cls._dump_slots(slots, strings))
+        return b"".join(parts)
+
+    @classmethod
+    def _dump_splitter(cls, state, strings):
+        direction, item, progress, speed, output_index, incoming_direction = state
+        return cls._SPLITTER.pack(
+            cls._direction_code(direction),
+            strings.index(item.item_id) + 1 if item else 0,
+            progress,
+            speed,
+            output_index,
+            cls._direction_code(incoming_direction)
+        )
+
+    @classmethod
+    def _direction_code(cls, direction):
+        if direction is None:
+            return cls.NO_DIRECTION
+        return cls.DIRECTIONS.index((int(direction.x), int(direction.y)))
+
+    # Reading
+
+    @classmethod
+    def loads(cls, data, world, player, belt_system):
+        """Rebuild the saved factory in `world` (which must be empty) and
+        restore `player`. `belt_system` recomputes belt connections, so the
+        items can go back onto the right TransportLines."""
+        if world.belt_segments or world.machines:
+            raise ValueError("Can only load into an empty World")
+
+        if data[:len(cls.MAGIC)] != cls.MAGIC:
+            try:
+                data = zlib.decompress(data)
+            except zlib.error:
+                raise ValueError("Not a save file")
+
+        reader = _Reader(data)
+
+        magic, version = reader.unpack(cls._HEADER)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a save file")
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported save version {version} (expected {cls.VERSION})")
+
+        strings = _StringTable.unpack(reader)
+
+        cls._load_player(reader, strings, player)
+        belts = cls._read_belts(reader, strings)
+        belt_lines, belt_items = cls._read_belt_items(reader)
+        cls._load_machines(reader, strings, world)
+
+        # Machines first, so belts next to them get their incoming
+        # directions right when connections are recomputed.
+        segments = []
+        for x, y, direction, belt_type, input_index in belts:
+            seg = BeltSegment((x, y), cls._direction(direction), [], belt_type=strings[belt_type])
+            world.add_belt_segment(seg)
+            segments.append(seg)
+
+        belt_system.update_belt_incoming_directions()
+
+        for seg, (_, _, _, _, input_index) in zip(segments, belts):
+            seg.current_input_index = input_index if input_index < len(seg.incoming_directions) else 0
+
+        # Connections are recomputed from the same belts, so every saved
+        # line is there again, starting at the same segment.
+        items = iter(belt_items)
+        for head, length, span, count in belt_lines:
+            line = segments[head].line
+            if line is None or line.head is not segments[head] or line.length != length:
+                raise ValueError("Save file's belt items don't fit its belts")
+
+            entries = []
+            for item, gap, entry_direction in (next(items) for _ in range(count)):
+                entries.append((get_item_by_id(strings[item]), gap, cls._direction(entry_direction)))
+            line.restore(entries, span)
+
+    @classmethod
+    def _load_player(cls, reader, strings, player):
+        centerx, centery, width, height = reader.unpack(cls._PLAYER)
+        slots = cls._read_slots(reader, strings, width, height)
+
+        if player is None or not width:
+            return
+
+        player.rect.center = (centerx, centery)
+        player.inventory.width = width
+        player.inventory.height = height
+        player.inventory.slots = slots
+
+    @classmethod
+    def _read_slots(cls, reader, strings, width, height):
+        slots = []
+        for _ in range(height):
+            row = []
+            for _ in range(width):
+                item, amount = reader.unpack(cls._SLOT)
+                row.append({"item": ITEM_REGISTRY.index_of(strings[item - 1]), "amount": amount} if item else None)
+            slots.append(row)
+        return slots
+
+    @classmethod
+    def _read_belts(cls, reader, strings):
+        count, = reader.unpack(cls._COUNT)
+        columns = [reader.array(typecode, count) for _, typecode in cls._BELT_COLUMNS]
+        return list(zip(*columns))
+
+    @classmethod
+    def _read_belt_items(cls, reader):
+        count, = reader.unpack(cls._COUNT)
+        lines = list(zip(*[reader.array(typecode, count) for _, typecode in cls._LINE_COLUMNS]))
+        count, = reader.unpack(cls._COUNT)
+        items = list(zip(*[reader.array(typecode, count) for _, typecode in cls._ITEM_COLUMNS]))
+        return lines, items
+
+    @classmethod
+    def _load_machines(cls, reader, strings, world):
+        count, = reader.unpack(cls._COUNT)
+
+        for _ in range(count):
+            name, x, y = reader.unpack(cls._MACHINE)
+            machine_class = cls.MACHINE_CLASSES.get(strings[name])
+            if machine_class is None:
+                raise ValueError(f"Unknown machine {strings[name]}")
+
+            if issubclass(machine_class, Splitter):
+                machine = cls._load_splitter(reader, strings, (x, y))
+            else:
+                machine = machine_class((x, y))
+                cls._load_producing_machine(reader, strings, machine)
+
+            world.add_machine(machine)
+
+    @classmethod
+    def _load_producing_machine(cls, reader, strings, machine):
+        recipe_index, processing, process_offset, process_ticks, output_index, inventory_count = reader.unpack(cls._PRODUCING)
+
+        # Fresh machine, empty inventories - nothing to refund.
+        machine.set_recipe(machine.recipes[recipe_index] if recipe_index >= 0 else None, player_inventory=None)
+        machine.processing = bool(processing)
+        machine.process_offset = process_offset
+        machine.process_ticks = process_ticks
+        machine.output_index = output_index
+
+        for _ in range(inventory_count):
+            item_id, width, height = reader.unpack(cls._INVENTORY)
+            slots = cls._read_slots(reader, strings, width, height)
+
+            item_id = strings[item_id]
+            inventory = machine.input_inventories.get(item_id) or machine.output_inventories.get(item_id)
+            if inventory is not None:
+                inventory.slots = slots
+
+    @classmethod
+    def _load_splitter(cls, reader, strings, grid_pos):
+        direction, item, progress, speed, output_index, incoming = reader.unpack(cls._SPLITTER)
+
+        splitter = Splitter(grid_pos, cls._direction(direction))
+        splitter.rotation_angle = direction * 90
+
+        if item:
+            splitter.current_item = get_item_by_id(strings[item - 1])
+            splitter.current_incoming_direction = cls._direction(incoming)
+            splitter.item_progress = progress
+            splitter.prev_item_progress = progress
+            splitter.current_item_speed = speed
+        splitter.current_output_index = output_index
+        return splitter
+
+    @classmethod
+    def _direction(cls, code):
+        if code == cls.NO_DIRECTION:
+            return None
+        return Vector2(*cls.DIRECTIONS[code])
+
+
+class _StringTable:
+    """Every distinct string in the save, written once and referred to by
+    index."""
+
+    _LENGTH = struct.Struct("<H")
+
+    def __init__(self):
+        self.strings = []
+        self._indices = {}
+
+    def index(self, string):
+        index = self._indices.get(string)
+        if index is None:
+            index = self._indices[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def pack(self):
+        parts = [self._LENGTH.pack(len(self.strings))]
+        for string in self.strings:
+            encoded = string.encode("utf-8")
+            parts.append(self._LENGTH.pack(len(encoded)))
+            parts.append(encoded)
+        return b"".join(parts)
+
+    @classmethod
+    def unpack(cls, reader):
+        count, = reader.unpack(cls._LENGTH)
+        strings = []
+        for _ in range(count):
+            length, = reader.unpack(cls._LENGTH)
+            strings.append(reader.read(length).decode("utf-8"))
+        return strings
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def read(self, size):
+        if self.offset + size > len(self.data):
+            raise ValueError("Save file is truncated")
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return bytes(chunk)
+
+    def unpack(self, record):
+        return record.unpack(self.read(record.size))
+
+    def array(self, typecode, count):
+        values = array(typecode)
+        values.frombytes(self.read(values.itemsize * count))
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+
+def _array_bytes(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
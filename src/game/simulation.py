@@ -0,0 +1,76 @@
+# game.simulation
+from game.grid import Grid
+from game.world import World
+from systems.rendering.pass_timer import NULL_PASS_TIMER
+
+
+class Simulation:
+    """Owns the World and advances everything that moves on its own -
+    belts, splitters and producing machines - one step at a time. Only
+    entities with work to do are stepped (World.active_lines /
+    active_machines), so idle parts of the factory cost nothing - nor do
+    machines just waiting for a process to finish, which World.completions
+    wakes when it's due.
+
+    Nothing in here touches the display, the clock or any sprite: Game
+    drives it from the pygame loop, but it runs just as well headless
+    (CI, batch workers) where step()/run() are called directly, as fast
+    as the CPU allows."""
+
+    DEFAULT_DT = 1 / 60
+
+    def __init__(self, world):
+        self.world = world
+
+        self.tick = 0
+        self.time = 0.0  # simulated seconds since the start
+
+        # Game sets its Profiler here - every step() then reports how long
+        # belts, hand-offs and machines took.
+        self.timer = NULL_PASS_TIMER
+
+    @classmethod
+    def headless(cls, player=None, cell_size=Grid.CELL_SIZE):
+        """A Simulation around a fresh, empty World. The player is optional
+        - without one, nothing is ever blocked by the player's position."""
+        return cls(World(player, cell_size))
+
+    def step(self, dt=DEFAULT_DT):
+        """Advance the world by `dt` simulated seconds."""
+        world = self.world
+        timer = self.timer
+
+        with timer.measure("sim.belts"):
+            # Freely moving lines all at once - the ones about to reach
+            # the end drop out and get a regular update below.
+            if world.belt_store is not None:
+                for line in world.belt_store.step(dt):
+                    line.wake()
+
+            # Only what's awake - see ActiveSet. Snapshots, since entities
+            # wake and sleep each other while they update.
+            requested = []
+            for line in world.active_lines.snapshot():
+                head = line.update(world.belt_map, world.machine_map, dt)
+                if head is not None:
+                    requested.append(head)
+
+        # Hand-offs between lines are requested during update and only
+        # resolved once every line has had its turn, so the order lines
+        # are updated in doesn't decide who wins a merge.
+        with timer.measure("sim.belt_requests"):
+            for head in requested:
+                head.resolve_input_requests()
+
+        with timer.measure("sim.machines"):
+            world.completions.advance(self.tick + 1)
+            for machine in world.active_machines.snapshot():
+                machine.update(dt, world.belt_map, world.machine_map)
+
+        self.tick += 1
+        self.time += dt
+
+    def run(self, ticks, dt=DEFAULT_DT):
+        """Advance `ticks` steps of `dt` seconds each."""
+        for _ in range(ticks):
+            self.step(dt)
@@ -0,0 +1,161 @@
+# game.throughput_stats
+from collections import deque
+
+from objects.conveyors.belt_segment import BeltSegment
+from objects.conveyors.transport_line import TransportLine
+
+
+class RollingWindow:
+    """Amounts per item_id over the last `seconds`, kept as `buckets`
+    equal slices in a ring (a deque with maxlen) - the newest one still
+    filling up. Old slices simply fall off the end."""
+
+    def __init__(self, seconds, buckets):
+        self.seconds = seconds
+        self.bucket_seconds = seconds / buckets
+        self.buckets = deque(maxlen=buckets)  # completed slices, oldest first
+
+        self.current = {}
+        self.current_seconds = 0.0
+
+    def add(self, amounts, seconds):
+        """`amounts` {item_id: n} that happened over the last `seconds`."""
+        current = self.current
+        for item_id, amount in amounts.items():
+            current[item_id] = current.get(item_id, 0) + amount
+
+        self.current_seconds += seconds
+        if self.current_seconds >= self.bucket_seconds - 1e-9:
+            self.buckets.append((self.current, self.current_seconds))
+            self.current = {}
+            self.current_seconds = 0.0
+
+    def rates(self):
+        """{item_id: per minute} averaged over everything in the window."""
+        totals = dict(self.current)
+        covered = self.current_seconds
+        for amounts, seconds in self.buckets:
+            covered += seconds
+            for item_id, amount in amounts.items():
+                totals[item_id] = totals.get(item_id, 0) + amount
+        if covered <= 0.0:
+            return {}
+        return {item_id: amount * 60 / covered for item_id, amount in totals.items()}
+
+    def history(self, item_id):
+        """Per minute rate of `item_id` in every completed slice, oldest
+        first - one point of a graph each."""
+        return [amounts.get(item_id, 0) * 60 / seconds for amounts, seconds in self.buckets]
+
+
+class ThroughputStats:
+    """How many items per minute the factory makes and uses up per item
+    type, over the last minute, 10 minutes and hour - and how many items
+    each belt line, splitter and machine actually moves.
+
+    The entities only ever bump plain counters where a transfer completes
+    (BeltSegment.items_out on a line's tail, Machine.items_out,
+    ProducingMachine.produced / consumed), which costs the tick next to
+    nothing. update() runs once a frame, between ticks, and only does any
+    work when a sample is due: every SAMPLE_SECONDS of simulated time it
+    collects what the producing machines made and used into every
+    RollingWindow, and every ENTITY_SAMPLE_SECONDS the per-entity counts
+    into a short ring of its own. Collecting resets the counters, so a
+    sample is one attribute read for anything that was idle.
+
+    Belt counts are kept by the tile a line ends on rather than by its
+    tail segment: connectivity rebuilds replace lines (and placing a belt
+    can replace the tail), but a line whose end stays put keeps its
+    history. World.remove_belt_line collects the counters of lines it
+    tears down."""
+
+    WINDOWS = (("1 min", 60), ("10 min", 600), ("1 h", 3600))
+    BUCKETS = 60  # slices - graph points - per window
+    SAMPLE_SECONDS = 1.0
+
+    # Per entity rates are over the last minute, in 10 second slices.
+    ENTITY_SAMPLE_SECONDS = 10.0
+    ENTITY_BUCKETS = 6
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+
+        self.production = {name: RollingWindow(seconds, self.BUCKETS) for name, seconds in self.WINDOWS}
+        self.consumption = {name: RollingWindow(seconds, self.BUCKETS) for name, seconds in self.WINDOWS}
+
+        self._last_sample = simulation.time
+        self._last_entity_sample = simulation.time
+        self._entity_buckets = deque(maxlen=self.ENTITY_BUCKETS)  # ({counter key: moved}, seconds)
+
+    def update(self):
+        now = self.simulation.time
+        if now - self._last_sample >= self.SAMPLE_SECONDS:
+            self._sample_items(now - self._last_sample)
+            self._last_sample = now
+        if now - self._last_entity_sample >= self.ENTITY_SAMPLE_SECONDS:
+            self._sample_entities(now - self._last_entity_sample)
+            self._last_entity_sample = now
+
+    def _sample_items(self, seconds):
+        produced, consumed = {}, {}
+        for machine in self.simulation.world.machines:
+            made = getattr(machine, "produced", None)
+            if made:
+                machine.produced = {}
+                for item_id, amount in made.items():
+                    produced[item_id] = produced.get(item_id, 0) + amount
+            used = getattr(machine, "consumed", None)
+            if used:
+                machine.consumed = {}
+                for item_id, amount in used.items():
+                    consumed[item_id] = consumed.get(item_id, 0) + amount
+
+        for window in self.production.values():
+            window.add(produced, seconds)
+        for window in self.consumption.values():
+            window.add(consumed, seconds)
+
+    def _sample_entities(self, seconds):
+        world = self.simulation.world
+        moved = world.retired_items_out
+        world.retired_items_out = {}
+
+        for line in world.belt_lines:
+            tail = line.tail
+            count = tail.items_out
+            if count:
+                tail.items_out = 0
+                moved[tail.grid_pos] = moved.get(tail.grid_pos, 0) + count
+        for machine in world.machines:
+            count = machine.items_out
+            if count:
+                machine.items_out = 0
+                moved[machine] = count
+        self._entity_buckets.append((moved, seconds))
+
+    @staticmethod
+    def _counter_key(entity):
+        # A line's throughput is what its tail hands on, counted by the
+        # tail's tile - machines are counted by themselves.
+        if isinstance(entity, TransportLine):
+            return entity.tail.grid_pos
+        if isinstance(entity, BeltSegment) and entity.line is not None:
+            return entity.line.tail.grid_pos
+        return entity
+
+    def rate(self, entity):
+        """Items per minute a belt (segment or line), splitter or machine
+        has moved over the last minute - None before the first sample."""
+        if not self._entity_buckets:
+            return None
+
+        key = self._counter_key(entity)
+        moved = sum(amounts.get(key, 0) for amounts, _ in self._entity_buckets)
+        seconds = sum(seconds for _, seconds in self._entity_buckets)
+        return moved * 60 / seconds
+
+    def production_rates(self, window):
+        return self.production[window].rates()
+
+    def consumption_rates(self, window):
+        return self.consumption[window].rates()
@@ -0,0 +1,51 @@
+# game.tick_scheduler
+
+
+class TickScheduler:
+    """Runs a Simulation at a fixed tick rate, independent of the frame
+    rate. Every frame's wall-clock time goes into an accumulator, and
+    whole ticks of exactly `tick_dt` are taken out of it - so a slow frame
+    means more ticks next frame rather than one big, jumpy `dt`, and the
+    same inputs always produce the same simulation.
+
+    At most `max_catch_up_steps` ticks run per frame. If the game falls
+    further behind than that (a long hitch, a breakpoint), the rest of the
+    backlog is dropped instead of spiralling into ever-longer frames.
+
+    `alpha` is how far the current frame sits between the last tick and
+    the next one (0..1), for renderers that interpolate positions."""
+
+    DEFAULT_TICKS_PER_SECOND = 60
+    DEFAULT_MAX_CATCH_UP_STEPS = 5
+
+    def __init__(self, simulation, ticks_per_second=DEFAULT_TICKS_PER_SECOND, max_catch_up_steps=DEFAULT_MAX_CATCH_UP_STEPS):
+        if ticks_per_second <= 0:
+            raise ValueError("ticks_per_second must be greater than 0")
+        if max_catch_up_steps < 1:
+            raise ValueError("max_catch_up_steps must be at least 1")
+
+        self.simulation = simulation
+        self.ticks_per_second = ticks_per_second
+        self.tick_dt = 1 / ticks_per_second
+        self.max_catch_up_steps = max_catch_up_steps
+
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+    def advance(self, frame_dt):
+        """Run however many ticks `frame_dt` seconds of wall-clock time are
+        worth (capped), and return how many actually ran."""
+        self.accumulator += frame_dt
+
+        steps = 0
+        while self.accumulator >= self.tick_dt and steps < self.max_catch_up_steps:
+            self.simulation.step(self.tick_dt)
+            self.accumulator -= self.tick_dt
+            steps += 1
+
+        # Too far behind - keep the partial tick, drop the rest.
+        if self.accumulator >= self.tick_dt:
+            self.accumulator %= self.tick_dt
+
+        self.alpha = self.accumulator / self.tick_dt
+        return steps
@@ -1,31 +1,97 @@
 # game.world
 import pygame as py
 
+from game.active_set import ActiveSet
+from game.chunk import Chunk
+from game.completion_queue import CompletionQueue
+from objects.conveyors.belt_store import BeltStore
+from objects.conveyors.transport_line import TransportLine
+
 class World:
     def __init__(self, player, cell_size):
         self.player = player
         self.cell_size = cell_size
 
-        self.machines = []
-        self.belt_segments = []
+        # Dicts as ordered sets - O(1) removal, stable iteration order.
+        self.machines = {}
+        self.belt_segments = {}
+
+        # (chunk_x, chunk_y) -> Chunk, only for chunks with something in
+        # them - see Chunk and the *_in_area() lookups below.
+        self.chunks = {}
 
         self.machine_map = {}
         self.belt_map = {}
 
+        # Every segment belongs to exactly one TransportLine. Insertion
+        # ordered (dict as an ordered set) so updates run in a stable,
+        # reproducible order with O(1) removal.
+        self.belt_lines = {}
+
+        # items_out of lines torn down since ThroughputStats last sampled,
+        # by the tile they ended on: {tail grid_pos: count}.
+        self.retired_items_out = {}
+
+        # What the Simulation actually updates - lines and machines with
+        # work to do. Everything else sleeps until something wakes it.
+        self.active_lines = ActiveSet()
+        self.active_machines = ActiveSet()
+
+        # Machines asleep mid-process, woken when it's due to finish.
+        self.completions = CompletionQueue()
+
+        # Advances every freely moving line at once - None without NumPy,
+        # in which case active_lines covers those too.
+        self.belt_store = BeltStore() if BeltStore.available() else None
+
+        # Port index: tile -> [(machine, push_direction, any_facing)] for
+        # every machine that can push items onto that tile - see
+        # Machine.output_ports. Connectivity is a lookup here rather than a
+        # scan over every machine.
+        self.machine_outputs = {}
+
+        # Tiles where something was built or removed since BeltSystem last
+        # recomputed belt connections (ordered set) - only belts on and
+        # around them can have changed.
+        self.dirty_tiles = {}
 
 
     def add_machine(self, machine):
         """Add a machine and map all its occupied cells."""
-        self.machines.append(machine)
+        self.machines[machine] = None
         for cell in machine.occupied_cells:
             self.machine_map[cell] = machine
+            self._chunk_at(cell).machines[machine] = None
+
+        for tile, push_direction, any_facing in machine.output_ports:
+            self.machine_outputs.setdefault(tile, []).append((machine, push_direction, any_facing))
+        self.mark_dirty(machine.occupied_cells)
+
+        machine.active_set = self.active_machines
+        machine.completions = self.completions
+        machine.output_routes = None
+        machine.wake()
+        self.wake_neighbours(machine.occupied_cells)
 
     def remove_machine(self, machine):
         """Remove machine from world and lookup map."""
-        if machine in self.machines:
-            self.machines.remove(machine)
+        self.machines.pop(machine, None)
         for cell in getattr(machine, "occupied_cells", []):
             self.machine_map.pop(cell, None)
+            self._discard_from_chunk(cell, "machines", machine)
+
+        for tile, _, _ in getattr(machine, "output_ports", []):
+            ports = [port for port in self.machine_outputs.get(tile, ()) if port[0] is not machine]
+            if ports:
+                self.machine_outputs[tile] = ports
+            else:
+                self.machine_outputs.pop(tile, None)
+        self.mark_dirty(getattr(machine, "occupied_cells", []))
+
+        machine.sleep()
+        machine.active_set = None
+        machine.completions = None
+        machine.wake_waiters()
 
     def get_machine_at(self, grid_pos):
         """Return the machine at a given grid position, if any."""
@@ -34,13 +100,172 @@ class World:
 
 
     def add_belt_segment(self, seg):
-        self.belt_segments.append(seg)
+        """Add a segment as a line of its own. BeltSystem merges it into
+        its neighbours' lines when it recomputes connections."""
+        self.belt_segments[seg] = None
         self.belt_map[seg.grid_pos] = seg
+        self._chunk_at(seg.grid_pos).belt_segments[seg] = None
+        self.add_belt_line(TransportLine([seg]))
+        self.mark_dirty([seg.grid_pos])
+        self.wake_neighbours([seg.grid_pos])
+
+    def add_belt_segments(self, segments):
+        """Add many segments at once - a pasted blueprint. Unlike
+        add_belt_segment they get no line of their own (a thousand
+        throwaway one-segment lines would just be torn down again):
+        BeltSystem's next connectivity update, which every batch of
+        build commands ends with, groups them into lines."""
+        tiles = []
+        for seg in segments:
+            self.belt_segments[seg] = None
+            self.belt_map[seg.grid_pos] = seg
+            self._chunk_at(seg.grid_pos).belt_segments[seg] = None
+            tiles.append(seg.grid_pos)
+
+        self.mark_dirty(tiles)
+        self.wake_neighbours(tiles)
 
     def remove_belt_segment(self, seg):
-        if seg in self.belt_segments:
-            self.belt_segments.remove(seg)
+        self.belt_segments.pop(seg, None)
         self.belt_map.pop(seg.grid_pos, None)
+        self._discard_from_chunk(seg.grid_pos, "belt_segments", seg)
+        self.mark_dirty([seg.grid_pos])
+
+        # Split its line around it; whatever it carried is dropped.
+        line = seg.line
+        if line is not None and line in self.belt_lines:
+            self.remove_belt_line(line)
+            for part in line.split_without(seg):
+                self.add_belt_line(part)
+        seg.line = None
+
+    def add_belt_line(self, line):
+        self.belt_lines[line] = None
+        for seg in line.segments:
+            self._chunk_at(seg.grid_pos).belt_lines[line] = None
+        if self.belt_store is not None:
+            self.belt_store.add(line)
+        line.active_set = self.active_lines
+        line.wake()
+
+    def remove_belt_line(self, line):
+        self.belt_lines.pop(line, None)
+        for seg in line.segments:
+            self._discard_from_chunk(seg.grid_pos, "belt_lines", line)
+
+        # Its tail may end up in the middle of a new line, where nobody
+        # reads the counter - collect what it moved now.
+        tail = line.tail
+        if tail.items_out:
+            pos = tail.grid_pos
+            self.retired_items_out[pos] = self.retired_items_out.get(pos, 0) + tail.items_out
+            tail.items_out = 0
+
+        # Anything waiting on this line re-checks against whatever
+        # replaces it.
+        line.sleep()
+        line.active_set = None
+        if line.store is not None:
+            line.store.remove(line)
+        line.wake_waiters()
+
+    # Chunks
+
+    @staticmethod
+    def chunk_pos_of(grid_pos):
+        return grid_pos[0] // Chunk.SIZE, grid_pos[1] // Chunk.SIZE
+
+    def _chunk_at(self, grid_pos):
+        chunk_pos = self.chunk_pos_of(grid_pos)
+        chunk = self.chunks.get(chunk_pos)
+        if chunk is None:
+            chunk = self.chunks[chunk_pos] = Chunk(chunk_pos)
+        return chunk
+
+    def _discard_from_chunk(self, grid_pos, kind, entity):
+        chunk_pos = self.chunk_pos_of(grid_pos)
+        chunk = self.chunks.get(chunk_pos)
+        if chunk is None:
+            return
+
+        getattr(chunk, kind).pop(entity, None)
+        if chunk.is_empty():
+            del self.chunks[chunk_pos]
+
+    def chunks_in_area(self, left, top, right, bottom):
+        """Every non-empty chunk overlapping the tiles left..right,
+        top..bottom (inclusive)."""
+        chunk_left, chunk_top = self.chunk_pos_of((left, top))
+        chunk_right, chunk_bottom = self.chunk_pos_of((right, bottom))
+
+        chunks = []
+        for chunk_y in range(chunk_top, chunk_bottom + 1):
+            for chunk_x in range(chunk_left, chunk_right + 1):
+                chunk = self.chunks.get((chunk_x, chunk_y))
+                if chunk is not None:
+                    chunks.append(chunk)
+        return chunks
+
+    def belt_segments_in_area(self, left, top, right, bottom):
+        """Belt segments in chunks overlapping the area - a superset of the
+        ones actually inside it, for cheap culling."""
+        return [seg for chunk in self.chunks_in_area(left, top, right, bottom) for seg in chunk.belt_segments]
+
+    def machines_in_area(self, left, top, right, bottom):
+        """Machines in chunks overlapping the area, each listed once."""
+        machines = {}
+        for chunk in self.chunks_in_area(left, top, right, bottom):
+            machines.update(chunk.machines)
+        return list(machines)
+
+    def machines_near(self, rect, margin=1):
+        """Machines in chunks around a pixel rect, `margin` tiles either
+        side - what something that size can bump into this frame."""
+        return self.machines_in_area(
+            int(rect.left // self.cell_size) - margin,
+            int(rect.top // self.cell_size) - margin,
+            int(rect.right // self.cell_size) + margin,
+            int(rect.bottom // self.cell_size) + margin
+        )
+
+    def belt_lines_in_area(self, left, top, right, bottom):
+        """TransportLines with a segment in a chunk overlapping the area,
+        each listed once."""
+        lines = {}
+        for chunk in self.chunks_in_area(left, top, right, bottom):
+            lines.update(chunk.belt_lines)
+        return list(lines)
+
+    # Connectivity
+
+    def mark_dirty(self, cells):
+        """Something was built or removed on `cells`. Besides BeltSystem's
+        connections, the output routes of every machine pushing onto one
+        of them may have changed."""
+        machine_outputs = self.machine_outputs
+        for cell in cells:
+            self.dirty_tiles[cell] = None
+            for machine, _, _ in machine_outputs.get(cell, ()):
+                machine.output_routes = None
+
+    def take_dirty_tiles(self):
+        """The dirty tiles, in the order they were marked - and start a
+        fresh set."""
+        tiles = list(self.dirty_tiles)
+        self.dirty_tiles = {}
+        return tiles
+
+    def wake_neighbours(self, cells):
+        """Wake every line and machine next to `cells` - something was
+        just built there that they may be able to hand items to."""
+        for x, y in cells:
+            for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                seg = self.belt_map.get(neighbour)
+                if seg is not None and seg.line is not None:
+                    seg.line.wake()
+                machine = self.machine_map.get(neighbour)
+                if machine is not None:
+                    machine.wake()
 
     def get_belt_segment_at(self, world_x, world_y):
         tile = self.snap_to_tile(world_x, world_y)
@@ -69,7 +294,11 @@ class World:
         return grid_pos in self.machine_map or grid_pos in self.belt_map
     
     def is_blocked_by_player(self, grid_pos):
-        """Check if the given grid cell is currently occupied by the player."""
+        """Check if the given grid cell is currently occupied by the player.
+        A headless world (no player) never blocks."""
+        if self.player is None:
+            return False
+
         left = int(self.player.rect.left // self.cell_size)
         right = int((self.player.rect.right - 1) // self.cell_size)
         top = int(self.player.rect.top // self.cell_size)
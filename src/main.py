@@ -1,6 +1,12 @@
 # main
+import argparse
+
 from game.game import Game
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Satis-Factorio")
+    parser.add_argument("--record", metavar="PATH", help="record this session as a replay (see replay.py), written on quit")
+    args = parser.parse_args()
+
+    game = Game(record_path=args.record)
+    game.run()
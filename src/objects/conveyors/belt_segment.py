@@ -12,47 +12,54 @@ class BeltSegment:
         self.incoming_directions = incoming_directions
         self.belt_type = belt_type
 
-        # For drawing only
-        self.rect = py.Rect(grid_pos[0] * Grid.CELL_SIZE, grid_pos[1] * Grid.CELL_SIZE, Grid.CELL_SIZE, Grid.CELL_SIZE)
+        # Items are held by the TransportLine this segment belongs to (set
+        # when it's added to the World) - item / item_progress /
+        # current_incoming_direction below are views onto that line.
+        self.line = None
+        self.line_index = 0
 
-        # Items on this segment
-        self.item = None
-        self.current_incoming_direction = None
-        self.item_progress = 0.0
         self.input_requests = []
         self.current_input_index = 0
 
+        # Items handed on since ThroughputStats last collected them - only
+        # ever a line's tail hands items on, so it's the line's throughput.
+        self.items_out = 0
+
         self.items_per_minute = self._get_items_per_minute_for_type()
         self.speed = (self.items_per_minute / 60)  # tiles per second
 
-    def update(self, belt_map, machine_map, dt):
-        if not self.item:
-            return
-
-        self.item_progress += self.speed * dt
-
-        if self.item_progress >= 1.0:
-            next_pos = (self.grid_pos[0] + self.direction.x,
-                        self.grid_pos[1] + self.direction.y)
-
-            next_segment = belt_map.get(next_pos)
-            moved = False
-
-            # Request transfer to the next belt.
-            if next_segment:
-                if next_segment.request_item(self, self.item, self.direction):
-                    moved = True
-
-            # Try inserting into a machine.
-            if not moved:
-                machine = machine_map.get(next_pos)
-
-                if machine and self._try_insert_into_machine(machine, self.grid_pos):
-                    moved = True
-
-            if not moved:
-                # Stay at the end of the belt until something accepts the item.
-                self.item_progress = 1.0
+    @property
+    def rect(self):
+        # For drawing only - built on demand so the simulation never pays
+        # for a Rect per tile.
+        return py.Rect(self.grid_pos[0] * Grid.CELL_SIZE, self.grid_pos[1] * Grid.CELL_SIZE, Grid.CELL_SIZE, Grid.CELL_SIZE)
+
+    def _view(self):
+        return self.line.view(self.line_index) if self.line else None
+
+    @property
+    def item(self):
+        found = self._view()
+        return found[0][self.line.ITEM] if found else None
+
+    @property
+    def item_progress(self):
+        found = self._view()
+        return min(max(found[1] - self.line_index, 0.0), 1.0) if found else 0.0
+
+    @property
+    def current_incoming_direction(self):
+        found = self._view()
+        return self.line.incoming_direction_at(self.line_index, found[0]) if found else None
+
+    def receive_item(self, item, incoming_direction):
+        """Put `item` on this segment at the very start (progress 0), as if
+        it just came in from `incoming_direction`. False if it's occupied
+        - or if this isn't the head of its line, since every later
+        segment is only ever fed by the one before it."""
+        if self.line is None or self.line_index != 0:
+            return False
+        return self.line.push(item, incoming_direction)
 
     def refund_item_on_segment(self, player_inventory):
         if self.item:
@@ -61,12 +68,16 @@ class BeltSegment:
 
 
     def _clear_item(self):
-        self.item = None
-        self.item_progress = 0.0
-        self.current_incoming_direction = None
+        if self.line is not None:
+            self.line.remove(self.line_index)
 
 
     def request_item(self, source_belt, item, incoming_direction):
+        # Only a line's head takes items from other belts - every later
+        # segment is fed by the one before it, inside the line.
+        if self.line is None or self.line_index != 0:
+            return False
+
         # Don't accept an item from an opposing belt.
         if incoming_direction == -self.direction:
             return False
@@ -106,12 +117,9 @@ class BeltSegment:
 
         source, item, direction = chosen
 
-        self.item = item
-        self.item_progress = 0.0
-
-        self.current_incoming_direction = direction
-
+        self.receive_item(item, direction)
         source._clear_item()
+        source.items_out += 1
 
         if len(self.incoming_directions) > 1:
             index = self.incoming_directions.index(direction)
@@ -132,6 +140,7 @@ class BeltSegment:
 
             if success:
                 self._clear_item()
+                self.items_out += 1
 
             return success
 
@@ -140,6 +149,7 @@ class BeltSegment:
 
             if added:
                 self._clear_item()
+                self.items_out += 1
 
             return added
 
@@ -0,0 +1,120 @@
+# objects.conveyors.belt_store
+try:
+    import numpy as np
+except ImportError:  # optional - without it every line runs TransportLine.update
+    np = None
+
+
+class BeltStore:
+    """Struct-of-arrays state for TransportLines in their most common
+    state: every item moving freely, front item not at the end yet. Such
+    a line needs nothing per tick but its front gap and span shrinking by
+    speed * dt, so instead of being updated one by one those lines are
+    "fast": parallel NumPy arrays indexed by a per-line slot hold their
+    speed, front gap and span, and step() advances all of them - and finds
+    the ones about to reach the end - in a handful of array operations.
+
+    While a line is fast the arrays are the truth and its own front gap /
+    span may be stale. Reads call sync() to copy them back; anything that
+    changes the line calls stop_fast() first (TransportLine does both), and
+    a line that's due goes back to TransportLine.update for that tick.
+    The arrays subtract exactly what update() would, in the same order,
+    so fast or not makes no difference to the result.
+
+    NumPy is optional - World only creates a store when it's installed."""
+
+    INITIAL_CAPACITY = 256
+
+    def __init__(self):
+        self.lines = []         # slot -> line, None for a free slot
+        self.free_slots = []
+
+        self.speed = np.zeros(0)
+        self.front_gap = np.zeros(0)
+        self.span = np.zeros(0)
+        self.moved = np.zeros(0)   # distance moved on the last step()
+        self.fast = np.zeros(0, dtype=bool)
+
+        self._grow(self.INITIAL_CAPACITY)
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    def _grow(self, capacity):
+        old = len(self.lines)
+        self.lines.extend([None] * (capacity - old))
+        self.free_slots.extend(range(capacity - 1, old - 1, -1))
+
+        for name in ("speed", "front_gap", "span", "moved", "fast"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+
+    def __len__(self):
+        return len(self.lines) - len(self.free_slots)
+
+    def add(self, line):
+        if not self.free_slots:
+            self._grow(len(self.lines) * 2)
+
+        slot = self.free_slots.pop()
+        self.lines[slot] = line
+        self.speed[slot] = line.speed
+        self.fast[slot] = False
+
+        line.store = self
+        line.store_slot = slot
+
+    def remove(self, line):
+        self.stop_fast(line)
+
+        slot = line.store_slot
+        self.lines[slot] = None
+        self.free_slots.append(slot)
+
+        line.store = None
+        line.store_slot = None
+
+    def start_fast(self, line):
+        slot = line.store_slot
+        self.front_gap[slot] = line.items[0][line.GAP]
+        self.span[slot] = line.span
+        self.moved[slot] = 0.0
+        self.fast[slot] = True
+        line.fast = True
+
+    def stop_fast(self, line):
+        if not line.fast:
+            return
+        self.sync(line)
+        self.fast[line.store_slot] = False
+        line.fast = False
+
+    def sync(self, line):
+        """Copy a fast line's front gap and span (and last step's movement,
+        for render interpolation) back onto the line."""
+        slot = line.store_slot
+        line.items[0][line.GAP] = float(self.front_gap[slot])
+        line.span = float(self.span[slot])
+
+        moved = float(self.moved[slot])
+        if moved > 0.0:
+            line._moves = (0, [moved], moved, len(line.items))
+            line._moves_shift = 0
+
+    def step(self, dt):
+        """Advance every fast line by one tick. Returns the lines whose
+        front item would reach the end this tick - they drop out of fast
+        mode untouched and need a regular update() this tick instead."""
+        distance = self.speed * dt
+        moving = self.fast & (distance < self.front_gap)
+        due = self.fast & ~moving
+
+        self.front_gap[moving] -= distance[moving]
+        self.span[moving] -= distance[moving]
+        self.moved[:] = 0.0
+        self.moved[moving] = distance[moving]
+
+        return [self.lines[slot] for slot in np.flatnonzero(due)]
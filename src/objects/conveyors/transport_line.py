@@ -0,0 +1,390 @@
+# objects.conveyors.transport_line
+import math
+from collections import deque
+
+from game.active_set import Wakeable
+
+
+class TransportLine(Wakeable):
+    """A maximal chain of belt segments where every segment after the first
+    is fed only by the one before it - simulated as one unit instead of
+    handing items from segment to segment every frame.
+
+    Positions are measured in tiles from the start of the line. Segment i
+    covers positions (i, i + 1], and an item at position p on it has
+    progress p - i, exactly like BeltSegment.item_progress (progress 0 is
+    the center of the tile it came from, 1 the center of its own tile).
+    Position `length` is the very end, where an item waits until
+    something downstream accepts it; new items enter at position 0.
+
+    Items are stored front (downstream) to back as [item, gap, entry
+    direction] entries, where gap is the distance to the item ahead - or,
+    for the front item, to the end of the line. When nothing is blocked
+    everything moves together, so a tick only shrinks one gap: O(1). When
+    the front is stuck at the end, items behind it compress one after the
+    other down to MIN_SPACING, and `_active` remembers the first item that
+    can still close up, so a fully compressed line costs nothing either.
+
+    A line sleeps (see ActiveSet) once it's empty, or fully compressed
+    behind a front item nothing will take - push() and remove() wake it,
+    and so does whatever it's waiting on when that frees up. A line where
+    everything simply moves along is handed to the World's BeltStore
+    instead, which advances all such lines at once.
+
+    BeltSegment.item / item_progress / current_incoming_direction are
+    views onto this, for the UI, the build tools and refunds."""
+
+    # One item per segment - the same density the per-segment model allows.
+    MIN_SPACING = 1.0
+
+    # Guards the segment boundaries against float drift in the gaps.
+    EPSILON = 1e-9
+
+    ITEM = 0
+    GAP = 1
+    ENTRY = 2  # direction the item came in from, while it's on segment 0
+
+    def __init__(self, segments, items=()):
+        self.segments = list(segments)
+        self.length = len(self.segments)
+        self.speed = self.segments[0].speed  # tiles per second
+
+        for index, segment in enumerate(self.segments):
+            segment.line = self
+            segment.line_index = index
+
+        self.items = deque()
+        self.span = 0.0   # sum of all gaps, i.e. length - position of the back item
+        self._active = 0
+
+        # Last tick's movement, for render interpolation - see _moved()
+        self._moves = None
+        self._moves_shift = 0
+
+        # Set while World's BeltStore advances this line - see BeltStore.
+        self.store = None
+        self.store_slot = None
+        self.fast = False
+
+        self.load_items(items)
+
+    @property
+    def head(self):
+        return self.segments[0]
+
+    @property
+    def tail(self):
+        return self.segments[-1]
+
+    # Simulation
+
+    def update(self, belt_map, machine_map, dt):
+        """Move everything along by one tick. Returns the head segment the
+        front item was offered to, if any - its requests are resolved once
+        every line has updated."""
+        self._stop_fast()
+
+        if not self.items:
+            self._fall_asleep()
+            return None
+
+        self._advance(self.speed * dt)
+
+        if self.waiters and self.can_accept():
+            self.wake_waiters()
+
+        if self.items[0][self.GAP] > 0.0:
+            # Front item hasn't reached the end yet. If nothing is bunched
+            # up behind it either, the BeltStore can take it from here.
+            if self.store is not None and self._active == 0 and not self.waiters:
+                self.sleep()
+                self.store.start_fast(self)
+            return None
+
+        tail = self.tail
+        item = self.items[0][self.ITEM]
+        next_pos = (tail.grid_pos[0] + tail.direction.x,
+                    tail.grid_pos[1] + tail.direction.y)
+
+        # Request transfer to the next belt - resolved by its head segment
+        # once every line has updated, which then clears it off our tail.
+        next_segment = belt_map.get(next_pos)
+        if next_segment and next_segment.request_item(tail, item, tail.direction):
+            return next_segment
+
+        # Try inserting into a machine. Otherwise the item just waits at
+        # the end until something accepts it.
+        machine = machine_map.get(next_pos)
+        if machine and tail._try_insert_into_machine(machine, tail.grid_pos):
+            return None
+
+        # Stuck - once nothing behind the front can close up any more
+        # either, sleep until the belt or machine ahead has room.
+        if self._active >= len(self.items):
+            if next_segment is not None and next_segment.line is not None:
+                self.wait_on(next_segment.line)
+            elif machine is not None:
+                self.wait_on(machine)
+            self._fall_asleep()
+        return None
+
+    def wake(self):
+        self._stop_fast()
+        super().wake()
+
+    def on_waiter_added(self):
+        # Someone waits for our head to free up - only update() notices
+        # that, so no more fast mode for now.
+        if self.fast:
+            self.wake()
+
+    def _sync(self):
+        if self.fast:
+            self.store.sync(self)
+
+    def _stop_fast(self):
+        if self.fast:
+            self.store.stop_fast(self)
+
+    def _fall_asleep(self):
+        # Nothing moves while asleep - don't keep interpolating last
+        # tick's movement.
+        self._moves = None
+        self.sleep()
+
+    def _advance(self, distance):
+        items = self.items
+        index = self._active
+        start = index
+        moved = 0.0
+        cumulative = []
+
+        while distance > 0.0 and index < len(items):
+            entry = items[index]
+            min_gap = 0.0 if index == 0 else self.MIN_SPACING
+            room = entry[self.GAP] - min_gap
+
+            if room > 0.0:
+                if distance < room:
+                    # Still room left after this tick - this item (and
+                    # everything behind it) keeps moving next tick too.
+                    entry[self.GAP] -= distance
+                    moved += distance
+                    cumulative.append(moved)
+                    break
+
+                entry[self.GAP] = min_gap
+                moved += room
+                distance -= room
+
+            cumulative.append(moved)
+            index += 1
+
+        self._active = index
+        self.span -= moved
+
+        self._moves = (start, cumulative, moved, len(items))
+        self._moves_shift = 0
+
+    def _moved(self, index):
+        """How far the item now at `index` moved during the last tick."""
+        if self._moves is None:
+            return 0.0
+
+        start, cumulative, total, count = self._moves
+        index += self._moves_shift
+
+        if index < start or index >= count:
+            return 0.0
+        if index - start < len(cumulative):
+            return cumulative[index - start]
+        return total
+
+    # Segment views
+
+    def _segment_index(self, position):
+        return self._segment_index_in(position, self.length)
+
+    @classmethod
+    def _segment_index_in(cls, position, length):
+        # An item exactly at i + 1 is still at the end of segment i,
+        # waiting to move on - not at the start of segment i + 1.
+        return min(max(math.ceil(position - cls.EPSILON) - 1, 0), length - 1)
+
+    def _positions(self):
+        """(entry, position) for every item, front to back."""
+        position = self.length
+        for entry in self.items:
+            position -= entry[self.GAP]
+            yield entry, position
+
+    def can_accept(self):
+        return self.view(0) is None
+
+    def view(self, index):
+        """(entry, position) of the item on segment `index`, or None."""
+        found = self._find(index)
+        return found[1:] if found else None
+
+    def _find(self, index):
+        """(k, entry, position) of the item on segment `index`, where k is
+        the entry's place in self.items - or None."""
+        if not self.items:
+            return None
+
+        self._sync()
+
+        # Fast paths for the two ends - the only segments other belts and
+        # machines ever hand items to or take them from.
+        if index == 0:
+            position = self.length - self.span
+            if self._segment_index(position) == 0:
+                return len(self.items) - 1, self.items[-1], position
+            return None
+        if index == self.length - 1:
+            position = self.length - self.items[0][self.GAP]
+            if self._segment_index(position) == index:
+                return 0, self.items[0], position
+            return None
+
+        for k, (entry, position) in enumerate(self._positions()):
+            segment_index = self._segment_index(position)
+            if segment_index == index:
+                return k, entry, position
+            if segment_index < index:
+                break
+        return None
+
+    def incoming_direction_at(self, index, entry):
+        if index == 0:
+            return entry[self.ENTRY]
+        return self.segments[index - 1].direction
+
+    def segment_items(self):
+        """(segment, item, progress, incoming_direction) for every item -
+        enough to rebuild the items on a different set of lines."""
+        return self.segment_items_from(self.snapshot())
+
+    def snapshot(self):
+        """(segments, entries, span) - the items copied out as tuples, so
+        the line can keep moving while something else reads them. Segments
+        are never changed once a line exists (lines are rebuilt instead),
+        so the list itself is shared."""
+        self._sync()
+        return self.segments, [tuple(entry) for entry in self.items], self.span
+
+    @classmethod
+    def segment_items_from(cls, snapshot):
+        """segment_items() for a snapshot() - safe on any thread."""
+        segments, entries, _ = snapshot
+        length = len(segments)
+
+        result = []
+        position = length
+        for entry in entries:
+            position -= entry[cls.GAP]
+            index = cls._segment_index_in(position, length)
+            progress = min(max(position - index, 0.0), 1.0)
+            incoming_direction = entry[cls.ENTRY] if index == 0 else segments[index - 1].direction
+            result.append((segments[index], entry[cls.ITEM], progress, incoming_direction))
+        return result
+
+    def render_items(self, alpha):
+        """(segment, item, progress, incoming_direction) for every item,
+        placed `alpha` of the way between last tick and this one."""
+        self._sync()
+        for index, (entry, position) in enumerate(self._positions()):
+            position -= self._moved(index) * (1.0 - alpha)
+            segment_index = self._segment_index(max(position, 0.0))
+            yield (self.segments[segment_index], entry[self.ITEM],
+                   min(max(position - segment_index, 0.0), 1.0),
+                   self.incoming_direction_at(segment_index, entry))
+
+    # Adding and removing items
+
+    def push(self, item, incoming_direction):
+        """Put `item` at the very start of the line. False if the first
+        segment still holds an item."""
+        if not self.can_accept():
+            return False
+
+        self._stop_fast()
+        gap = self.length - self.span if self.items else self.length
+        self.items.append([item, gap, incoming_direction])
+        self.span = self.length
+        self._active = min(self._active, len(self.items) - 1)
+        self.wake()
+        return True
+
+    def remove(self, index):
+        """Take away whatever item is on segment `index` and return it."""
+        found = self._find(index)
+        if found is None:
+            return None
+
+        k, entry, _ = found
+        self._stop_fast()
+
+        if k == 0:
+            self.items.popleft()
+            self._moves_shift += 1
+            if self.items:
+                self.items[0][self.GAP] += entry[self.GAP]
+            else:
+                self.span = 0.0
+            self._active = 0
+            self.wake()
+            return entry[self.ITEM]
+
+        del self.items[k]
+        if k < len(self.items):
+            self.items[k][self.GAP] += entry[self.GAP]
+        else:
+            self.span -= entry[self.GAP]
+        self._active = min(self._active, k)
+        self._moves = None
+        self.wake()
+        return entry[self.ITEM]
+
+    def load_items(self, items):
+        """Place (segment, item, progress, incoming_direction) tuples - as
+        returned by segment_items() - onto this line. Items on segments
+        that aren't part of it are ignored."""
+        self._stop_fast()
+        placed = []
+        for segment, item, progress, incoming_direction in items:
+            if getattr(segment, "line", None) is not self:
+                continue
+            placed.append((segment.line_index + progress, item, incoming_direction))
+
+        placed.sort(key=lambda p: p[0], reverse=True)
+
+        previous_position = self.length
+        for position, item, incoming_direction in placed:
+            self.items.append([item, previous_position - position, incoming_direction])
+            previous_position = position
+
+        self.span = self.length - previous_position if self.items else 0.0
+        self._active = 0
+        self._moves = None
+
+    def restore(self, entries, span):
+        """Put back the (item, gap, entry direction) entries and span of a
+        snapshot() of this same line, exactly as they were - unlike
+        load_items(), which rebuilds the gaps from per segment progress
+        and can land a rounding error off."""
+        self._stop_fast()
+        self.items = deque([list(entry) for entry in entries])
+        self.span = span if self.items else 0.0
+        self._active = 0
+        self._moves = None
+
+    def split_without(self, segment):
+        """New lines for the segments before and after `segment`, keeping
+        their items - used when `segment` is removed from the world. The
+        item on `segment` itself (if any) is dropped; refund it first."""
+        items = self.segment_items()
+        index = segment.line_index
+
+        parts = [self.segments[:index], self.segments[index + 1:]]
+        return [TransportLine(part, items) for part in parts if part]
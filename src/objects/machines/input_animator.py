@@ -28,6 +28,7 @@ class InputAnimator:
             "start": (entry_x, entry_y),
             "end": (target_x, target_y),
             "progress": 0.0,
+            "prev_progress": 0.0,
             "duration": duration,
         })
 
@@ -35,5 +36,6 @@ class InputAnimator:
         if not self.animations:
             return
         for anim in self.animations:
+            anim["prev_progress"] = anim["progress"]
             anim["progress"] += dt / anim["duration"]
         self.animations = [a for a in self.animations if a["progress"] < 1.0]
@@ -2,13 +2,22 @@
 import pygame as py
 
 from core.vector2 import Vector2
+from game.active_set import Wakeable
 
-class Machine:
+class Machine(Wakeable):
     WIDTH = 1
     HEIGHT = 1
     SPRITE_PATH = None
     BUILD_COST = {}
 
+    # (sprite_path, size) -> scaled Surface, shared by every machine of a class
+    _sprite_cache = {}
+
+    # What's actually at the output ports, for machines that push output
+    # (see machine_output_pusher.output_routes). None until worked out;
+    # the World clears it whenever one of those tiles changes.
+    output_routes = None
+
     def __init__(self, grid_pos, cell_size):
         self.grid_pos = grid_pos
         self.cell_size = cell_size
@@ -21,11 +30,35 @@ class Machine:
             self.HEIGHT * cell_size
         )
 
-        # Load and scale image to rect
-        self.image = None
-        if self.SPRITE_PATH:
-            self.image = py.image.load(self.SPRITE_PATH).convert_alpha()
-            self.image = py.transform.scale(self.image, (self.rect.width, self.rect.height))
+        # Loaded lazily on first draw - see base_image
+        self._image = None
+
+        # Items pushed out since ThroughputStats last collected them.
+        self.items_out = 0
+
+    @property
+    def base_image(self):
+        """The class sprite scaled to this machine's footprint. Loaded on
+        first access rather than in __init__, because convert_alpha() needs
+        a display - a headless Simulation builds and runs machines that are
+        never drawn, so they never touch the sprite at all."""
+        if not self.SPRITE_PATH:
+            return None
+
+        size = (self.WIDTH * self.cell_size, self.HEIGHT * self.cell_size)
+        key = (self.SPRITE_PATH, size)
+        if key not in Machine._sprite_cache:
+            image = py.image.load(self.SPRITE_PATH).convert_alpha()
+            Machine._sprite_cache[key] = py.transform.scale(image, size)
+        return Machine._sprite_cache[key]
+
+    @property
+    def image(self):
+        return self._image if self._image is not None else self.base_image
+
+    @image.setter
+    def image(self, value):
+        self._image = value
 
     def _compute_occupied_cells(self):
         return [
@@ -40,6 +73,26 @@ class Machine:
             self._occupied_cells = self._compute_occupied_cells()
         return self._occupied_cells
 
+    def _compute_output_ports(self):
+        # A producing machine's output only goes onto a belt facing the
+        # same way as the push - see machine_output_pusher.
+        return [
+            ((self.grid_pos[0] + dx, self.grid_pos[1] + dy), push_direction, False)
+            for (dx, dy), push_direction in self._get_output_tiles()
+        ]
+
+    @property
+    def output_ports(self):
+        """(tile, push_direction, any_facing) for every tile this machine
+        can push items onto, in absolute tile coordinates. any_facing is
+        True where a belt there may face any way but straight back at us
+        (a splitter's outputs), False where it has to face the same way as
+        the push. Built once, like occupied_cells - World indexes machines
+        by it and the output pushers loop over it every tick."""
+        if getattr(self, "_output_ports", None) is None:
+            self._output_ports = self._compute_output_ports()
+        return self._output_ports
+
     def _get_output_tiles(self):
             """(tile_offset, direction) for every tile around the machine's
             entire perimeter - it can push output out any side, not just one
@@ -1,50 +1,91 @@
 # objects.machines.machine_output_pusher
-from constants.itemdata import get_item_by_id
+from constants.itemdata import get_item_by_index
+
+# How a route's target takes items - see output_routes.
+BELT, SINGLE, STACK = range(3)
 
 
 def push_output(machine, belt_map, machine_map):
-    """Push one item from `machine`'s output inventories onto whatever's at
-    an output tile - a belt, a splitter, or another machine. Tries each
-    output direction in turn for the first available output item."""
-    for item_id, inv in machine.output_inventories.items():
-        for row in inv.slots:
-            for i, slot in enumerate(row):
-                if not (slot and slot["amount"] > 0):
+    """Push `machine`'s output onto whatever's at its output tiles: one
+    item onto a belt or splitter, which only ever hold one per tile, and
+    as many as fit into another machine, in one transfer. The routes are
+    tried round-robin, starting after the one that last took something,
+    so several targets share the output. Returns True if anything moved."""
+    routes = output_routes(machine, belt_map, machine_map)
+    if not routes:
+        return False
+
+    pushed = False
+    for inv in machine.output_inventories.values():
+        for index, amount in inv.contents().items():
+            item_obj = get_item_by_index(index)
+
+            for _ in range(len(routes)):
+                route = routes[machine.output_index % len(routes)]
+                machine.output_index = (machine.output_index + 1) % len(routes)
+
+                moved = _try_push(machine, inv, item_obj, amount, route)
+                if not moved:
                     continue
 
-                item_obj = get_item_by_id(slot["item"])
+                machine.items_out += moved
+                pushed = True
+                amount -= moved
+                if amount == 0:
+                    break
 
-                for (dx, dy), push_direction in machine._get_output_tiles():
-                    tile_pos = (machine.grid_pos[0] + dx, machine.grid_pos[1] + dy)
+    return pushed
 
-                    if _try_push_to_tile(machine, item_obj, push_direction, tile_pos, belt_map, machine_map):
-                        slot["amount"] -= 1
-                        if slot["amount"] == 0:
-                            row[i] = None
-                        return True
 
-    return False
+def _try_push(machine, inv, item_obj, amount, route):
+    """How many of the `amount` of `item_obj` in `inv` the route's target
+    took (taken out of `inv` already)."""
+    target, push_direction, kind = route
+    if kind == STACK:
+        return target.try_receive_items(item_obj, amount, machine.grid_pos, source_inventory=inv)
 
+    if kind == BELT:
+        accepted = target.receive_item(item_obj, push_direction)
+    else:
+        accepted = target.receive_item(item_obj, incoming_direction=push_direction)
+    if not accepted:
+        return 0
+    inv.try_remove_item(item_obj.index, 1)
+    return 1
 
-def _try_push_to_tile(machine, item_obj, push_direction, tile_pos, belt_map, machine_map):
-    belt = belt_map.get(tile_pos)
-    if belt is not None:
-        # Only a belt facing directly away from us (same direction as
-        # the push) accepts - not perpendicular, not facing back in.
-        if belt.item is not None or belt.direction != push_direction:
-            return False
 
-        belt.item = item_obj
-        belt.item_progress = 0.0
-        belt.current_incoming_direction = push_direction
-        return True
+def output_routes(machine, belt_map, machine_map):
+    """(target, push_direction, kind) for every output tile that can take
+    anything at all: a belt facing directly away from us (same direction
+    as the push - not perpendicular, not facing back in), a splitter or
+    another producing machine. Worked out once and kept in
+    machine.output_routes until the World clears it because something was
+    built or removed on one of the tiles."""
+    if machine.output_routes is None:
+        routes = []
+        for tile_pos, push_direction, _ in machine.output_ports:
+            belt = belt_map.get(tile_pos)
+            if belt is not None:
+                if belt.direction == push_direction:
+                    routes.append((belt, push_direction, BELT))
+                continue
+
+            target = machine_map.get(tile_pos)
+            if target is None or target is machine:
+                continue
+            if hasattr(target, "receive_item"):
+                routes.append((target, push_direction, SINGLE))
+            elif hasattr(target, "try_receive_items"):
+                routes.append((target, push_direction, STACK))
+        machine.output_routes = routes
+    return machine.output_routes
 
-    target = machine_map.get(tile_pos)
-    if target is None:
-        return False
-    if hasattr(target, "receive_item"):
-        return target.receive_item(item_obj, incoming_direction=push_direction)
-    if hasattr(target, "try_receive_item"):
-        return target.try_receive_item(item_obj, machine.grid_pos)
 
-    return False
+def output_targets(machine, belt_map, machine_map):
+    """Every belt line and machine `machine` can push output to - what an
+    output-blocked machine waits on while it sleeps."""
+    targets = {}
+    for target, _, kind in output_routes(machine, belt_map, machine_map):
+        # A belt's line is what wakes its waiters.
+        targets[target.line if kind == BELT else target] = None
+    return list(targets)
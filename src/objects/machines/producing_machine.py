@@ -1,24 +1,42 @@
 # objects.machines.producing_machine
+import math
+
 import pygame as py
 
-from constants.itemdata import get_item_by_id
+from constants.itemdata import ITEM_REGISTRY, get_item_by_id
 from core.vector2 import Vector2
-from entities.inventory import Inventory
+from entities.inventory import Inventory, transfer
 from objects.machines.machine import Machine
-from objects.machines.machine_output_pusher import push_output
+from objects.machines.machine_output_pusher import push_output, output_targets
 from objects.machines.input_animator import InputAnimator
 
+from game.completion_queue import CompletionQueue
 from game.grid import Grid
 
 class ProducingMachine(Machine):
+    # Set by the World while the machine is part of it, like active_set.
+    # A machine waiting for nothing but its process to finish sleeps
+    # until then - see CompletionQueue.
+    completions = None
+    completion_due = None
+
     def __init__(self, grid_pos, recipe=None, cell_size=Grid.CELL_SIZE):
         super().__init__(grid_pos, cell_size)
         self.recipe = recipe
 
         self.processing = False
+        self._dt = 0.0  # length of the last tick processed, for process_timer
         self.process_timer = 0.0
         self.process_time = recipe.process_time if recipe else 1.0
 
+        # Output route to try first - see push_output.
+        self.output_index = 0
+
+        # Per item_id since ThroughputStats last collected them, whatever
+        # the recipe was at the time.
+        self.produced = {}
+        self.consumed = {}
+
         self.cell_size = cell_size
 
         # Purely visual: items animating from the input edge to the
@@ -29,22 +47,126 @@ class ProducingMachine(Machine):
             self._reset_inventories(recipe)
 
     def update(self, dt, belt_map=None, machine_map=None):
+        belt_map = belt_map or {}
+        machine_map = machine_map or {}
+
         self._update_processing(dt)
         self.input_animator.update(dt)
-        push_output(self, belt_map or {}, machine_map or {})
+        pushed = push_output(self, belt_map, machine_map)
+
+        if pushed or self.input_animator.animations:
+            return
+
+        if self.processing:
+            if self.completions is None or dt <= 0.0:
+                return
+            # Nothing to do but wait for the process - sleep until the
+            # tick it's done on, unless an input arrives or a full output
+            # frees up first. process_ticks keeps counting meanwhile.
+            self.completions.schedule(self, self.completions.tick + self._ticks_left(dt))
+            self._asleep_tick = self.completions.tick
+            self._wait_on_outputs(belt_map, machine_map)
+            self.sleep()
+            return
+
+        # A process that couldn't start the next one right away (outputs
+        # full) may be able to once they're pushed - can_process() covers
+        # that.
+        if self.can_process():
+            return
+
+        # Nothing to do until an input arrives (try_receive_item), the
+        # recipe changes (set_recipe) or - if output is backed up -
+        # something at an output tile frees up.
+        self._wait_on_outputs(belt_map, machine_map)
+        self.sleep()
+
+    def _wait_on_outputs(self, belt_map, machine_map):
+        if self._has_output():
+            for target in output_targets(self, belt_map, machine_map):
+                self.wait_on(target)
+
+    def _has_output(self):
+        return any(inv.get_amount(item_id) > 0 for item_id, inv in self.output_inventories.items())
+
+    # The time into a process is counted in whole ticks (process_ticks)
+    # on top of process_offset, the seconds left over from the process
+    # before - never summed up tick by tick. A machine that slept through
+    # twenty ticks then ends up with exactly the same timer as one that
+    # was awake for all of them, and so does a replay or a loaded save.
+
+    @property
+    def process_ticks(self):
+        """Ticks into the current process, counting the ones the machine
+        slept through."""
+        if self._asleep_tick is None or self.completions is None:
+            return self._ticks
+        return self._ticks + self.completions.tick - self._asleep_tick
+
+    @process_ticks.setter
+    def process_ticks(self, value):
+        self._ticks = value
+        self._asleep_tick = None
+
+    @property
+    def process_timer(self):
+        """Seconds into the current process."""
+        return self.process_offset + self.process_ticks * self._dt
+
+    @process_timer.setter
+    def process_timer(self, value):
+        # Start counting ticks over from `value` seconds.
+        self.process_offset = value
+        self.process_ticks = 0
+
+    def _done_after(self, ticks, dt):
+        return self.process_offset + ticks * dt >= self.process_time - CompletionQueue.EPSILON
+
+    def _ticks_left(self, dt):
+        """Ticks from now until the process is done - by the same test
+        _update_processing makes, so the machine wakes on exactly that
+        tick."""
+        left = max(math.ceil((self.process_time - self.process_offset) / dt) - self._ticks, 1)
+        while left > 1 and self._done_after(self._ticks + left - 1, dt):
+            left -= 1
+        while not self._done_after(self._ticks + left, dt):
+            left += 1
+        return left
 
     def _update_processing(self, dt):
         if not self.processing and self.can_process():
             self.processing = True
             self.process_timer = 0.0
 
-        if self.processing:
-            self.process_timer += dt
-            if self.process_timer >= self.process_time:
-                self._complete_process()
+        if not self.processing:
+            return
+
+        # Asleep since an earlier tick - every tick it slept through
+        # counts, up to and including this one.
+        self._dt = dt
+        if self._asleep_tick is not None:
+            self._ticks += self.completions.tick - self._asleep_tick
+            self._asleep_tick = None
+        else:
+            self._ticks += 1
+
+        # The time left over after a process finishes goes into the next
+        # one, so a process shorter than a tick finishes several times in
+        # it - the rate doesn't depend on the tick length.
+        completed = False
+        while self.processing and self._done_after(self._ticks, dt):
+            self._complete_process()
+            self.process_timer = max(self.process_offset + self._ticks * dt - self.process_time, 0.0)
+            completed = True
+            if not self.can_process():
                 self.processing = False
                 self.process_timer = 0.0
 
+        if completed:
+            # Inputs were used up - whoever was stuck feeding us has room
+            # again.
+            self.wake_waiters()
+
     def try_receive_item(self, item, source_grid_pos, source_speed=None):
         """Try to add `item` to whichever input inventory actually needs
         it (matches the recipe input and has room). Triggers the visual
@@ -53,34 +175,51 @@ class ProducingMachine(Machine):
         identical acceptance rules and the same animation. `source_speed`
         is the feeding belt's tiles/sec, if there is one, so the animation
         matches how fast that belt actually moves."""
+        return self.try_receive_items(item, 1, source_grid_pos, source_speed) == 1
+
+    def try_receive_items(self, item, max_n, source_grid_pos, source_speed=None, source_inventory=None):
+        """Like try_receive_item, for up to `max_n` of `item` at once - as
+        many as the input inventory has room for, with one animation for
+        the lot. Taken out of `source_inventory` if one is given (see
+        inventory.transfer), otherwise the caller hands them over. Returns
+        how many it took."""
         inv = self.input_inventories.get(item.item_id)
         if inv is None:
-            return False
+            return 0
 
-        if not inv.try_add_items(item, 1):
-            return False
+        if source_inventory is not None:
+            count = transfer(source_inventory, inv, item, max_n)
+        else:
+            count = min(max_n, inv.space_for(item))
+            if count > 0:
+                inv.try_add_items(item, count)
+        if count <= 0:
+            return 0
 
         self.input_animator.start(item, source_grid_pos, self.grid_pos, self.WIDTH, self.HEIGHT, tiles_per_sec=source_speed)
-        return True
+        self.wake()
+        return count
 
     def _complete_process(self):
         # Remove inputs
-        for item_id, amount in self.recipe.inputs.items():
-            self.input_inventories[item_id].try_remove_item(item_id, amount)
+        for item_id, index, amount in self.recipe.input_ids:
+            self.input_inventories[item_id].try_remove_item(index, amount)
+            self.consumed[item_id] = self.consumed.get(item_id, 0) + amount
         # Add outputs
-        for item_id, amount in self.recipe.outputs.items():
-            self.output_inventories[item_id].try_add_items(item_id, amount)
+        for item_id, index, amount in self.recipe.output_ids:
+            self.output_inventories[item_id].try_add_items(index, amount)
+            self.produced[item_id] = self.produced.get(item_id, 0) + amount
 
     def can_process(self):
         if not self.recipe:
             return False
         # Check inputs
-        for item_id, amount in self.recipe.inputs.items():
-            if self.input_inventories[item_id].get_amount(item_id) < amount:
+        for item_id, index, amount in self.recipe.input_ids:
+            if self.input_inventories[item_id].get_amount(index) < amount:
                 return False
         # Check outputs
-        for item_id, amount in self.recipe.outputs.items():
-            if not self.output_inventories[item_id].can_add_items(item_id, amount):
+        for item_id, index, amount in self.recipe.output_ids:
+            if not self.output_inventories[item_id].can_add_items(index, amount):
                 return False
         return True
     
@@ -94,25 +233,18 @@ class ProducingMachine(Machine):
             for row in inv.slots:
                 for slot in row:
                     if slot:
-                        refund[slot["item"]] = refund.get(slot["item"], 0) + slot["amount"]
+                        item_id = ITEM_REGISTRY.item_id_of(slot["item"])
+                        refund[item_id] = refund.get(item_id, 0) + slot["amount"]
         return refund
 
     def set_recipe(self, recipe, player_inventory):
-        # Inputs
-        if hasattr(self, "input_inventories"):
-            for item_id, inv in self.input_inventories.items():
-                for row in inv.slots:
-                    for slot in row:
-                        if slot:
-                            player_inventory.try_add_items(slot["item"], slot["amount"])
-
-        # Outputs
-        if hasattr(self, "output_inventories"):
-            for item_id, inv in self.output_inventories.items():
-                for row in inv.slots:
-                    for slot in row:
-                        if slot:
-                            player_inventory.try_add_items(slot["item"], slot["amount"])
+        # Everything in the old inputs and outputs goes to the player - a
+        # whole stack per transfer.
+        if player_inventory is not None:
+            for inventories in (getattr(self, "input_inventories", {}), getattr(self, "output_inventories", {})):
+                for inv in inventories.values():
+                    for index in inv.contents():
+                        transfer(inv, player_inventory, index)
 
         self.processing = False
         self.process_timer = 0.0
@@ -122,6 +254,11 @@ class ProducingMachine(Machine):
 
         if recipe: self._reset_inventories(recipe)
 
+        # New inventories - this machine may have work to do, and anything
+        # that was stuck feeding it may fit now.
+        self.wake()
+        self.wake_waiters()
+
 
     def draw(self, screen, camera):
         if not self.image:
@@ -26,8 +26,8 @@ class Splitter(Machine):
         self.direction = direction or Vector2(1, 0)
         self.rotation_angle = 0
 
-        # Image
-        self.image_original = self.image.copy()
+        # Image - rotated lazily from image_original, see the image property
+        self._rotated_angle = None
         self.rect = py.Rect(
             self.grid_pos[0] * cell_size,
             self.grid_pos[1] * cell_size,
@@ -35,18 +35,25 @@ class Splitter(Machine):
             self.HEIGHT * cell_size
         )
 
+        # Cached from direction - reset by rotate()
+        self._relative_dirs = None
+        self._relative_ports = None
+
         # Item handling
         self.current_item = None
 
         self.current_output_index = 0
         self.item_progress = 0.0
+        self.prev_item_progress = 0.0
         self.current_item_speed = self.DEFAULT_TILES_PER_SEC
 
     def update(self, dt, belt_map, machine_map=None):
         if not self.current_item:
             self.item_progress = 0.0
+            self.sleep()  # until receive_item
             return
 
+        self.prev_item_progress = self.item_progress
         self.item_progress += self.current_item_speed * dt
 
         if self.item_progress >= 1.0:
@@ -56,29 +63,31 @@ class Splitter(Machine):
             else:
                 self.item_progress = 1.0
 
+                # Every output is full - sleep until one of them frees up.
+                self.prev_item_progress = self.item_progress
+                for target in self._output_targets(belt_map, machine_map or {}):
+                    self.wait_on(target)
+                self.sleep()
+
     def push_item(self, belt_map, machine_map=None):
         if not self.current_item:
             return False
 
         machine_map = machine_map or {}
-        relative_dirs = self._get_relative_dirs()
-        num_dirs = len(relative_dirs)
+        relative_ports = self.relative_ports
+        num_dirs = len(relative_ports)
 
         for _ in range(num_dirs):
-            direction = relative_dirs[self.current_output_index % num_dirs]
-            next_tile = (self.grid_pos[0] + int(direction.x), self.grid_pos[1] + int(direction.y))
+            next_tile, direction = relative_ports[self.current_output_index % num_dirs]
             seg = belt_map.get(next_tile)
 
             if seg is not None:
-                if seg.item is None and direction != -seg.direction:
-                    seg.item = self.current_item
-                    seg.item_progress = 0.0
-
-                    # The item enters this belt from the splitter direction
-                    seg.current_incoming_direction = direction
-
+                # The item enters this belt from the splitter direction
+                if direction != -seg.direction and seg.receive_item(self.current_item, direction):
                     self.current_item = None
                     self.current_output_index = (self.current_output_index + 1) % num_dirs
+                    self.items_out += 1
+                    self.wake_waiters()
                     return True
             else:
                 machine = machine_map.get(next_tile)
@@ -92,19 +101,51 @@ class Splitter(Machine):
                 if accepted:
                     self.current_item = None
                     self.current_output_index = (self.current_output_index + 1) % num_dirs
+                    self.items_out += 1
+                    self.wake_waiters()
                     return True
 
             self.current_output_index = (self.current_output_index + 1) % num_dirs
 
         return False
 
+    def _output_targets(self, belt_map, machine_map):
+        targets = {}
+        for next_tile, _ in self.relative_ports:
+            seg = belt_map.get(next_tile)
+            target = seg.line if seg is not None else machine_map.get(next_tile)
+            if target is not None:
+                targets[target] = None
+        return list(targets)
+
     def _get_relative_dirs(self):
-        dx, dy = float(self.direction.x), float(self.direction.y)
-        return [
-            Vector2(-dy, dx),  # left
-            Vector2(dx, dy),   # forward
-            Vector2(dy, -dx),  # right
-        ]
+        # Cached until the next rotate() - push_item asks every tick.
+        if self._relative_dirs is None:
+            dx, dy = float(self.direction.x), float(self.direction.y)
+            self._relative_dirs = [
+                Vector2(-dy, dx),  # left
+                Vector2(dx, dy),   # forward
+                Vector2(dy, -dx),  # right
+            ]
+        return self._relative_dirs
+
+    @property
+    def relative_ports(self):
+        """(tile, direction) for left, forward and right - cached like
+        _get_relative_dirs."""
+        if self._relative_ports is None:
+            self._relative_ports = [
+                ((self.grid_pos[0] + int(direction.x), self.grid_pos[1] + int(direction.y)), direction)
+                for direction in self._get_relative_dirs()
+            ]
+        return self._relative_ports
+
+    def _compute_output_ports(self):
+        # Besides the plain perimeter ports, a splitter pushes left, forward
+        # and right onto belts facing any way but straight back into it.
+        ports = super()._compute_output_ports()
+        ports.extend((tile, direction, True) for tile, direction in self.relative_ports)
+        return ports
 
     def receive_item(self, item, incoming_direction: Vector2 = None, source_speed=None):
         if self.current_item is not None:
@@ -116,8 +157,10 @@ class Splitter(Machine):
         self.current_item = item
         self.current_incoming_direction = incoming_direction
         self.item_progress = 0.0
+        self.prev_item_progress = 0.0
         self.current_item_speed = source_speed if source_speed is not None else self.DEFAULT_TILES_PER_SEC
 
+        self.wake()
         return True
 
     def get_refund_items(self):
@@ -127,12 +170,28 @@ class Splitter(Machine):
             refund[item_id] = refund.get(item_id, 0) + 1
         return refund
 
+    @property
+    def image_original(self):
+        return self.base_image
+
+    @property
+    def image(self):
+        # Re-rotated only when rotation_angle actually changed since the
+        # last draw, and never before the first draw - so placing (or
+        # simulating) a splitter doesn't need a display.
+        if self._rotated_angle != self.rotation_angle:
+            base = self.image_original
+            self._image = rotate(base, -self.rotation_angle) if base else None
+            self._rotated_angle = self.rotation_angle
+        return self._image
+
     def rotate(self):
         self.direction = Vector2(-self.direction.y, self.direction.x)
         self.rotation_angle = (self.rotation_angle + 90) % 360
-        self.image = rotate(self.image_original, -self.rotation_angle)
-        old_center = self.rect.center
-        self.rect = self.image.get_rect(center=old_center)
+
+        self._relative_dirs = None
+        self._relative_ports = None
+        self._output_ports = None
 
     def draw(self, screen, camera):
         draw_x = self.grid_pos[0] * self.cell_size - camera.x
@@ -0,0 +1,66 @@
+# plan
+"""Machines it takes to make given items at given rates - run from the
+repository root, like the game:
+
+    python src/plan.py iron_plate=60
+    python src/plan.py iron_plate=60 steel=10
+
+Rates are items per minute. Prints the machines per recipe (exact, and
+rounded up to whole buildings), the raw materials to bring in, the
+byproducts left over, and the belts to carry each item. See
+analysis.planner for the model."""
+import argparse
+import math
+import sys
+
+from analysis.planner import LinearProgramError, ProductionPlanner
+from constants.itemdata import ITEM_REGISTRY
+
+
+def parse_target(text):
+    item_id, _, rate = text.partition("=")
+    try:
+        rate = float(rate)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected ITEM=RATE, got {text!r}")
+
+    if ITEM_REGISTRY.get(item_id) is None:
+        raise argparse.ArgumentTypeError(f"unknown item {item_id!r}")
+    if not math.isfinite(rate) or rate < 0:
+        raise argparse.ArgumentTypeError(f"rate must be a finite number, not negative, got {text!r}")
+    return item_id, rate
+
+
+def report(plan):
+    print("machines:")
+    buildings = plan.buildings
+    for (machine_class, recipe), count in plan.machines.items():
+        print(f"  {buildings[(machine_class, recipe)]} x {machine_class.__name__} {recipe.name} "
+              f"({count:.2f} exactly, {plan.crafts[(machine_class, recipe)]:.2f} crafts/min)")
+    print("  total: " + (", ".join(f"{count} {name}" for name, count in plan.buildings_by_type().items()) or "nothing"))
+
+    print("\nbrought in per minute: " + (", ".join(f"{item_id} {rate:.1f}" for item_id, rate in plan.raw_inputs.items()) or "nothing"))
+    print("left over per minute: " + (", ".join(f"{item_id} {rate:.1f}" for item_id, rate in plan.surplus().items()) or "nothing"))
+
+    print("\nbelts:")
+    for item_id, (belt_type, count) in sorted(plan.belts().items()):
+        print(f"  {item_id}: {count} x {belt_type}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Production planner for Satis-Factorio")
+    parser.add_argument("targets", nargs="+", type=parse_target, metavar="ITEM=RATE", help="item to make and how many per minute")
+    args = parser.parse_args(argv)
+
+    try:
+        plan = ProductionPlanner().plan(dict(args.targets))
+    except (LinearProgramError, RuntimeError) as error:
+        # RuntimeError: no NumPy
+        print(f"no plan: {error}")
+        return 1
+    report(plan)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# replay
+"""Re-run a recorded session headless, as fast as the CPU allows - run
+from the repository root, like the game:
+
+    python src/main.py --record session.sfpr     (play, then quit)
+    python src/replay.py session.sfpr
+    python src/replay.py session.sfpr --profile
+
+Prints how long the replay took and where the simulation spent it. The
+exit status is 1 if the replay didn't end up exactly where the recording
+did - the simulation has stopped being deterministic."""
+import argparse
+import cProfile
+import pstats
+import sys
+import time
+
+from game.replay import Replay
+from systems.rendering.pass_timer import PassTimer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded Satis-Factorio session headless")
+    parser.add_argument("path", help="replay file written by main.py --record")
+    parser.add_argument("--profile", action="store_true", help="run under cProfile and print the top functions")
+    parser.add_argument("--top", type=int, default=25, help="functions shown with --profile")
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.path)
+    timer = PassTimer()
+
+    profile = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profile is not None:
+        simulation = profile.runcall(replay.run, timer)
+    else:
+        simulation = replay.run(timer)
+    elapsed = time.perf_counter() - start
+
+    print(f"{replay.ticks} ticks, {len(replay.commands)} commands in {elapsed:.3f} s ({replay.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    for name, seconds in timer.times.items():
+        print(f"  {name:<20} {seconds * 1000:10.1f} ms")
+
+    if profile is not None:
+        pstats.Stats(profile).sort_stats("cumulative").print_stats(args.top)
+
+    if not replay.matches(simulation):
+        print("MISMATCH: the replay ended in a different state than the recording", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,9 +5,11 @@ from objects.machines.splitter import Splitter
 from objects.conveyors.belt_segment import BeltSegment
 from objects.machines.smelter import Smelter
 from core.vector2 import Vector2
+from game.blueprint import Blueprint
+from game.commands import DeleteRegion, PasteBlueprint
 
 class BuildSystem:
-    def __init__(self, world, player, camera, grid, belt_system, machine_system, machine_ui, player_inventory_ui):
+    def __init__(self, world, player, camera, grid, belt_system, machine_system, machine_ui, player_inventory_ui, command_runner):
         self.world = world
         self.player = player
         self.camera = camera
@@ -16,29 +18,46 @@ class BuildSystem:
         self.machine_system = machine_system
         self.machine_ui = machine_ui
         self.player_inventory_ui = player_inventory_ui
+        self.command_runner = command_runner
 
         # Build state
         self.build_mode = None
         self.selected_machine_class = Smelter
         self.hovered_delete_target = None
+        self.drag_start = None  # tile the mouse went down on, deleting or copying
+        self.blueprint = None   # last copied Blueprint, stamped in "pasting" mode
 
     def handle_placement(self, event):
         if self.player_inventory_ui.open or self.machine_ui.open: return
+        if event.type == py.MOUSEBUTTONUP and event.button == 1:
+            self._handle_drag_release(event)
+            return
         if event.type != py.MOUSEBUTTONDOWN or event.button != 1: return
 
         mx, my = event.pos
         world_x = mx + self.camera.x
         world_y = my + self.camera.y
 
+        # Copy mode - the blueprint is captured when the mouse is released
+        if self.build_mode == "copying":
+            self.drag_start = self.world.snap_to_tile(world_x, world_y)
+            return
+
+        # Paste mode
+        if self.build_mode == "pasting":
+            if not self._mouse_over_ui(mx, my):
+                self._submit(self.paste_command(self.world.snap_to_tile(world_x, world_y)))
+            return
+
         # Delete mode
         if self.build_mode == "deleting":
-            self.machine_system.delete_machine(mx, my)
-            self.belt_system.delete_belt(
+            self.drag_start = self.world.snap_to_tile(world_x, world_y)
+            self._submit(self.machine_system.machine_deletion_command(mx, my))
+            self._submit(self.belt_system.belt_deletion_command(
                 mx, my,
                 delete_whole=bool(py.key.get_mods() & py.KMOD_SHIFT),
                 camera_x=self.camera.x,
-                camera_y=self.camera.y)
-            self.belt_system.update_belt_incoming_directions()
+                camera_y=self.camera.y))
             return
 
         # Belt placement
@@ -53,17 +72,87 @@ class BuildSystem:
             else:
                 if self._mouse_over_ui(mx, my):
                     return
-                self.belt_system.place_belt(world_x, world_y, self.belt_system.selected_belt_type)
+                self._submit(self.belt_system.belt_placement_command(world_x, world_y, self.belt_system.selected_belt_type))
                 self.belt_system.placing_belt = False
                 return
 
         # Machine placement
         if self.build_mode == "building" and self.selected_machine_class is not None:
-            self.machine_system.place_machine(self.selected_machine_class)
-            self.belt_system.update_belt_incoming_directions()
+            self._submit(self.machine_system.machine_placement_command(self.selected_machine_class))
             if hasattr(self, 'preview_splitter'):
                 self.preview_splitter = None
 
+    def _submit(self, command):
+        # None: the action was blocked or unaffordable - nothing to do.
+        # The runner checks it again against what's already queued this
+        # frame.
+        if command is not None:
+            self.command_runner.try_submit(command)
+
+    def _handle_drag_release(self, event):
+        """Releasing the mouse in copy mode copies the rectangle it was
+        dragged over into a blueprint and starts pasting it. In delete
+        mode, releasing it on another tile than it was pressed on clears
+        the whole rectangle in between."""
+        start, self.drag_start = self.drag_start, None
+        if start is None:
+            return
+
+        mx, my = event.pos
+        end = self.world.snap_to_tile(mx + self.camera.x, my + self.camera.y)
+
+        if self.build_mode == "copying":
+            blueprint = Blueprint.capture(self.world, start, end)
+            if len(blueprint):
+                self.blueprint = blueprint
+                self.build_mode = "pasting"
+        elif self.build_mode == "deleting" and end != start:
+            self._submit(self.region_deletion_command(start, end))
+
+    def paste_status(self, origin):
+        """Whether the blueprint can be stamped with its top left at
+        `origin`: "ok", "blocked" (the player is in the way, or - without
+        shift - anything is), "no_space" for the refunds of what it would
+        replace, or "no_funds". One check over the aggregate cost, in an
+        InventoryTransaction - on top of whatever is already queued this
+        frame, so a second stamp can't overlap the first or be paid for
+        with the same items."""
+        cells = self.blueprint.cells(origin)
+        if any(self.world.is_blocked_by_player(cell) for cell in cells):
+            return "blocked"
+        if not self.belt_system.get_placement_modifiers() and any(self.world.is_cell_blocked(cell) for cell in cells):
+            return "blocked"
+
+        pending = self.command_runner.pending_tiles
+        if pending and any(tile in pending for tile in PasteBlueprint(self.blueprint, origin).tiles(self.world)):
+            return "blocked"
+
+        replaced_segments, replaced_machines = self.world.gather_occupants(cells)
+        total_cost = self.blueprint.build_cost(self.belt_system.BUILD_COSTS)
+        return self.belt_system.check_placement_affordability(
+            replaced_segments, replaced_machines, total_cost, scratch=self.command_runner.staged.copy())
+
+    def paste_command(self, origin):
+        """The PasteBlueprint for stamping the blueprint at `origin` - or
+        None if it can't be (see paste_status)."""
+        if self.blueprint is None or self.paste_status(origin) != "ok":
+            return None
+        return PasteBlueprint(self.blueprint, origin)
+
+    def region_deletion_command(self, corner, other_corner):
+        """The DeleteRegion for the rectangle between two tiles - or None if
+        it's empty, or there's no room for the refunds."""
+        cells = DeleteRegion.region_cells(corner, other_corner)
+        replaced_segments, replaced_machines = self.world.gather_occupants(cells)
+        if not replaced_segments and not replaced_machines:
+            return None
+
+        scratch = self.player.inventory.begin()
+        if not self.belt_system.apply_refunds(scratch, replaced_segments, replaced_machines):
+            return None
+
+        return DeleteRegion(corner, other_corner)
+
     def update_hovered_delete_target(self):
         if self.build_mode != "deleting":
             self.hovered_delete_target = None
@@ -76,11 +165,10 @@ class BuildSystem:
 
         # Check machines by tile
         self.hovered_delete_target = None
-        for machine in self.world.machines:
-            for cell in getattr(machine, "occupied_cells", []):
-                if cell == (grid_x, grid_y):
-                    self.hovered_delete_target = machine
-                    return
+        machine = self.world.get_machine_at((grid_x, grid_y))
+        if machine:
+            self.hovered_delete_target = machine
+            return
 
         # Check belts by tile
         seg = self.world.belt_map.get((grid_x, grid_y))
@@ -124,6 +212,20 @@ class BuildSystem:
             self.build_mode = "building"
             self.belt_system.placing_belt = False
 
+    def toggle_copy_mode(self):
+        if self.build_mode == "copying":
+            self.build_mode = None
+        else:
+            self.build_mode = "copying"
+            self.belt_system.placing_belt = False
+        self.drag_start = None
+
+    def enter_paste_mode(self):
+        """Back to stamping the last copied blueprint, if there is one."""
+        if self.blueprint is not None:
+            self.build_mode = "pasting"
+            self.belt_system.placing_belt = False
+
     def toggle_delete_mode(self):
         if self.build_mode == "deleting":
             self.build_mode = None
@@ -140,6 +242,7 @@ class BuildSystem:
     
     def reset_build_state(self):
         self.build_mode = None
+        self.drag_start = None
         self.selected_machine_class = Smelter
         self.belt_system.placing_belt = False
         self.reset_rotation()
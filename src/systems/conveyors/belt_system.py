@@ -2,6 +2,8 @@
 import pygame as py
 from core.vector2 import Vector2
 from objects.conveyors.belt_segment import BeltSegment
+from objects.conveyors.transport_line import TransportLine
+from game.commands import PlaceBelt, DeleteBelts
 
 class BeltSystem:
     BUILD_COSTS = {
@@ -60,8 +62,11 @@ class BeltSystem:
 
         return replaced_segments, replaced_machines, total_cost
 
-    def check_placement_affordability(self, replaced_segments, replaced_machines, total_cost):
-        scratch = self.player.inventory.clone()
+    def check_placement_affordability(self, replaced_segments, replaced_machines, total_cost, scratch=None):
+        # `scratch`: an InventoryTransaction to check on instead of the
+        # player's inventory as it is.
+        if scratch is None:
+            scratch = self.player.inventory.begin()
         if not self.apply_refunds(scratch, replaced_segments, replaced_machines):
             return "no_space"
         return "ok" if scratch.try_remove_items(total_cost) else "no_funds"
@@ -86,7 +91,10 @@ class BeltSystem:
         tiles = self._get_tiles_for_drag(start_tile, end_tile, horizontal_first=horizontal_first)
         return list(reversed(tiles)) if reversed_flow else tiles
 
-    def place_belt(self, world_x2, world_y2, belt_type="basic"):
+    def belt_placement_command(self, world_x2, world_y2, belt_type="basic"):
+        """The PlaceBelt for dragging from the drag start to (world_x2,
+        world_y2) - or None if it's blocked or can't be afforded. Nothing
+        changes until it's run (see CommandRunner)."""
         start_tile = (self.beltX1, self.beltY1)
         end_tile = self.world.snap_to_tile(world_x2, world_y2)
 
@@ -96,55 +104,38 @@ class BeltSystem:
         allow_replace = self.get_placement_modifiers()
 
         if any(self.is_tile_blocked_for_placement(seg.grid_pos, allow_replace) for seg in segments):
-            return  # Can't build here
+            return None  # Can't build here
 
         replaced_segments, replaced_machines, total_cost = self.gather_replacements(segments, belt_type)
 
         # Simulate the whole operation first - no lost items, no partial
         # placement if anything doesn't fit or isn't affordable.
         if self.check_placement_affordability(replaced_segments, replaced_machines, total_cost) != "ok":
-            return
-
-        # Simulation succeeded exactly as it will for real - apply it.
-        self.apply_refunds(self.player.inventory, replaced_segments, replaced_machines)
-        for old_seg in replaced_segments:
-            old_seg._clear_item()
-            self.world.remove_belt_segment(old_seg)
-        for machine in replaced_machines:
-            self.world.remove_machine(machine)
+            return None
 
-        self.player.inventory.try_remove_items(total_cost)
-
-        # Add segments to world
-        for seg in segments:
-            self.world.add_belt_segment(seg)
-
-        self.update_belt_incoming_directions()
+        return PlaceBelt([(seg.grid_pos, (int(seg.direction.x), int(seg.direction.y))) for seg in segments], belt_type)
 
     def can_afford_belt_deletion(self, segments):
-        scratch = self.player.inventory.clone()
+        scratch = self.player.inventory.begin()
         return self.apply_refunds(scratch, segments, [])
 
-    def delete_belt(self, mx, my, delete_whole=False, camera_x=0, camera_y=0):
+    def belt_deletion_command(self, mx, my, delete_whole=False, camera_x=0, camera_y=0):
+        """The DeleteBelts for the belt under the mouse (the whole
+        connected belt with shift) - or None if there's none, or no room
+        for the refund."""
         world_x, world_y = mx + camera_x, my + camera_y
         shift_held = py.key.get_mods() & py.KMOD_SHIFT
 
         target_seg = self.world.get_belt_segment_at(world_x, world_y)
         if not target_seg:
-            return
+            return None
 
         to_delete = self.get_connected_belt_segments(target_seg) if (delete_whole or shift_held) else [target_seg]
 
         if not self.can_afford_belt_deletion(to_delete):
-            return  # Not enough inventory space to receive the refund
+            return None  # Not enough inventory space to receive the refund
 
-        for seg in to_delete:
-            seg.refund_item_on_segment(self.player.inventory)
-            for item_id, amount in self.BUILD_COSTS[seg.belt_type].items():
-                self.player.inventory.try_add_items(item_id, amount)
-            self.world.remove_belt_segment(seg)
-
-        self.update_belt_incoming_directions()
+        return DeleteBelts([seg.grid_pos for seg in to_delete])
 
     def get_connected_belt_segments(self, start_seg):
         visited = set()
@@ -224,13 +215,122 @@ class BeltSystem:
 
 
     def update_belt_incoming_directions(self, segments=None):
-        targets = segments or self.world.belt_segments
+        """Recompute which directions feed each belt and regroup the
+        affected belts into TransportLines. By default only the belts on
+        and next to tiles the World marked dirty since the last call are
+        looked at - nothing else can have changed, so one build action
+        costs the same in a small factory as in a huge one. Pass
+        `segments` to recompute those explicitly instead."""
+        if segments is None:
+            segments = self._dirty_segments()
 
-        for seg in targets:
+        for seg in segments:
             seg.incoming_directions = self._calculate_incoming_for_segment(
                 seg, self.world.belt_map
             )
 
+        self.rebuild_transport_lines(segments)
+
+    def _dirty_segments(self):
+        """Every belt on a dirty tile or next to one, in a stable order."""
+        belt_map = self.world.belt_map
+        segments = {}
+
+        for x, y in self.world.take_dirty_tiles():
+            for pos in ((x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                seg = belt_map.get(pos)
+                if seg is not None:
+                    segments[seg] = None
+
+        return list(segments)
+
+    def rebuild_transport_lines(self, segments=None):
+        """Regroup belts into maximal TransportLines, carrying over whatever
+        items are on them right now. With `segments`, only the lines those
+        segments and their neighbours belong to are rebuilt: a belt's
+        predecessor is always next to it, so any line that could merge
+        with or split off from them is among those. Without, every line
+        in the world is. Belts without a line yet (World.add_belt_segments)
+        are grouped in too."""
+        if segments is None:
+            old_lines = list(self.world.belt_lines)
+            new_segments = [seg for seg in self.world.belt_segments if seg.line is None]
+        else:
+            old_lines = {}
+            belt_map = self.world.belt_map
+            for seg in segments:
+                x, y = seg.grid_pos
+                for pos in ((x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                    neighbour = belt_map.get(pos)
+                    if neighbour is not None and neighbour.line is not None:
+                        old_lines[neighbour.line] = None
+            new_segments = [seg for seg in segments if seg.line is None]
+
+        if not old_lines and not new_segments:
+            return
+
+        items = [entry for line in old_lines for entry in line.segment_items()]
+        chain_segments = [seg for line in old_lines for seg in line.segments] + new_segments
+
+        for line in old_lines:
+            self.world.remove_belt_line(line)
+
+        new_lines = [TransportLine(chain) for chain in self._line_chains(chain_segments)]
+
+        items_by_line = {}
+        for entry in items:
+            items_by_line.setdefault(entry[0].line, []).append(entry)
+
+        for line in new_lines:
+            line.load_items(items_by_line.get(line, ()))
+            self.world.add_belt_line(line)
+
+    def _line_predecessor(self, seg):
+        """The belt feeding `seg`, if it's the only thing feeding it and
+        both move at the same speed - i.e. the two can share a line.
+        Anything with more than one input (a merge, or a machine or
+        splitter pushing in from the side) starts a line of its own."""
+        if len(seg.incoming_directions) != 1:
+            return None
+
+        incoming = seg.incoming_directions[0]
+        x, y = seg.grid_pos
+        previous = self.world.belt_map.get((x - incoming.x, y - incoming.y))
+
+        if previous is None or previous.direction != incoming or previous.belt_type != seg.belt_type:
+            return None
+        return previous
+
+    def _line_chains(self, segments):
+        """Split `segments` into chains, each ordered from its head to its
+        tail, where every segment is the only input of the next."""
+        members = set(segments)
+        predecessors = {}
+        for seg in segments:
+            previous = self._line_predecessor(seg)
+            predecessors[seg] = previous if previous in members else None
+        successors = {previous: seg for seg, previous in predecessors.items() if previous is not None}
+
+        visited = set()
+
+        def walk(start):
+            chain = []
+            seg = start
+            while seg is not None and seg not in visited:
+                visited.add(seg)
+                chain.append(seg)
+                seg = successors.get(seg)
+            return chain
+
+        chains = [walk(seg) for seg in segments if predecessors[seg] is None]
+
+        # Whatever is left over is a closed loop - it can start anywhere.
+        for seg in segments:
+            if seg not in visited:
+                chains.append(walk(seg))
+
+        return chains
+
     def _calculate_incoming_for_segment(self, seg, lookup_map, extra_machines=None, exclude_machines=None):
         x, y = seg.grid_pos
 
@@ -259,43 +359,33 @@ class BeltSystem:
         # exclude_machines lets a preview act as if a real one were already
         # gone (e.g. a hovered deletion target).
         excluded = exclude_machines or []
-        all_machines = [m for m in self.world.machines if m not in excluded] + list(extra_machines or [])
+        ports = [port for port in self.world.machine_outputs.get((x, y), ()) if port[0] not in excluded]
+        for machine in extra_machines or []:
+            ports.extend((machine, push_direction, any_facing)
+                         for tile, push_direction, any_facing in machine.output_ports
+                         if tile == (x, y))
 
         # A machine pushing into this segment only ever succeeds when the
         # segment faces directly away from it (ProducingMachine.push_output
         # requires an exact direction match) - so the only valid incoming
         # entry a machine can contribute is the segment's own direction.
-        for machine in all_machines:
-            get_output_tiles = getattr(machine, "_get_output_tiles", None)
-            if get_output_tiles is None:
+        for machine, push_direction, any_facing in ports:
+            if any_facing:
                 continue
 
-            for (dx, dy), push_direction in get_output_tiles():
-                if (machine.grid_pos[0] + dx, machine.grid_pos[1] + dy) != (x, y):
-                    continue
-
-                if push_direction == seg.direction and push_direction not in incoming_directions:
-                    incoming_directions.append(push_direction)
+            if push_direction == seg.direction and push_direction not in incoming_directions:
+                incoming_directions.append(push_direction)
 
         # A splitter accepts any orientation except facing directly back
         # into it (Splitter.push_item), so unlike a machine it can
         # contribute a perpendicular direction too - same exclusion rule
         # as belts feeding each other.
-        for splitter in all_machines:
-            get_relative_dirs = getattr(splitter, "_get_relative_dirs", None)
-            if get_relative_dirs is None:
+        for splitter, push_direction, any_facing in ports:
+            if not any_facing:
                 continue
 
-            for push_direction in get_relative_dirs():
-                tile = (
-                    splitter.grid_pos[0] + int(push_direction.x),
-                    splitter.grid_pos[1] + int(push_direction.y)
-                )
-                if tile != (x, y):
-                    continue
-
-                if push_direction != -seg.direction and push_direction not in incoming_directions:
-                    incoming_directions.append(push_direction)
+            if push_direction != -seg.direction and push_direction not in incoming_directions:
+                incoming_directions.append(push_direction)
 
         # Fallback for isolated belts
         if not incoming_directions:
@@ -350,12 +440,8 @@ class BeltSystem:
     def _splitter_affected_belt_positions(self, splitter):
         positions = set()
 
-        for push_direction in splitter._get_relative_dirs():
-            tile = (
-                splitter.grid_pos[0] + int(push_direction.x),
-                splitter.grid_pos[1] + int(push_direction.y)
-            )
-            if tile in self.world.belt_map:
+        for tile, _, any_facing in splitter.output_ports:
+            if any_facing and tile in self.world.belt_map:
                 positions.add(tile)
 
         return positions
@@ -5,6 +5,7 @@ from objects.machines.assembler import Assembler
 from objects.machines.smelter import Smelter
 from objects.machines.splitter import Splitter
 from objects.conveyors.belt_segment import BeltSegment
+from game.commands import FillInputs
 
 
 class InputSystem:
@@ -36,13 +37,20 @@ class InputSystem:
             self.build_system.toggle_delete_mode()
             return
 
+        if event.key == py.K_c:
+            self.ui_manager.close_all_uis()
+            self.build_system.toggle_copy_mode()
+            return
+
+        if event.key == py.K_v:
+            self.ui_manager.close_all_uis()
+            self.build_system.enter_paste_mode()
+            return
+
         if event.key == py.K_i:
             if self.machine_ui.open and self.machine_ui.selected_machine:
                 machine = self.machine_ui.selected_machine
-                for item_id, amount in machine.recipe.inputs.items():
-                    if item_id in machine.input_inventories:
-                        inv = machine.input_inventories[item_id]
-                        inv.try_add_items(item_id, amount)
+                self.build_system.command_runner.try_submit(FillInputs(machine.grid_pos))
             return
 
         if event.key == py.K_f:
@@ -132,4 +140,8 @@ class InputSystem:
         
         if self.build_system.build_mode == "deleting":
             self.build_system.enter_build_mode()
+            return
+
+        if self.build_system.build_mode in ("copying", "pasting"):
+            self.build_system.reset_build_state()
             return
\ No newline at end of file
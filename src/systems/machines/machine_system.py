@@ -4,6 +4,7 @@ import pygame as py
 from objects.machines.splitter import Splitter
 from core.vector2 import Vector2
 from systems.conveyors.belt_system import BeltSystem
+from game.commands import PlaceMachine, DeleteMachine
 
 class MachineSystem:
     def __init__(self, world, player, camera, grid):
@@ -16,9 +17,11 @@ class MachineSystem:
         self.just_placed_machine = False
         self.splitter_rotation_steps = 0
 
-    def place_machine(self, selected_machine_class):
+    def machine_placement_command(self, selected_machine_class):
+        """The PlaceMachine for putting `selected_machine_class` under the
+        mouse - or None if it's blocked or can't be afforded."""
         if selected_machine_class is None:
-            return
+            return None
 
         # Snap mouse to grid
         mx, my = py.mouse.get_pos()
@@ -36,7 +39,6 @@ class MachineSystem:
             direction = direction_map[self.splitter_rotation_steps]
             machine = Splitter(grid_pos=(top_left_x, top_left_y), direction=direction)
             machine.rotation_angle = self.splitter_rotation_steps * 90
-            machine.image = py.transform.rotate(machine.image_original, -machine.rotation_angle)
         else:
             machine = selected_machine_class(grid_pos=(top_left_x, top_left_y))
 
@@ -46,52 +48,45 @@ class MachineSystem:
         # The player always blocks. A belt or machine tile only blocks if
         # we're not allowed to replace it (shift held).
         if any(self.world.is_blocked_by_player(cell) for cell in cells):
-            return
+            return None
         if not allow_replace and any(self.world.is_cell_blocked(cell) for cell in cells):
-            return
+            return None
 
         replaced_segments, replaced_machines = self.world.gather_occupants(cells)
 
         # Simulate the whole operation first - no lost items, no partial
         # placement if a refund doesn't fit or the cost isn't affordable.
-        scratch = self.player.inventory.clone()
+        scratch = self.player.inventory.begin()
         if not BeltSystem.apply_refunds(scratch, replaced_segments, replaced_machines):
-            return
+            return None
         if not scratch.try_remove_items(cost):
-            return
-
-        # Simulation succeeded exactly as it will for real - apply it.
-        BeltSystem.apply_refunds(self.player.inventory, replaced_segments, replaced_machines)
-        for old_seg in replaced_segments:
-            old_seg._clear_item()
-            self.world.remove_belt_segment(old_seg)
-        for old_machine in replaced_machines:
-            self.world.remove_machine(old_machine)
-
-        self.player.inventory.try_remove_items(cost)
-        self.world.add_machine(machine)
+            return None
+
         self.preview_machine = None
         self.just_placed_machine = True
 
+        rotation_steps = self.splitter_rotation_steps if isinstance(machine, Splitter) else 0
+        return PlaceMachine(type(machine).__name__, machine.grid_pos, rotation_steps)
+
     def can_afford_deletion(self, machine):
         """True if the player's inventory has room for everything this
         machine would refund (build cost plus whatever it's holding)."""
-        scratch = self.player.inventory.clone()
+        scratch = self.player.inventory.begin()
         return BeltSystem.apply_refunds(scratch, [], [machine])
 
-    def delete_machine(self, mx, my):
+    def machine_deletion_command(self, mx, my):
+        """The DeleteMachine for the machine under the mouse - or None if
+        there's none, or no room for the refund."""
         grid_x, grid_y = self.world.snap_to_tile(mx + self.camera.x, my + self.camera.y)
 
-        for machine in list(self.world.machines):
-            if (grid_x, grid_y) in getattr(machine, "occupied_cells", []):
-                if not self.can_afford_deletion(machine):
-                    return  # Not enough inventory space to receive the refund
+        machine = self.world.get_machine_at((grid_x, grid_y))
+        if machine is None:
+            return None
 
-                for item_id, amount in machine.get_refund_items().items():
-                    self.player.inventory.try_add_items(item_id, amount)
+        if not self.can_afford_deletion(machine):
+            return None  # Not enough inventory space to receive the refund
 
-                self.world.remove_machine(machine)
-                return
+        return DeleteMachine(machine.grid_pos)
 
     def get_machine_placement_preview(self, selected_machine_class):
         mx, my = py.mouse.get_pos()
@@ -16,6 +16,7 @@ class BuildModeRenderer:
 
         self.delete_overlay_tile = self._make_tile_overlay((255, 0, 0, 100))
         self.delete_blocked_overlay_tile = self._make_tile_overlay((255, 165, 0, 100))
+        self.paste_overlay_tile = self._make_tile_overlay((80, 200, 80, 100))
         self.update_overlay_surfaces(camera.screen_width, camera.screen_height)
 
     def _make_tile_overlay(self, color):
@@ -29,6 +30,8 @@ class BuildModeRenderer:
         self._draw_ghost()
         self._draw_delete_ghost()
         self._highlight_hovered_delete_target(screen)
+        self._draw_drag_selection(screen)
+        self._draw_blueprint_ghost(screen)
         
     def _draw_ghost(self):
         if (self.build_system.build_mode == "building" and self.build_system.selected_machine_class is not None):
@@ -72,6 +75,40 @@ class BuildModeRenderer:
                 overlay.fill(overlay_color)
                 screen.blit(overlay, (rect.x - self.camera.x, rect.y - self.camera.y))
     
+    def _mouse_tile(self):
+        mx, my = py.mouse.get_pos()
+        return ((mx + self.camera.x) // self.grid.CELL_SIZE, (my + self.camera.y) // self.grid.CELL_SIZE)
+
+    def _draw_drag_selection(self, screen):
+        """Outline of the rectangle being dragged out for copying or
+        deleting."""
+        start = self.build_system.drag_start
+        if start is None or self.build_system.build_mode not in ("copying", "deleting"):
+            return
+
+        end = self._mouse_tile()
+        cell = self.grid.CELL_SIZE
+        left, top = min(start[0], end[0]), min(start[1], end[1])
+        width, height = abs(start[0] - end[0]) + 1, abs(start[1] - end[1]) + 1
+        color = (80, 160, 255) if self.build_system.build_mode == "copying" else (255, 0, 0)
+
+        rect = py.Rect(left * cell - self.camera.x, top * cell - self.camera.y, width * cell, height * cell)
+        py.draw.rect(screen, color, rect, 2)
+
+    def _draw_blueprint_ghost(self, screen):
+        """The blueprint's tiles under the mouse: green where it can be
+        pasted, orange where it can't."""
+        if self.build_system.build_mode != "pasting" or self.build_system.blueprint is None:
+            return
+
+        origin = self._mouse_tile()
+        can_paste = self.build_system.paste_status(origin) == "ok"
+        overlay_tile = self.paste_overlay_tile if can_paste else self.delete_blocked_overlay_tile
+
+        cell = self.grid.CELL_SIZE
+        for grid_x, grid_y in self.build_system.blueprint.cells(origin):
+            screen.blit(overlay_tile, (grid_x * cell - self.camera.x, grid_y * cell - self.camera.y))
+
     def _draw_build_overlay(self, screen):
         if self.build_system.build_mode == "building":
             screen.blit(self.overlay_build_place, (0, 0))
@@ -8,7 +8,7 @@ from systems.conveyors.belt_system import BeltSystem
 
 class _SplitterPreviewStub:
     """Minimal stand-in for a Splitter - just grid_pos/direction and
-    _get_relative_dirs, enough for BeltSystem's duck-typed topology
+    output_ports, enough for BeltSystem's duck-typed topology
     checks. Avoids instantiating a real Splitter (which loads its sprite
     from disk) purely to preview how it would affect nearby belts."""
 
@@ -24,6 +24,13 @@ class _SplitterPreviewStub:
             Vector2(dy, -dx),
         ]
 
+    @property
+    def output_ports(self):
+        return [
+            ((self.grid_pos[0] + int(direction.x), self.grid_pos[1] + int(direction.y)), direction, True)
+            for direction in self._get_relative_dirs()
+        ]
+
 
 class GhostMachineRenderer:
     """Draws the translucent placement preview for the currently selected machine class."""
@@ -122,7 +129,7 @@ class GhostMachineRenderer:
 
         replaced_segments, replaced_machines = self.world.gather_occupants(cells)
 
-        scratch = self.player.inventory.clone()
+        scratch = self.player.inventory.begin()
         if not BeltSystem.apply_refunds(scratch, replaced_segments, replaced_machines):
             return "no_space"
         if not scratch.try_remove_items(cost):
@@ -0,0 +1,51 @@
+# systems.rendering.pass_timer
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class PassTimer:
+    """Wall time and blit count per render pass, summed over however many
+    frames it's handed to RenderSystem.draw (call end_frame() after each).
+    Passes are named after what they draw - "grid", "belts", "items",
+    "machines", "ghosts", "ui"...
+
+    Blits are only counted when the screen keeps a `blit_count` (see
+    benchmarks.counting_surface) - a plain display surface can't tell, so
+    in the game they stay 0."""
+
+    def __init__(self):
+        self.times = {}   # pass -> seconds
+        self.blits = {}   # pass -> blits
+        self.frames = 0
+
+    @contextmanager
+    def measure(self, name, screen=None):
+        blits = getattr(screen, "blit_count", 0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0.0) + time.perf_counter() - start
+            self.blits[name] = self.blits.get(name, 0) + getattr(screen, "blit_count", 0) - blits
+
+    def end_frame(self):
+        self.frames += 1
+
+    def reset(self):
+        self.times.clear()
+        self.blits.clear()
+        self.frames = 0
+
+
+class NullPassTimer:
+    """What the renderers (and the Simulation) time with when nobody's
+    measuring - see also game.profiler.Profiler."""
+
+    def measure(self, name, screen=None):
+        return nullcontext()
+
+    def end_frame(self):
+        pass
+
+
+NULL_PASS_TIMER = NullPassTimer()
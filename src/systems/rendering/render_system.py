@@ -1,4 +1,6 @@
 # systems.rendering.render_system
+from systems.rendering.pass_timer import NULL_PASS_TIMER
+
 class RenderSystem:
     def __init__(self, world_renderer, build_renderer, ui_renderer, cursor_renderer):
         self.world_renderer = world_renderer
@@ -6,10 +8,16 @@ class RenderSystem:
         self.ui_renderer = ui_renderer
         self.cursor_renderer = cursor_renderer
 
-    def draw(self, screen):
-        screen.fill("#987171") # background color
+    def draw(self, screen, timer=NULL_PASS_TIMER):
+        """Draw one frame. Pass a PassTimer to find out what each pass
+        costs - the render benchmark does."""
+        with timer.measure("background", screen):
+            screen.fill("#987171") # background color
 
-        self.world_renderer.draw(screen)
-        self.build_renderer.draw(screen)
-        self.ui_renderer.draw(screen)
-        self.cursor_renderer.draw(screen)
\ No newline at end of file
+        self.world_renderer.draw(screen, timer)
+        with timer.measure("ghosts", screen):
+            self.build_renderer.draw(screen)
+        with timer.measure("ui", screen):
+            self.ui_renderer.draw(screen)
+        with timer.measure("cursor", screen):
+            self.cursor_renderer.draw(screen)
\ No newline at end of file
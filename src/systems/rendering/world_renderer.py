@@ -1,7 +1,8 @@
 # systems.rendering.world_renderer
+from systems.rendering.pass_timer import NULL_PASS_TIMER
 
 class WorldRenderer:
-    def __init__(self, world, camera, player, belt_sprite_manager, item_renderer, build_system, grid):
+    def __init__(self, world, camera, player, belt_sprite_manager, item_renderer, build_system, grid, tick_scheduler):
         self.world = world
         self.camera = camera
         self.player = player
@@ -9,30 +10,44 @@ class WorldRenderer:
         self.item_renderer = item_renderer
         self.build_system = build_system
         self.grid = grid
+        self.tick_scheduler = tick_scheduler
 
         self.image_cache = {}
     
-    def draw(self, screen):
-        self._draw_grid(screen)
+    def draw(self, screen, timer=NULL_PASS_TIMER):
+        with timer.measure("grid", screen):
+            self._draw_grid(screen)
 
-        self._draw_belt_segments(screen)
-        self._draw_items(screen)
-        self._draw_machines(screen)
-        self.player.draw(screen, self.camera)
+        with timer.measure("belts", screen):
+            self._draw_belt_segments(screen)
+        with timer.measure("items", screen):
+            self._draw_items(screen)
+        with timer.measure("machines", screen):
+            self._draw_machines(screen)
+        with timer.measure("player", screen):
+            self.player.draw(screen, self.camera)
     
     def _draw_grid(self, screen):
         if self.build_system.build_mode is not None:
             self.grid.draw(screen, self.camera)
 
-    def _draw_belt_segments(self, screen):
+    def _visible_tiles(self):
+        """(left, top, right, bottom) tile bounds of the camera view,
+        right/bottom exclusive."""
         cell_size = self.grid.CELL_SIZE
+        return (
+            self.camera.x // cell_size,
+            self.camera.y // cell_size,
+            (self.camera.x + self.camera.screen_width) // cell_size + 1,
+            (self.camera.y + self.camera.screen_height) // cell_size + 1
+        )
 
-        camera_left = self.camera.x // cell_size
-        camera_top = self.camera.y // cell_size
-        camera_right = (self.camera.x + self.camera.screen_width) // cell_size + 1
-        camera_bottom = (self.camera.y + self.camera.screen_height) // cell_size + 1
+    def _draw_belt_segments(self, screen):
+        cell_size = self.grid.CELL_SIZE
+        camera_left, camera_top, camera_right, camera_bottom = self._visible_tiles()
 
-        for seg in self.world.belt_segments:
+        # Only the chunks on screen - the rest of the world isn't looked at.
+        for seg in self.world.belt_segments_in_area(camera_left, camera_top, camera_right, camera_bottom):
             gx, gy = seg.grid_pos
 
             if camera_left <= gx < camera_right and camera_top <= gy < camera_bottom:
@@ -47,26 +62,36 @@ class WorldRenderer:
                         gy * cell_size - self.camera.y
                     )
                 )
+    @staticmethod
+    def _lerp(previous, current, alpha):
+        return previous + (current - previous) * alpha
+
     def _draw_items(self, screen):
-        for seg in self.world.belt_segments:
-            if seg.item:
+        # The simulation ticks at a fixed rate that can be lower than the
+        # frame rate - draw every item part-way between where it was on
+        # the previous tick and where it is now, so belts still look smooth.
+        alpha = self.tick_scheduler.alpha
+        visible = self._visible_tiles()
+
+        for line in self.world.belt_lines_in_area(*visible):
+            for seg, item, progress, incoming_direction in line.render_items(alpha):
                 self.item_renderer.draw_item(
                     screen,
                     self.camera,
-                    seg.item,
+                    item,
                     seg.grid_pos,
-                    seg.item_progress,
-                    seg.current_incoming_direction or seg.direction
+                    progress,
+                    incoming_direction or seg.direction
                 )
 
-        for machine in self.world.machines:
+        for machine in self.world.machines_in_area(*visible):
             if hasattr(machine, "current_item") and machine.current_item:
                 self.item_renderer.draw_item(
                     screen,
                     self.camera,
                     machine.current_item,
                     machine.grid_pos,
-                    machine.item_progress,
+                    min(self._lerp(machine.prev_item_progress, machine.item_progress, alpha), 1.0),
                     machine.current_incoming_direction or machine.direction
                 )
 
@@ -78,16 +103,13 @@ class WorldRenderer:
                     anim["item"],
                     anim["start"],
                     anim["end"],
-                    min(anim["progress"], 1.0)
+                    min(self._lerp(anim["prev_progress"], anim["progress"], alpha), 1.0)
                 )
     
     def _draw_machines(self, screen):
-        camera_left = self.camera.x // self.grid.CELL_SIZE
-        camera_top = self.camera.y // self.grid.CELL_SIZE
-        camera_right = (self.camera.x + self.camera.screen_width) // self.grid.CELL_SIZE + 1
-        camera_bottom = (self.camera.y + self.camera.screen_height) // self.grid.CELL_SIZE + 1
+        camera_left, camera_top, camera_right, camera_bottom = self._visible_tiles()
 
-        for machine in self.world.machines:
+        for machine in self.world.machines_in_area(camera_left, camera_top, camera_right, camera_bottom):
             # Check if any of the machine's tiles are inside camera view
             for gx, gy in machine.occupied_cells:
                 if camera_left <= gx < camera_right and camera_top <= gy < camera_bottom:
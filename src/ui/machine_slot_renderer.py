@@ -1,7 +1,7 @@
 # ui.machine_slot_renderer
 import pygame as py
 
-from constants.itemdata import get_item_by_id
+from constants.itemdata import get_item_by_id, get_item_by_index
 
 
 class MachineSlotRenderer:
@@ -116,7 +116,7 @@ class MachineSlotRenderer:
 
     def _draw_item_in_slot(self, screen, slot, rect):
         py.draw.rect(screen, "#AAAAAA", rect, 2)
-        item = get_item_by_id(slot["item"]) if isinstance(slot["item"], str) else slot["item"]
+        item = get_item_by_index(slot["item"])
         if item and hasattr(item, "sprite") and item.sprite:
             slot_size = self.SLOT_SIZE - 10
             img = item.get_scaled_sprite(slot_size) if hasattr(item, 'get_scaled_sprite') else py.transform.scale(item.sprite, (slot_size, slot_size))
@@ -1,7 +1,7 @@
 # ui.player_inventory_ui
 import pygame as py
 
-from constants.itemdata import get_item_by_id
+from constants.itemdata import get_item_by_index
 
 class PlayerInventoryUI:
     SLOT_SIZE = 48
@@ -64,10 +64,9 @@ class PlayerInventoryUI:
                 slot = self.player.inventory.slots[y][x]
 
                 if slot:
-                    item_id = slot["item"]
                     amount = slot["amount"]
 
-                    item = get_item_by_id(item_id)
+                    item = get_item_by_index(slot["item"])
 
                     if item and item.sprite:
                         slot_size = self.SLOT_SIZE - 10
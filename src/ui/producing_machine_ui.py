@@ -1,13 +1,14 @@
 # ui.producing_machine_ui
 import pygame as py
 
+from game.commands import SetRecipe
 
 class ProducingMachineUI:
     """State and interaction (open/close, recipe/close clicks) for a
     producing machine's panel - always centered on screen while open.
     Drawing lives in MachineUIRenderer."""
 
-    def __init__(self, camera, world, player, player_inventory_ui, screen, panel_side="right"):
+    def __init__(self, camera, world, player, player_inventory_ui, screen, command_runner, panel_side="right"):
         self.sprite = py.Surface((400, 300), py.SRCALPHA)
         self.rect = self.sprite.get_rect(center=(camera.screen_width // 2, camera.screen_height // 2))
         # Draw rounded panel background
@@ -23,6 +24,7 @@ class ProducingMachineUI:
         self.player = player
         self.player_inventory_ui = player_inventory_ui
         self.screen = screen
+        self.command_runner = command_runner
 
         self.panel_side = panel_side
 
@@ -49,7 +51,7 @@ class ProducingMachineUI:
         if mx is not None and my is not None:
             for rect, recipe in self.recipe_rects:
                 if rect.collidepoint(mx, my):
-                    self.selected_machine.set_recipe(recipe, player_inventory=self.player.inventory)
+                    self.command_runner.try_submit(SetRecipe(self.selected_machine.grid_pos, recipe.name))
                     break
 
     def _handle_close_click(self, left_click, mx, my):
@@ -0,0 +1,125 @@
+# ui.profiler_overlay
+import pygame as py
+
+
+class ProfilerOverlay:
+    """F3 panel in the top right corner showing what the Profiler
+    recorded: frame time percentiles, the last / p50 / p95 milliseconds of
+    every section, how many lines and machines are awake, and a graph of
+    the last few seconds of frame times - a hitch shows up as a spike.
+
+    The text is only re-rendered every TEXT_REFRESH_FRAMES frames - it
+    would be unreadable at 60 updates a second anyway, and the overlay
+    shouldn't cost much of the frame it's measuring."""
+
+    WIDTH = 380
+    PADDING = 8
+    LINE_HEIGHT = 16
+    GRAPH_HEIGHT = 70
+    GRAPH_MAX_MS = 50.0
+    TEXT_REFRESH_FRAMES = 15
+
+    # Right edges of the number columns in the section table.
+    COLUMNS = (210, 270, 330)
+
+    BACKGROUND = (20, 20, 20, 190)
+    TEXT_COLOR = (235, 235, 235)
+    BAR_COLOR = (90, 200, 90)
+    HITCH_COLOR = (230, 70, 70)
+    GUIDE_COLOR = (150, 150, 150)
+
+    # Game loop order first; anything else recorded goes after these.
+    SECTION_ORDER = (
+        "input", "commands", "sim.belts", "sim.belt_requests", "sim.machines", "stats", "build_hover",
+        "background", "grid", "belts", "items", "machines", "player", "ghosts", "ui", "cursor",
+    )
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.visible = False
+        self.font = py.font.SysFont("Arial", 13)
+
+        self._text = None
+        self._frames_since_text = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._text = None
+
+    def draw(self, screen):
+        if not self.visible:
+            return
+
+        self._frames_since_text += 1
+        if self._text is None or self._frames_since_text >= self.TEXT_REFRESH_FRAMES:
+            self._text = self._render_text()
+            self._frames_since_text = 0
+
+        text_height = self._text.get_height()
+        panel = py.Surface((self.WIDTH, text_height + self.GRAPH_HEIGHT + 3 * self.PADDING), py.SRCALPHA)
+        panel.fill(self.BACKGROUND)
+        panel.blit(self._text, (self.PADDING, self.PADDING))
+
+        graph_rect = py.Rect(self.PADDING, text_height + 2 * self.PADDING, self.WIDTH - 2 * self.PADDING, self.GRAPH_HEIGHT)
+        self._draw_graph(panel, graph_rect)
+
+        screen.blit(panel, (screen.get_width() - self.WIDTH - self.PADDING, self.PADDING))
+
+    def _rows(self):
+        """Rows of cells: the first is left aligned, the rest go right
+        aligned into COLUMNS."""
+        profiler = self.profiler
+
+        frame = profiler.frame_percentiles()
+        rows = [
+            (f"frame ms  -  p50 {frame[50]:.1f}   p95 {frame[95]:.1f}   p99 {frame[99]:.1f}",),
+            (),
+            ("section", "last", "p50", "p95"),
+        ]
+
+        names = [name for name in self.SECTION_ORDER if name in profiler.sections]
+        names += [name for name in profiler.sections if name not in self.SECTION_ORDER]
+        for name in names:
+            section = profiler.section_percentiles(name, (50, 95))
+            rows.append((name, f"{profiler.latest(name):.2f}", f"{section[50]:.2f}", f"{section[95]:.2f}"))
+
+        counts = profiler.counts
+        if counts:
+            rows += [
+                (),
+                (f"entities {counts['entities']} ({counts['belt_segments']} belts, {counts['machines']} machines)",),
+                (f"lines {counts['lines']}: {counts['lines_active']} active, {counts['lines_fast']} fast, {counts['lines_idle']} idle",),
+                (f"machines {counts['machines']}: {counts['machines_active']} active, {counts['machines_idle']} idle",),
+            ]
+        return rows
+
+    def _render_text(self):
+        rows = self._rows()
+        surface = py.Surface((self.WIDTH - 2 * self.PADDING, len(rows) * self.LINE_HEIGHT), py.SRCALPHA)
+        for i, row in enumerate(rows):
+            y = i * self.LINE_HEIGHT
+            for j, cell in enumerate(row):
+                text = self.font.render(cell, True, self.TEXT_COLOR)
+                if j == 0:
+                    surface.blit(text, (0, y))
+                else:
+                    surface.blit(text, text.get_rect(topright=(self.COLUMNS[j - 1], y)))
+        return surface
+
+    def _draw_graph(self, surface, rect):
+        """One bar per frame, newest on the right, with guides at 60 and
+        30 FPS. Frames slower than 30 FPS are drawn red."""
+        samples = self.profiler.frame_times
+        scale = rect.height / self.GRAPH_MAX_MS
+
+        for ms in (1000 / 60, 1000 / 30):
+            y = rect.bottom - int(ms * scale)
+            py.draw.line(surface, self.GUIDE_COLOR, (rect.left, y), (rect.right, y))
+
+        bar_width = rect.width / max(self.profiler.history, 1)
+        start = self.profiler.history - len(samples)
+        for i, ms in enumerate(samples):
+            height = min(int(ms * scale), rect.height)
+            x = rect.left + int((start + i) * bar_width)
+            color = self.HITCH_COLOR if ms > 1000 / 30 else self.BAR_COLOR
+            py.draw.line(surface, color, (x, rect.bottom), (x, rect.bottom - height))
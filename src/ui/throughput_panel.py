@@ -0,0 +1,161 @@
+# ui.throughput_panel
+import pygame as py
+
+from objects.conveyors.belt_segment import BeltSegment
+from objects.machines.producing_machine import ProducingMachine
+
+
+class ThroughputPanel:
+    """F4 panel on the left showing what ThroughputStats collected: items
+    made and used up per minute for every item type, graphs of both over
+    the selected window, and the throughput of whatever belt or machine
+    is under the cursor. F4 steps through the windows (1 min, 10 min,
+    1 h) and then hides the panel again.
+
+    Like ProfilerOverlay, the table and graphs are only re-rendered every
+    REFRESH_FRAMES frames - the stats only change once a second anyway.
+    Only the line about the hovered entity is redrawn every frame."""
+
+    WIDTH = 340
+    PADDING = 8
+    LINE_HEIGHT = 16
+    GRAPH_HEIGHT = 60
+    REFRESH_FRAMES = 15
+    MAX_ITEMS = 6  # rows in the table, lines in the graphs
+
+    # Right edges of the number columns in the table.
+    COLUMNS = (230, 310)
+
+    BACKGROUND = (20, 20, 20, 190)
+    TEXT_COLOR = (235, 235, 235)
+    GUIDE_COLOR = (150, 150, 150)
+    ITEM_COLORS = ((90, 200, 90), (230, 150, 60), (90, 160, 230), (220, 90, 200), (230, 220, 80), (120, 220, 220))
+
+    def __init__(self, stats, world, camera, cell_size):
+        self.stats = stats
+        self.world = world
+        self.camera = camera
+        self.cell_size = cell_size
+
+        self.window = None  # name from ThroughputStats.WINDOWS while shown
+        self.font = py.font.SysFont("Arial", 13)
+
+        self._panel = None
+        self._frames_since_panel = 0
+
+    @property
+    def visible(self):
+        return self.window is not None
+
+    def toggle(self):
+        names = [name for name, _ in self.stats.WINDOWS]
+        if self.window is None:
+            self.window = names[0]
+        else:
+            index = names.index(self.window) + 1
+            self.window = names[index] if index < len(names) else None
+        self._panel = None
+
+    def draw(self, screen, top=90):
+        if not self.visible:
+            return
+
+        self._frames_since_panel += 1
+        if self._panel is None or self._frames_since_panel >= self.REFRESH_FRAMES:
+            self._panel = self._render_panel()
+            self._frames_since_panel = 0
+
+        hover = self.font.render(self._hover_text(), True, self.TEXT_COLOR)
+        panel = py.Surface((self.WIDTH, self._panel.get_height() + self.LINE_HEIGHT + 3 * self.PADDING), py.SRCALPHA)
+        panel.fill(self.BACKGROUND)
+        panel.blit(self._panel, (self.PADDING, self.PADDING))
+        panel.blit(hover, (self.PADDING, self._panel.get_height() + 2 * self.PADDING))
+
+        screen.blit(panel, (self.PADDING, top))
+
+    def _items(self, produced, consumed):
+        """The busiest item types, each with its graph color."""
+        busiest = sorted(set(produced) | set(consumed), key=lambda item_id: -(produced.get(item_id, 0) + consumed.get(item_id, 0)))
+        return {item_id: self.ITEM_COLORS[i % len(self.ITEM_COLORS)] for i, item_id in enumerate(busiest[:self.MAX_ITEMS])}
+
+    def _render_panel(self):
+        produced = self.stats.production_rates(self.window)
+        consumed = self.stats.consumption_rates(self.window)
+        items = self._items(produced, consumed)
+
+        rows = [
+            (f"items per minute  -  last {self.window}   (F4: next)",),
+            ("item", "made", "used"),
+        ]
+        rows += [(item_id, f"{produced.get(item_id, 0):.1f}", f"{consumed.get(item_id, 0):.1f}") for item_id in items]
+        if not items:
+            rows.append(("nothing made yet",))
+
+        width = self.WIDTH - 2 * self.PADDING
+        text_height = len(rows) * self.LINE_HEIGHT
+        surface = py.Surface((width, text_height + 2 * (self.LINE_HEIGHT + self.GRAPH_HEIGHT + self.PADDING)), py.SRCALPHA)
+
+        for i, row in enumerate(rows):
+            y = i * self.LINE_HEIGHT
+            for j, cell in enumerate(row):
+                text = self.font.render(cell, True, self.TEXT_COLOR)
+                if j == 0:
+                    x = 0
+                    if i >= 2 and row[0] in items:
+                        py.draw.rect(surface, items[row[0]], (0, y + 4, 8, 8))
+                        x = 12
+                    surface.blit(text, (x, y))
+                else:
+                    surface.blit(text, text.get_rect(topright=(self.COLUMNS[j - 1], y)))
+
+        y = text_height
+        for title, windows in (("made", self.stats.production), ("used", self.stats.consumption)):
+            y += self.PADDING
+            surface.blit(self.font.render(title, True, self.TEXT_COLOR), (0, y))
+            y += self.LINE_HEIGHT
+            self._draw_graph(surface, py.Rect(0, y, width, self.GRAPH_HEIGHT), windows[self.window], items)
+            y += self.GRAPH_HEIGHT
+
+        return surface
+
+    def _draw_graph(self, surface, rect, window, items):
+        """One line per item over the window's slices, oldest on the left,
+        scaled to the highest rate shown."""
+        py.draw.line(surface, self.GUIDE_COLOR, rect.bottomleft, rect.bottomright)
+
+        series = {item_id: window.history(item_id) for item_id in items}
+        peak = max((max(points) for points in series.values() if points), default=0.0)
+        if peak <= 0.0:
+            return
+
+        surface.blit(self.font.render(f"{peak:.0f}/min", True, self.GUIDE_COLOR), (rect.left, rect.top))
+        step = rect.width / max(self.stats.BUCKETS - 1, 1)
+        start = self.stats.BUCKETS - len(next(iter(series.values())))
+        for item_id, points in series.items():
+            if len(points) < 2:
+                continue
+            line = [
+                (rect.left + (start + i) * step, rect.bottom - 1 - value / peak * (rect.height - 1))
+                for i, value in enumerate(points)
+            ]
+            py.draw.lines(surface, items[item_id], False, line)
+
+    def _hover_text(self):
+        mx, my = py.mouse.get_pos()
+        tile = ((mx + self.camera.x) // self.cell_size, (my + self.camera.y) // self.cell_size)
+
+        entity = self.world.get_machine_at(tile) or self.world.belt_map.get(tile)
+        if entity is None:
+            return "under cursor: nothing"
+
+        rate = self.stats.rate(entity)
+        if rate is None:
+            return "under cursor: measuring..."
+
+        if isinstance(entity, BeltSegment):
+            return f"under cursor: {entity.belt_type} belt, {rate:.1f} items/min"
+
+        text = f"under cursor: {type(entity).__name__}, {rate:.1f} items/min out"
+        if isinstance(entity, ProducingMachine) and entity.recipe is not None:
+            text += f" ({entity.recipe.name})"
+        return text